@@ -5,7 +5,7 @@ from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import F, Q
+from django.db.models import F
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
@@ -13,6 +13,13 @@ from django.utils import timezone
 from .forms import AjusteIngresoForm
 from apps.ajustes_inventario.models import Inventario_Fisico, Detalle_Conteo
 from apps.inventario.models import Lotes, Productos
+from apps.inventario.kardex import invalidar_cierres
+from apps.inventario.resumen_diario import marcar_movimientos
+from apps.inventario.reversos import ReversoSinStock, revertir_deltas
+from apps.inventario.resumen_stock import sincronizar_stock_productos
+from apps.inventario.busqueda import responder_busqueda
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.auditoria import bitacora
 from apps.mantenimiento.models import Estado_Lote
 
 from io import BytesIO
@@ -74,6 +81,7 @@ def ajuste_ingreso_create(request):
         )
 
         # === Crear detalles ===
+        productos_afectados = set()
         for idx, det in enumerate(detalles_data, start=1):
             producto_id = det.get("producto_id")
             lote_id = det.get("lote_id")
@@ -98,7 +106,7 @@ def ajuste_ingreso_create(request):
             if lote_id:
                 lote = get_object_or_404(Lotes, pk=lote_id)
             else:
-                estado_disponible = Estado_Lote.objects.get(nombre_estado="Disponible")
+                estado_disponible = catalogos.obtener(Estado_Lote, "Disponible")
                 lote, _ = Lotes.objects.get_or_create(
                     id_producto=producto,
                     numero_lote=numero_lote,
@@ -119,7 +127,10 @@ def ajuste_ingreso_create(request):
                 cantidad_contada=cantidad_sistema + cantidad,
                 diferencia=cantidad,
             )
+            productos_afectados.add(lote.id_producto_id)
 
+        sincronizar_stock_productos(productos_afectados)
+        bitacora.registrar("Ajuste de ingreso", ajuste)
         return JsonResponse({"success": True, "ajuste_id": ajuste.id})
 
     except ValidationError as e:
@@ -134,31 +145,8 @@ def ajuste_ingreso_create(request):
 # -----------------------------------------
 @login_required
 def search_productos(request):
-    term = request.GET.get("term", "").strip()
-    productos = (
-        Productos.objects
-        .select_related("id_presentacion", "id_unidad_medida", "id_condicion_almacenamiento", "id_estado_producto")
-        .filter(
-            Q(nombre__icontains=term) | Q(codigo_producto__icontains=term),
-            id_estado_producto__nombre_estado__iexact="Activo",   # <- SOLO activos
-        )
-        [:20]
-    )
-    results = [
-        {
-            "id": p.id,
-            "codigo": p.codigo_producto,
-            "nombre": p.nombre,
-            "descripcion": p.descripcion or "",
-            "presentacion": str(p.id_presentacion) if p.id_presentacion_id else "",
-            "unidad": str(p.id_unidad_medida) if p.id_unidad_medida_id else "",
-            "condicion": str(p.id_condicion_almacenamiento) if p.id_condicion_almacenamiento_id else "",
-            "receta": bool(p.requiere_receta),
-            "controlado": bool(p.es_controlado),
-        }
-        for p in productos
-    ]
-    return JsonResponse(results, safe=False)
+    activos = Productos.objects.filter(id_estado_producto__nombre_estado__iexact="Activo")  # <- SOLO activos
+    return responder_busqueda(request, activos)
 
 
 @login_required
@@ -208,7 +196,7 @@ def create_lote(request):
     if caducidad:
         fecha_caducidad = datetime.strptime(caducidad, "%Y-%m-%d").date()
 
-    estado_disponible = Estado_Lote.objects.get(nombre_estado="Disponible")
+    estado_disponible = catalogos.obtener(Estado_Lote, "Disponible")
 
     lote = Lotes.objects.create(
         id_producto_id=producto_id,
@@ -249,49 +237,32 @@ def anular_ajuste_ingreso(request, ajuste_id: int):
 
     # Traemos los detalles con su lote
     detalles = list(
-        Detalle_Conteo.objects.select_related("id_lote").filter(id_conteo=ajuste)
+        Detalle_Conteo.objects.filter(id_conteo=ajuste).only("id_lote_id", "diferencia")
     )
     if not detalles:
         return JsonResponse({"success": False, "error": "El ajuste no tiene detalles."}, status=400)
 
-    # Bloqueamos filas de lotes para evitar condiciones de carrera
-    lotes_ids = [d.id_lote_id for d in detalles]
-    lotes_map = {l.id: l for l in Lotes.objects.select_for_update().filter(id__in=lotes_ids)}
-
-    # 1) Validaciones: para un ingreso, diferencia > 0. Comprobamos stock suficiente para revertir.
+    # Revertimos lo que aplicó el ajuste (-diferencia por lote). Los lotes se
+    # bloquean en orden de id y, si alguno quedaría en negativo, no se toca nada.
+    deltas = {}
     for det in detalles:
-        lote = lotes_map[det.id_lote_id]
-        delta = det.diferencia or 0  # lo que agregó el ajuste
-        if delta > 0:
-            if lote.cantidad_disponible < delta:
-                # Si prefieres "clamp" en vez de bloquear, te dejo opción más abajo
-                return JsonResponse({
-                    "success": False,
-                    "error": (f"No hay stock suficiente en el lote {lote.numero_lote} "
-                              f"para revertir +{delta}. Stock actual: {lote.cantidad_disponible}.")
-                }, status=400)
-        elif delta < 0:
-            # Si algún día registras salidas por ajuste, aquí delta<0 significaría que para anular hay que sumar.
-            pass
-
-    # 2) Reversión
-    for det in detalles:
-        lote = lotes_map[det.id_lote_id]
-        delta = det.diferencia or 0
-        if delta > 0:
-            # Revertimos solo lo agregado por el ajuste
-            Lotes.objects.filter(pk=lote.pk).update(
-                cantidad_disponible=F("cantidad_disponible") - delta
-            )
-        elif delta < 0:
-            # (para el caso futuro de ajustes de salida)
-            Lotes.objects.filter(pk=lote.pk).update(
-                cantidad_disponible=F("cantidad_disponible") + (-delta)
-            )
-
-    # 3) Marcamos el ajuste como cancelado (eliminado lógico)
+        deltas[det.id_lote_id] = deltas.get(det.id_lote_id, 0) - int(det.diferencia or 0)
+    try:
+        revertir_deltas(deltas)
+    except ReversoSinStock as e:
+        lote, disp, qty = e.faltantes[0]
+        return JsonResponse({
+            "success": False,
+            "error": (f"No hay stock suficiente en el lote {lote.numero_lote} "
+                      f"para revertir +{qty}. Stock actual: {disp}.")
+        }, status=400)
+
+    # Marcamos el ajuste como cancelado (eliminado lógico)
     ajuste.estado = "Cancelado"
     ajuste.save(update_fields=["estado"])
+    invalidar_cierres(ajuste.fecha_conteo)
+    marcar_movimientos([ajuste.fecha_conteo])
+    bitacora.registrar("Anular ajuste de ingreso", ajuste)
 
     return JsonResponse({"success": True})
 
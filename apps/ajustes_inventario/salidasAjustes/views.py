@@ -5,14 +5,21 @@ from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import F, Q
+from django.db.models import F
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
 
 from .forms import AjusteSalidaForm
 from apps.ajustes_inventario.models import Inventario_Fisico, Detalle_Conteo
+from apps.inventario.fefo import StockInsuficiente, aplicar_plan, plan_a_dict, planificar_fefo
 from apps.inventario.models import Lotes, Productos
+from apps.inventario.kardex import invalidar_cierres
+from apps.inventario.resumen_diario import marcar_movimientos
+from apps.inventario.reversos import revertir_deltas
+from apps.inventario.resumen_stock import sincronizar_stock_productos
+from apps.inventario.busqueda import responder_busqueda
+from apps.mantenimiento.auditoria import bitacora
 from apps.mantenimiento.models import Estado_Lote
 
 from io import BytesIO
@@ -58,6 +65,11 @@ def ajuste_salida_create(request):
         if not detalles_data:
             return JsonResponse({"success": False, "errors": "No se enviaron detalles del ajuste."}, status=400)
 
+        # Vista previa de las líneas FEFO: devuelve el plan sin escribir
+        if data.get("simular"):
+            plan = planificar_fefo(_requeridos_fefo(detalles_data), bloquear=False)
+            return JsonResponse({"success": True, "simulacion": True, "plan": plan_a_dict(plan)})
+
         # === Usuario y fecha ===
         usuario = request.user
         fecha_ajuste = form_data.get("fecha_ajuste") or timezone.now().date()
@@ -71,6 +83,8 @@ def ajuste_salida_create(request):
         )
 
         # === Crear detalles ===
+        productos_afectados = set()
+        fefo_reqs = {}  # producto_id -> cantidad, para líneas sin lote (fefo=true)
         for idx, det in enumerate(detalles_data, start=1):
             producto_id = det.get("producto_id")
             lote_id = det.get("lote_id")
@@ -79,7 +93,7 @@ def ajuste_salida_create(request):
 
             if not producto_id:
                 raise ValidationError(f"Falta producto en línea {idx}.")
-            if not lote_id and not numero_lote:
+            if not lote_id and not numero_lote and not det.get("fefo"):
                 raise ValidationError(f"Falta número de lote en línea {idx}.")
 
             try:
@@ -94,6 +108,10 @@ def ajuste_salida_create(request):
             # Resolver lote
             if lote_id:
                 lote = get_object_or_404(Lotes, pk=lote_id)
+            elif det.get("fefo"):
+                # El lote se asigna después, junto con las demás líneas FEFO
+                fefo_reqs[producto.id] = fefo_reqs.get(producto.id, 0) + cantidad
+                continue
             else:
                 raise ValidationError(f"No se puede crear nuevo lote en una salida (línea {idx}).")
 
@@ -119,46 +137,67 @@ def ajuste_salida_create(request):
                 cantidad_contada=cantidad_sistema - cantidad,
                 diferencia=-cantidad,  # 👈 salida = diferencia negativa
             )
+            productos_afectados.add(lote.id_producto_id)
+
+        sincronizar_stock_productos(productos_afectados)
+
+        # === Líneas FEFO: una asignación y un UPDATE para todas ===
+        if fefo_reqs:
+            plan = planificar_fefo(fefo_reqs)
+            aplicar_plan(plan)
+            Detalle_Conteo.objects.bulk_create([
+                Detalle_Conteo(
+                    id_conteo=ajuste,
+                    id_lote=a["lote"],
+                    cantidad_sistema=a["lote"].cantidad_disponible,
+                    cantidad_contada=a["lote"].cantidad_disponible - a["cantidad"],
+                    diferencia=-a["cantidad"],
+                )
+                for a in plan
+            ])
 
+        bitacora.registrar("Ajuste de salida", ajuste)
         return JsonResponse({"success": True, "ajuste_id": ajuste.id})
 
     except ValidationError as e:
         return JsonResponse({"success": False, "errors": str(e)}, status=400)
+    except StockInsuficiente as e:
+        nombres = dict(Productos.objects.filter(pk__in=e.faltantes).values_list("id", "nombre"))
+        transaction.set_rollback(True)
+        errores = [
+            f"Stock insuficiente para '{nombres.get(pid, pid)}'. Requerido: {req}, disponible: {disp}."
+            for pid, (req, disp) in e.faltantes.items()
+        ]
+        return JsonResponse({"success": False, "errors": " ".join(errores)}, status=400)
     except Exception as e:
         logger.exception("Error al crear ajuste de inventario (salida)")
         return JsonResponse({"success": False, "errors": str(e)}, status=500)
 
 
+def _requeridos_fefo(detalles_data) -> dict:
+    """Cantidades por producto de las líneas que piden asignación FEFO."""
+    requeridos = {}
+    for idx, det in enumerate(detalles_data, start=1):
+        if det.get("lote_id") or not det.get("fefo"):
+            continue
+        try:
+            producto_id = int(det.get("producto_id"))
+            cantidad = int(det.get("cantidad_ajustada") or 0)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Cantidad inválida en línea {idx}.")
+        if cantidad <= 0:
+            raise ValidationError(f"Cantidad inválida en línea {idx}.")
+        requeridos[producto_id] = requeridos.get(producto_id, 0) + cantidad
+    return requeridos
+
+
 # -----------------------------------------
 # BÚSQUEDAS AJAX
 # -----------------------------------------
 @login_required
 def search_productos(request):
-    term = request.GET.get("term", "").strip()
-    productos = (
-        Productos.objects
-        .select_related("id_presentacion", "id_unidad_medida", "id_condicion_almacenamiento", "id_estado_producto")
-        .filter(
-            Q(nombre__icontains=term) | Q(codigo_producto__icontains=term),
-            id_estado_producto__nombre_estado__iexact="Activo",   # <- SOLO activos
-        )
-        [:20]
-    )
-    results = [
-        {
-            "id": p.id,
-            "codigo": p.codigo_producto,
-            "nombre": p.nombre,
-            "descripcion": p.descripcion or "",
-            "presentacion": str(p.id_presentacion) if p.id_presentacion_id else "",
-            "unidad": str(p.id_unidad_medida) if p.id_unidad_medida_id else "",
-            "condicion": str(p.id_condicion_almacenamiento) if p.id_condicion_almacenamiento_id else "",
-            "receta": bool(p.requiere_receta),
-            "controlado": bool(p.es_controlado),
-        }
-        for p in productos
-    ]
-    return JsonResponse(results, safe=False)
+    activos = Productos.objects.filter(id_estado_producto__nombre_estado__iexact="Activo")  # <- SOLO activos
+    return responder_busqueda(request, activos)
 
 
 @login_required
@@ -224,25 +263,23 @@ def anular_ajuste_salida(request, ajuste_id: int):
         return JsonResponse({"success": False, "error": "El ajuste ya está cancelado."}, status=400)
 
     detalles = list(
-        Detalle_Conteo.objects.select_related("id_lote").filter(id_conteo=ajuste)
+        Detalle_Conteo.objects.filter(id_conteo=ajuste).only("id_lote_id", "diferencia")
     )
     if not detalles:
         return JsonResponse({"success": False, "error": "El ajuste no tiene detalles."}, status=400)
 
-    lotes_ids = [d.id_lote_id for d in detalles]
-    lotes_map = {l.id: l for l in Lotes.objects.select_for_update().filter(id__in=lotes_ids)}
-
-    # 1) Revertir salidas: devolvemos el stock restado.
+    # 1) Revertir salidas: devolvemos el stock restado (diferencia era negativa)
+    deltas = {}
     for det in detalles:
-        lote = lotes_map[det.id_lote_id]
-        delta = abs(det.diferencia or 0)  # diferencia era negativa, revertimos positivo
-        Lotes.objects.filter(pk=lote.pk).update(
-            cantidad_disponible=F("cantidad_disponible") + delta
-        )
+        deltas[det.id_lote_id] = deltas.get(det.id_lote_id, 0) + abs(det.diferencia or 0)
+    revertir_deltas(deltas, validar=False)
 
     # 2) Marcar como cancelado
     ajuste.estado = "Cancelado"
     ajuste.save(update_fields=["estado"])
+    invalidar_cierres(ajuste.fecha_conteo)
+    marcar_movimientos([ajuste.fecha_conteo])
+    bitacora.registrar("Anular ajuste de salida", ajuste)
 
     return JsonResponse({"success": True})
 
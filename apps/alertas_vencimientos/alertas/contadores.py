@@ -0,0 +1,114 @@
+# apps/alertas_vencimientos/alertas/contadores.py
+"""
+Contadores de alertas (stock bajo, próximos a vencer, vencidos, agotamiento).
+
+`obtener()` devuelve las cuatro listas de ids calculadas en una sola consulta
+(agregación condicional con array_agg ... FILTER) y las guarda en la caché de
+Django. El dashboard, los modales y el endpoint JSON del menú leen de ahí.
+
+"agotamiento" son los productos cuya fecha estimada de agotamiento
+(`Proyeccion_Agotamiento`, recalculada cada noche por proyeccion.py) cae
+dentro de `ALERTAS_AGOTAMIENTO_DIAS` días, ordenados por esa fecha. Leer los
+contadores nunca calcula la proyección (eso es del comando
+`actualizar_proyeccion_agotamiento`); `estado_proyeccion()` indica si falta o
+está vieja para que la pantalla lo avise en lugar de mostrar un cero sin
+explicación.
+
+La caché se invalida al confirmar cualquier transacción que sincronice el
+resumen de stock (señal `stock_actualizado`) o que guarde/borre un producto o
+un lote (stock mínimo, fecha de caducidad); ver apps/alertas_vencimientos/signals.py.
+La clave incluye la fecha, así que los vencimientos cambian solos al cambiar
+de día. Con la caché por defecto (LocMemCache) la invalidación solo se ve en
+el mismo proceso; `ALERTAS_CACHE_SEGUNDOS` acota el tiempo en los demás.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.alertas_vencimientos.models import Proyeccion_Agotamiento
+from apps.inventario.models import Lotes, Productos, StockProducto
+
+PROXIMO_DIAS = getattr(settings, "PROXIMO_VENCER_DIAS", 30)
+AGOTAMIENTO_DIAS = getattr(settings, "ALERTAS_AGOTAMIENTO_DIAS", 30)
+CACHE_SEGUNDOS = getattr(settings, "ALERTAS_CACHE_SEGUNDOS", 300)
+# pasado este tiempo sin recalcular, la proyección se marca como desactualizada
+PROYECCION_VIGENCIA_HORAS = getattr(settings, "ALERTAS_PROYECCION_VIGENCIA_HORAS", 36)
+LISTAS = ("stock_bajo", "proximos_vencer", "vencidos", "agotamiento")
+
+
+def _clave(hoy) -> str:
+    return f"saif:alertas:contadores:{hoy.isoformat()}"
+
+
+def _tabla(modelo):
+    return connection.ops.quote_name(modelo._meta.db_table)
+
+
+def calcular(hoy=None) -> dict:
+    """{nombre: [ids]} para las cuatro alertas, en una sola consulta."""
+    hoy = hoy or timezone.localdate()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH p AS (
+                SELECT p.id, COALESCE(s.stock_total, 0) AS total, p.stock_minimo
+                FROM {_tabla(Productos)} p
+                LEFT JOIN {_tabla(StockProducto)} s ON s.id_producto_id = p.id
+                WHERE p.stock_minimo > 0
+            ), l AS (
+                SELECT id, fecha_caducidad
+                FROM {_tabla(Lotes)}
+                WHERE cantidad_disponible > 0 AND fecha_caducidad <= %(limite)s
+            )
+            SELECT
+                (SELECT array_agg(id ORDER BY id) FILTER (WHERE total <= stock_minimo) FROM p),
+                (SELECT array_agg(id ORDER BY fecha_caducidad, id) FILTER (WHERE fecha_caducidad >= %(hoy)s) FROM l),
+                (SELECT array_agg(id ORDER BY fecha_caducidad DESC, id) FILTER (WHERE fecha_caducidad < %(hoy)s) FROM l),
+                (SELECT array_agg(id_producto_id ORDER BY fecha_agotamiento, id_producto_id)
+                   FROM {_tabla(Proyeccion_Agotamiento)}
+                  WHERE fecha_agotamiento <= %(agotamiento)s)
+            """,
+            {
+                "hoy": hoy,
+                "limite": hoy + timedelta(days=PROXIMO_DIAS),
+                "agotamiento": hoy + timedelta(days=AGOTAMIENTO_DIAS),
+            },
+        )
+        fila = cursor.fetchone()
+    return {nombre: list(ids or []) for nombre, ids in zip(LISTAS, fila)}
+
+
+def estado_proyeccion() -> dict:
+    """{"calculado": fecha o None, "vencida": bool} de la última proyección guardada."""
+    # todas las filas se reemplazan juntas: cualquiera tiene la fecha del cálculo
+    calculado = Proyeccion_Agotamiento.objects.values_list("calculado", flat=True).first()
+    limite = timezone.now() - timedelta(hours=PROYECCION_VIGENCIA_HORAS)
+    return {"calculado": calculado, "vencida": calculado is None or calculado < limite}
+
+
+def obtener(hoy=None) -> dict:
+    """Listas de ids desde la caché (las calcula si no están)."""
+    hoy = hoy or timezone.localdate()
+    datos = cache.get(_clave(hoy))
+    if datos is None:
+        datos = calcular(hoy)
+        cache.set(_clave(hoy), datos, CACHE_SEGUNDOS)
+    return datos
+
+
+def conteos(hoy=None) -> dict:
+    """{nombre: cantidad} para el dashboard y el endpoint del menú."""
+    return {nombre: len(ids) for nombre, ids in obtener(hoy).items()}
+
+
+def borrar():
+    """Borra los contadores de hoy de la caché (inmediato)."""
+    cache.delete(_clave(timezone.localdate()))
+
+
+def invalidar(**kwargs):
+    """Receptor de señales: borra los contadores al confirmar la transacción."""
+    transaction.on_commit(borrar)
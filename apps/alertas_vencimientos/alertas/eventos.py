@@ -0,0 +1,205 @@
+# apps/alertas_vencimientos/alertas/eventos.py
+"""
+Eventos en vivo (Server-Sent Events) de los contadores de alertas.
+
+Cuando una transacción que cambió stock se confirma (señal
+`stock_actualizado` + `transaction.on_commit`, ver ../signals.py) se publica
+un aviso. Cada conexión SSE abierta (`flujo`) recibe el aviso, vuelve a leer
+los contadores y, si cambiaron, envía un evento `contadores` con los valores
+nuevos y la diferencia respecto a lo último que recibió ese cliente.
+
+Modos (`ALERTAS_SSE_MODO`):
+- "local" (por defecto): difusión en memoria entre los hilos del proceso.
+  Sirve con un solo proceso (runserver, un worker con hilos).
+- "postgres": NOTIFY/LISTEN en el canal `saif_alertas`; cada flujo escucha
+  con su propia conexión, así que los avisos llegan a todos los workers.
+
+Cada conexión dura `ALERTAS_SSE_DURACION` segundos; el navegador
+(EventSource) reconecta solo. Mientras tanto se envía un comentario cada
+`ALERTAS_SSE_ESPERA` segundos para mantener viva la conexión.
+
+Despliegue: el flujo es un generador síncrono, así que cada conexión ocupa
+un hilo del worker (y en modo postgres una conexión a la base) mientras dure.
+Solo lo abre la pantalla de alertas (el indicador del menú consulta el JSON
+cada minuto) y necesita un servidor con hilos (gunicorn gthread, runserver),
+gevent o ASGI. Con workers síncronos de un hilo, cada pestaña bloquearía un
+worker completo. `ALERTAS_SSE_MAX_CONEXIONES` limita las conexiones por
+proceso; debe ser menor que los hilos del worker. Pasado el límite la vista
+responde 503, el navegador no reintenta y la página sigue con la consulta
+periódica del menú.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+from . import contadores
+
+logger = logging.getLogger(__name__)
+
+MODO = getattr(settings, "ALERTAS_SSE_MODO", "local")
+CANAL = "saif_alertas"
+ESPERA_SEGUNDOS = getattr(settings, "ALERTAS_SSE_ESPERA", 15)
+DURACION_SEGUNDOS = getattr(settings, "ALERTAS_SSE_DURACION", 300)
+MAX_CONEXIONES = getattr(settings, "ALERTAS_SSE_MAX_CONEXIONES", 4)
+REINTENTO_MS = 5000
+
+
+# ---------------------------------------------------------------
+# Difusión
+# ---------------------------------------------------------------
+class _DifusionLocal:
+    """Una cola por suscriptor dentro del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._colas = set()
+
+    def publicar(self, mensaje: dict) -> None:
+        with self._lock:
+            colas = list(self._colas)
+        for cola in colas:
+            try:
+                cola.put_nowait(mensaje)
+            except queue.Full:
+                pass  # cliente lento: se pondrá al día con el siguiente aviso
+
+    @contextmanager
+    def suscribir(self):
+        cola = queue.Queue(maxsize=100)
+        with self._lock:
+            self._colas.add(cola)
+
+        def esperar(segundos):
+            try:
+                return cola.get(timeout=segundos)
+            except queue.Empty:
+                return None
+
+        try:
+            yield esperar
+        finally:
+            with self._lock:
+                self._colas.discard(cola)
+
+
+class _DifusionPostgres:
+    """NOTIFY para publicar y LISTEN en una conexión dedicada por suscriptor."""
+
+    def publicar(self, mensaje: dict) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CANAL, json.dumps(mensaje)])
+
+    @contextmanager
+    def suscribir(self):
+        conexion = connections.create_connection("default")
+        conexion.ensure_connection()
+        raw = conexion.connection
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL}")
+
+            def esperar(segundos):
+                if hasattr(raw, "poll"):  # psycopg2
+                    if select.select([raw], [], [], segundos) == ([], [], []):
+                        return None
+                    raw.poll()
+                    avisos, raw.notifies[:] = list(raw.notifies), []
+                else:  # psycopg 3
+                    avisos = list(raw.notifies(timeout=segundos, stop_after=1))
+                return json.loads(avisos[-1].payload) if avisos else None
+
+            yield esperar
+        finally:
+            conexion.close()
+
+
+_difusion = _DifusionPostgres() if MODO == "postgres" else _DifusionLocal()
+
+
+def publicar(mensaje: dict) -> None:
+    try:
+        _difusion.publicar(mensaje)
+    except Exception:
+        logger.exception("No se pudo publicar el aviso de alertas.")
+
+
+def notificar_stock(producto_ids=(), **kwargs):
+    """Receptor de `stock_actualizado`: avisa a los flujos al confirmar la transacción."""
+    mensaje = {"tipo": "stock", "productos": len(producto_ids), "v": time.time_ns()}
+    transaction.on_commit(lambda: publicar(mensaje))
+
+
+# ---------------------------------------------------------------
+# Flujo SSE
+# ---------------------------------------------------------------
+_version_vista = None  # último aviso con el que este proceso descartó la caché
+
+
+def _evento(nombre: str, datos: dict) -> str:
+    return f"event: {nombre}\ndata: {json.dumps(datos)}\n\n"
+
+
+def _refrescar(mensaje) -> None:
+    """En modo postgres el aviso puede venir de otro proceso: descarta la caché local una vez."""
+    global _version_vista
+    if MODO == "postgres" and mensaje and mensaje.get("v") != _version_vista:
+        _version_vista = mensaje.get("v")
+        contadores.borrar()
+
+
+_cupos = threading.BoundedSemaphore(MAX_CONEXIONES) if MAX_CONEXIONES > 0 else None
+
+
+class _Suscripcion:
+    """
+    Cuerpo de la respuesta que ocupa un cupo hasta que el servidor la cierra.
+    Django llama a `close()` aunque el generador no haya llegado a iniciarse.
+    """
+
+    def __init__(self, duracion):
+        self._flujo = flujo(duracion)
+        self._abierta = True
+
+    def __iter__(self):
+        return self._flujo
+
+    def close(self):
+        if self._abierta:
+            self._abierta = False
+            self._flujo.close()
+            _cupos.release()
+
+
+def abrir(duracion: int = DURACION_SEGUNDOS):
+    """Flujo para una conexión nueva, o None si el proceso ya no tiene cupos."""
+    if _cupos is None or not _cupos.acquire(blocking=False):
+        return None
+    return _Suscripcion(duracion)
+
+
+def flujo(duracion: int = DURACION_SEGUNDOS):
+    """Generador del cuerpo text/event-stream."""
+    ultimo = contadores.conteos()
+    yield f"retry: {REINTENTO_MS}\n" + _evento("contadores", {"contadores": ultimo, "cambios": {}})
+
+    fin = time.monotonic() + duracion
+    with _difusion.suscribir() as esperar:
+        while time.monotonic() < fin:
+            mensaje = esperar(ESPERA_SEGUNDOS)
+            _refrescar(mensaje)
+            # Sin aviso también se compara: cubre el cambio de día y otros procesos en modo local
+            actual = contadores.conteos()
+            cambios = {k: v - ultimo.get(k, 0) for k, v in actual.items() if v != ultimo.get(k)}
+            if cambios:
+                ultimo = actual
+                yield _evento("contadores", {"contadores": actual, "cambios": cambios})
+            else:
+                yield ": ping\n\n"
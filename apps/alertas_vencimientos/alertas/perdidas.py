@@ -0,0 +1,126 @@
+# apps/alertas_vencimientos/alertas/perdidas.py
+"""
+Pérdida esperada por vencimiento: lotes que vencerán antes de venderse.
+
+Para cada producto se simula el consumo FEFO (primero el lote que vence
+antes) a su ritmo de venta (`Proyeccion_Agotamiento.demanda_ewma`, ver
+proyeccion.py) sobre todos sus lotes vigentes. Con r unidades/día, un lote i
+que vence al final del día e_i tarda t_i = q_i / r días en venderse, y el
+momento en que queda agotado o vencido es
+
+    f_i = min(f_{i-1} + t_i, e_i),   f_{-1} = 0
+
+que desarrollado queda f_i = P_i + min(0, min_{j<=i}(e_j - P_j)) con P las
+sumas acumuladas de t. Los lotes se acomodan en una matriz productos x lotes
+(rellena con t = 0, e = inf) y la recurrencia se resuelve para todo el
+catálogo con cumsum y minimum.accumulate por filas. Se vende
+(f_i - f_{i-1}) * r de cada lote; el resto vence.
+
+Productos sin ventas recientes (o sin proyección) pierden todo su stock
+vigente. El resultado reemplaza `Proyeccion_Vencimiento_Lote` (solo lotes con
+pérdida); lo corre cada noche el comando `actualizar_proyeccion_agotamiento`.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.alertas_vencimientos.models import Proyeccion_Vencimiento_Lote
+from apps.inventario.models import Lotes
+from apps.inventario.resumen_stock import ESTADOS_NO_VIGENTES
+
+LOTE_INSERCION = 2000
+
+
+def _lotes(hoy):
+    """Lotes vigentes con stock, en orden FEFO por producto."""
+    return list(
+        Lotes.objects
+        .filter(cantidad_disponible__gt=0, fecha_caducidad__gte=hoy)
+        .exclude(id_estado_lote__nombre_estado__in=ESTADOS_NO_VIGENTES)
+        .annotate(demanda=Coalesce(
+            F("id_producto__proyeccion_agotamiento__demanda_ewma"), Value(0.0), output_field=FloatField()
+        ))
+        .order_by("id_producto_id", "fecha_caducidad", "id")
+        .values_list("id", "id_producto_id", "cantidad_disponible", "fecha_caducidad", "precio_compra", "demanda")
+    )
+
+
+def simular_fefo(producto, cantidad, vence, demanda):
+    """
+    Unidades vendidas por lote. Arreglos alineados y ordenados por
+    (producto, vence); `vence` en días desde hoy hasta el final del día de
+    caducidad, `demanda` en unidades/día (la del producto, repetida por lote).
+    """
+    n = len(producto)
+    if n == 0:
+        return np.zeros(0)
+    nuevo = np.r_[True, producto[1:] != producto[:-1]]
+    inicio = np.flatnonzero(nuevo)
+    fila = np.cumsum(nuevo) - 1
+    columna = np.arange(n) - inicio[fila]
+
+    con_demanda = demanda > 0
+    dias_venta = np.where(con_demanda, cantidad / np.where(con_demanda, demanda, 1), 0)
+
+    forma = (len(inicio), columna.max() + 1)
+    t = np.zeros(forma)
+    e = np.full(forma, np.inf)
+    t[fila, columna] = dias_venta
+    e[fila, columna] = vence
+
+    acumulado = np.cumsum(t, axis=1)
+    fin = acumulado + np.minimum(np.minimum.accumulate(e - acumulado, axis=1), 0)
+    previo = np.hstack([np.zeros((forma[0], 1)), fin[:, :-1]])
+    vendido = (fin - previo)[fila, columna] * demanda
+    return np.clip(vendido, 0, cantidad)
+
+
+def calcular(hoy=None) -> list:
+    """[(lote_id, cantidad, vendible, perdida, valor_perdida)] de los lotes con pérdida."""
+    hoy = hoy or timezone.localdate()
+    lotes = _lotes(hoy)
+    if not lotes:
+        return []
+    ids, productos, cantidades, fechas, precios, demandas = zip(*lotes)
+    base = hoy.toordinal()
+    cantidad = np.asarray(cantidades, dtype=np.float64)
+    vendido = simular_fefo(
+        np.asarray(productos, dtype=np.int64),
+        cantidad,
+        np.fromiter((f.toordinal() - base + 1 for f in fechas), dtype=np.float64, count=len(fechas)),
+        np.asarray(demandas, dtype=np.float64),
+    )
+    vendible = np.floor(vendido + 1e-9).astype(np.int64)
+    perdida = cantidad.astype(np.int64) - vendible
+
+    resultado = []
+    for i in np.flatnonzero(perdida > 0).tolist():
+        unidades = int(perdida[i])
+        resultado.append((
+            ids[i], int(cantidad[i]), int(vendible[i]), unidades,
+            (precios[i] or Decimal("0")) * unidades,
+        ))
+    return resultado
+
+
+@transaction.atomic
+def actualizar(hoy=None) -> int:
+    """Recalcula y reemplaza la tabla de pérdidas. Devuelve cuántos lotes tienen pérdida."""
+    filas = calcular(hoy)
+    ahora = timezone.now()
+    Proyeccion_Vencimiento_Lote.objects.all().delete()
+    Proyeccion_Vencimiento_Lote.objects.bulk_create(
+        (
+            Proyeccion_Vencimiento_Lote(
+                id_lote_id=lote, cantidad=cantidad, vendible=vendible,
+                perdida=perdida, valor_perdida=valor, calculado=ahora,
+            )
+            for lote, cantidad, vendible, perdida, valor in filas
+        ),
+        batch_size=LOTE_INSERCION,
+    )
+    return len(filas)
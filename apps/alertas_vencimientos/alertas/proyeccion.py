@@ -0,0 +1,145 @@
+# apps/alertas_vencimientos/alertas/proyeccion.py
+"""
+Velocidad de consumo y fecha estimada de agotamiento de todos los productos.
+
+La demanda neta diaria (ventas menos devoluciones de clientes, ya agrupada
+por día en `Resumen_Diario_Movimiento`) de los últimos `DIAS_HISTORIAL` días
+se carga en una matriz NumPy productos x días, y con operaciones sobre la
+matriz completa se obtiene por producto:
+
+- demanda_media: media móvil de los últimos `DIAS_MEDIA` días
+- demanda_ewma: media exponencial (factor `ALFA`) de todo el historial; es la
+  que se usa para proyectar porque reacciona antes a los cambios de ritmo
+- dias_cobertura = stock vigente / demanda_ewma
+- fecha_agotamiento = hoy + días de cobertura (vacía si no hay demanda o la
+  cobertura pasa de `MAX_DIAS_COBERTURA`)
+
+El resultado reemplaza `Proyeccion_Agotamiento` completa. Lo corre cada noche
+el comando `actualizar_proyeccion_agotamiento`; NumPy solo se necesita ahí,
+las vistas leen la tabla.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.alertas_vencimientos.models import Proyeccion_Agotamiento
+from apps.inventario.models import Productos, Resumen_Diario_Movimiento
+from apps.inventario.resumen_diario import etiqueta_tipo
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Producto
+from . import contadores
+
+DIAS_HISTORIAL = getattr(settings, "ALERTAS_DEMANDA_DIAS", 90)
+DIAS_MEDIA = getattr(settings, "ALERTAS_DEMANDA_MEDIA_DIAS", 28)
+ALFA = getattr(settings, "ALERTAS_DEMANDA_ALFA", 0.1)
+MAX_DIAS_COBERTURA = 3650
+LOTE_INSERCION = 2000
+
+
+def _productos():
+    """(ids ordenados, stock vigente) de los productos activos."""
+    qs = Productos.objects.annotate(
+        vigente=Coalesce(F("stock_resumen__stock_vigente"), Value(0))
+    )
+    try:
+        qs = qs.exclude(id_estado_producto_id=catalogos.obtener_id(Estado_Producto, "Inactivo"))
+    except Estado_Producto.DoesNotExist:
+        pass
+    filas = list(qs.order_by("id").values_list("id", "vigente"))
+    ids = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    stock = np.fromiter((f[1] for f in filas), dtype=np.float64, count=len(filas))
+    return ids, stock
+
+
+def _demanda(ids, desde, dias):
+    """Matriz productos x días con la demanda neta diaria (salidas - entradas de VEN y DEV)."""
+    filas = (
+        Resumen_Diario_Movimiento.objects
+        .filter(
+            tipo__in=[etiqueta_tipo("VEN"), etiqueta_tipo("DEV")],
+            fecha__gte=desde,
+            fecha__lt=desde + timedelta(days=dias),
+        )
+        .values("id_producto", "fecha")
+        .annotate(neto=Sum(F("salidas") - F("entradas")))
+        .values_list("id_producto", "fecha", "neto")
+        .order_by()
+    )
+    producto, dia, neto = [], [], []
+    base = desde.toordinal()
+    for pid, fecha, cantidad in filas.iterator(chunk_size=20000):
+        producto.append(pid)
+        dia.append(fecha.toordinal() - base)
+        neto.append(cantidad)
+
+    matriz = np.zeros((len(ids), dias), dtype=np.float64)
+    if not producto:
+        return matriz
+    producto = np.asarray(producto, dtype=np.int64)
+    fila = np.searchsorted(ids, producto)
+    # descarta productos que no están en `ids` (inactivos)
+    validos = (fila < len(ids)) & (ids[np.minimum(fila, len(ids) - 1)] == producto)
+    np.add.at(matriz, (fila[validos], np.asarray(dia)[validos]), np.asarray(neto, dtype=np.float64)[validos])
+    return matriz
+
+
+def calcular(hoy=None, dias_historial=DIAS_HISTORIAL, dias_media=DIAS_MEDIA, alfa=ALFA) -> dict:
+    """Arreglos alineados por producto: ids, stock, demanda_media, demanda_ewma, dias_cobertura."""
+    hoy = hoy or timezone.localdate()
+    dias_media = min(dias_media, dias_historial)
+    ids, stock = _productos()
+    matriz = _demanda(ids, hoy - timedelta(days=dias_historial - 1), dias_historial)
+
+    media = np.clip(matriz[:, -dias_media:].mean(axis=1), 0, None)
+    # pesos (1 - alfa)^antigüedad normalizados: el día más reciente pesa más
+    pesos = (1 - alfa) ** np.arange(dias_historial - 1, -1, -1, dtype=np.float64)
+    ewma = np.clip(matriz @ (pesos / pesos.sum()), 0, None)
+
+    cobertura = np.full(len(ids), np.nan)
+    con_demanda = ewma > 0
+    cobertura[con_demanda] = np.maximum(stock[con_demanda], 0) / ewma[con_demanda]
+    return {
+        "ids": ids,
+        "stock": stock,
+        "demanda_media": media,
+        "demanda_ewma": ewma,
+        "dias_cobertura": cobertura,
+    }
+
+
+def _filas(r, hoy, ahora):
+    for pid, stock, media, ewma, cobertura in zip(
+        r["ids"].tolist(), r["stock"].tolist(), r["demanda_media"].tolist(),
+        r["demanda_ewma"].tolist(), r["dias_cobertura"].tolist(),
+    ):
+        sin_dato = cobertura != cobertura  # NaN
+        fecha = None
+        if not sin_dato and cobertura <= MAX_DIAS_COBERTURA:
+            fecha = hoy + timedelta(days=int(cobertura))
+        yield Proyeccion_Agotamiento(
+            id_producto_id=pid,
+            stock=int(stock),
+            demanda_media=round(media, 4),
+            demanda_ewma=round(ewma, 4),
+            dias_cobertura=None if sin_dato else round(cobertura, 2),
+            fecha_agotamiento=fecha,
+            calculado=ahora,
+        )
+
+
+@transaction.atomic
+def actualizar(hoy=None, **parametros) -> int:
+    """Recalcula y reemplaza la tabla de proyecciones. Devuelve cuántas filas guardó."""
+    hoy = hoy or timezone.localdate()
+    resultado = calcular(hoy, **parametros)
+    Proyeccion_Agotamiento.objects.all().delete()
+    Proyeccion_Agotamiento.objects.bulk_create(
+        _filas(resultado, hoy, timezone.now()), batch_size=LOTE_INSERCION
+    )
+    contadores.invalidar()
+    return len(resultado["ids"])
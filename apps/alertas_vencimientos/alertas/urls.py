@@ -5,9 +5,13 @@ app_name = "alertas"
 
 urlpatterns = [
     path("", views.alertas_dashboard, name="alertas_dashboard"),
+    path("contadores/", views.alertas_contadores, name="alertas_contadores"),
+    path("eventos/", views.alertas_eventos, name="alertas_eventos"),
     path("stock_bajo/", views.alertas_stock_bajo, name="alertas_stock_bajo"),
     path("proximos_vencer/", views.alertas_proximos_vencer, name="alertas_proximos_vencer"),
     path("vencidos/", views.alertas_vencidos, name="alertas_vencidos"),
     path("agotamiento/", views.alertas_agotamiento, name="alertas_agotamiento"),
+    path("perdidas/", views.alertas_perdidas_api, name="alertas_perdidas_api"),
+    path("perdidas/pdf/", views.alertas_perdidas_pdf, name="alertas_perdidas_pdf"),
     path("actualizar-estados/", views.ejecutar_actualizar_estados_lotes, name="actualizar_estados_lotes"),
 ]
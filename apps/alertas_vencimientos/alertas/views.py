@@ -1,17 +1,20 @@
 import logging
-from datetime import timedelta
 from io import StringIO
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import F, Sum, Value
-from django.db.models.functions import Coalesce
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.core.management import call_command
+from django.db.models import Count, F, Q, Sum
 
-from apps.inventario.models import Productos, Lotes
+from apps.alertas_vencimientos.models import Proyeccion_Agotamiento, Proyeccion_Vencimiento_Lote
+from apps.inventario.models import Lotes
+from apps.inventario.resumen_stock import productos_con_stock
+from apps.inventario.stock.exportar import tabla_pdf
+from farmacia.paginacion import leer_limite, leer_orden, paginar_keyset
+from . import contadores, eventos
 
 logger = logging.getLogger(__name__)
 
@@ -21,46 +24,50 @@ logger = logging.getLogger(__name__)
 # -----------------------------------------------------------
 @login_required
 def alertas_dashboard(request):
-    hoy = timezone.now().date()
+    # Los cuatro contadores salen de una sola consulta cacheada (contadores.py)
+    contexto = contadores.conteos()
+    contexto["proyeccion"] = contadores.estado_proyeccion()
+    return render(request, "alertas/lista.html", contexto)
 
-    stock_bajo_count = (
-        Productos.objects
-        .annotate(stock_total=Coalesce(Sum('lotes__cantidad_disponible'), Value(0)))
-        .filter(stock_minimo__gt=0, stock_total__lte=F('stock_minimo'))
-        .count()
-    )
 
-    proximos_vencer_count = (
-        Lotes.objects
-        .filter(fecha_caducidad__range=[hoy, hoy + timedelta(days=30)], cantidad_disponible__gt=0)
-        .count()
-    )
+@login_required
+def alertas_contadores(request):
+    """Contadores en JSON para el indicador del menú (se consulta periódicamente)."""
+    datos = contadores.conteos()
+    datos["total"] = sum(datos.values())
+    return JsonResponse(datos)
 
-    vencidos_count = (
-        Lotes.objects
-        .filter(fecha_caducidad__lt=hoy, cantidad_disponible__gt=0)
-        .count()
-    )
 
-    agotamiento_count = _qs_agotamiento().count()
+@login_required
+def alertas_eventos(request):
+    """
+    Flujo SSE de la pantalla de alertas: envía los contadores cada vez que un
+    cambio de stock se confirma. Ver eventos.py para los requisitos del worker.
+    """
+    suscripcion = eventos.abrir()
+    if suscripcion is None:
+        respuesta = JsonResponse(
+            {"success": False, "error": "Demasiadas conexiones en vivo; se usará la consulta periódica."},
+            status=503,
+        )
+        respuesta["Retry-After"] = str(eventos.DURACION_SEGUNDOS)
+        return respuesta
+    respuesta = StreamingHttpResponse(suscripcion, content_type="text/event-stream")
+    respuesta["Cache-Control"] = "no-cache"
+    respuesta["X-Accel-Buffering"] = "no"  # sin buffer en nginx
+    return respuesta
 
-    return render(request, "alertas/lista.html", {
-        "stock_bajo": stock_bajo_count,
-        "proximos_vencer": proximos_vencer_count,
-        "vencidos": vencidos_count,
-        "agotamiento": agotamiento_count,
-    })
 # -----------------------------------------------------------
 # DETALLES DE CADA REPORTE (MODALES)
 # -----------------------------------------------------------
+# Los modales usan las mismas listas de ids cacheadas que el dashboard.
 
 @login_required
 def alertas_stock_bajo(request):
     # Productos cuyo stock_total <= stock_minimo (stock bajo)
     productos = (
-        Productos.objects
-        .annotate(stock_total=Coalesce(Sum('lotes__cantidad_disponible'), Value(0)))
-        .filter(stock_minimo__isnull=False, stock_minimo__gt=0, stock_total__lte=F('stock_minimo'))
+        productos_con_stock()
+        .filter(id__in=contadores.obtener()["stock_bajo"])
         .select_related('id_unidad_medida', 'id_presentacion')
     )
 
@@ -68,11 +75,11 @@ def alertas_stock_bajo(request):
     
 @login_required
 def alertas_proximos_vencer(request):
-    hoy = timezone.now().date()
+    hoy = timezone.localdate()
     lotes = (
         Lotes.objects
         .select_related('id_producto')
-        .filter(fecha_caducidad__range=[hoy, hoy + timedelta(days=30)], cantidad_disponible__gt=0)
+        .filter(id__in=contadores.obtener(hoy)["proximos_vencer"])
         .order_by('fecha_caducidad')
     )
 
@@ -89,45 +96,127 @@ def alertas_proximos_vencer(request):
 
 def _qs_agotamiento():
     """
-    Productos cuyo stock_total <= 1.5 * stock_minimo.
-    - stock_total = suma de lotes disponibles (coalesce a 0)
-    - sólo considera productos con stock_minimo > 0
+    Proyecciones de los productos que se agotan dentro de ALERTAS_AGOTAMIENTO_DIAS
+    (ids desde contadores.py), ordenadas por fecha estimada de agotamiento.
+    La demanda y la fecha vienen ya calculadas (proyeccion.py, cada noche).
     """
     return (
-        Productos.objects
-        .annotate(
-            stock_total=Coalesce(Sum('lotes__cantidad_disponible'), Value(0)),
-        )
-        .filter(
-            stock_minimo__isnull=False,
-            stock_minimo__gt=0,
-            stock_total__lte=F('stock_minimo') * 2,
+        Proyeccion_Agotamiento.objects
+        .filter(id_producto_id__in=contadores.obtener()["agotamiento"])
+        .order_by("fecha_agotamiento", "id_producto_id")
+        .values(
+            "stock", "demanda_media", "demanda_ewma", "dias_cobertura",
+            "fecha_agotamiento", "calculado",
+            codigo_producto=F("id_producto__codigo_producto"),
+            nombre=F("id_producto__nombre"),
         )
-        .select_related('id_unidad_medida', 'id_presentacion')
     )
 
 
 @login_required
 def alertas_agotamiento(request):
-    """Devuelve el partial con los productos próximos a agotarse (misma lógica que alertas_stock_bajo)."""
-    productos = _qs_agotamiento()
-    # Calcular margen de agotamiento
-    for p in productos:
-        try:
-            p.margen_porcentaje = round((p.stock_total / p.stock_minimo) * 100, 1)
-        except ZeroDivisionError:
-            p.margen_porcentaje = 0
+    """Devuelve el partial con los productos próximos a agotarse según su ritmo de venta."""
+    productos = list(_qs_agotamiento())
+    return render(request, "alertas/partials/agotamiento.html", {
+        "productos": productos,
+        "proyeccion": contadores.estado_proyeccion(),
+    })
+
 
-    return render(request, "alertas/partials/agotamiento.html", {"productos": productos})
+# -----------------------------------------------------------
+# PÉRDIDA PROYECTADA POR VENCIMIENTO (perdidas.py, cada noche)
+# -----------------------------------------------------------
+ORDEN_PERDIDAS = {
+    "valor": "valor_perdida",
+    "perdida": "perdida",
+    "vencimiento": "id_lote__fecha_caducidad",
+}
+
+
+def _qs_perdidas(params):
+    """Lotes con pérdida proyectada; `q` filtra por código o nombre del producto."""
+    qs = Proyeccion_Vencimiento_Lote.objects.all()
+    q = (params.get("q") or "").strip()
+    if q:
+        qs = qs.filter(
+            Q(id_lote__id_producto__codigo_producto__icontains=q)
+            | Q(id_lote__id_producto__nombre__icontains=q)
+        )
+    return qs
+
+
+def _filas_perdidas(qs):
+    return qs.values(
+        "id", "cantidad", "vendible", "perdida", "valor_perdida", "calculado",
+        lote=F("id_lote__numero_lote"),
+        fecha_caducidad=F("id_lote__fecha_caducidad"),
+        codigo=F("id_lote__id_producto__codigo_producto"),
+        producto=F("id_lote__id_producto__nombre"),
+    )
+
+
+@login_required
+def alertas_perdidas_api(request):
+    """Lotes que vencerían sin venderse, paginados por cursor (?orden=-valor por defecto)."""
+    qs = _qs_perdidas(request.GET)
+    campo, descendente = leer_orden(request.GET.get("orden"), ORDEN_PERDIDAS, "-valor")
+    despues, antes = request.GET.get("despues"), request.GET.get("antes")
+    filas, siguiente, anterior = paginar_keyset(
+        _filas_perdidas(qs), campo, descendente, despues, antes, leer_limite(request.GET.get("limite"))
+    )
+    resultados = [
+        {**f, "valor_perdida": str(f["valor_perdida"]), "calculado": timezone.localtime(f["calculado"]).strftime("%Y-%m-%d %H:%M")}
+        for f in filas
+    ]
+    respuesta = {"results": resultados, "siguiente": siguiente, "anterior": anterior}
+    if not (despues or antes):
+        respuesta["total"] = qs.aggregate(
+            lotes=Count("id"), unidades=Sum("perdida"), valor=Sum("valor_perdida")
+        )
+        respuesta["total"]["valor"] = str(respuesta["total"]["valor"] or 0)
+    return JsonResponse(respuesta)
+
+
+@login_required
+def alertas_perdidas_pdf(request):
+    """PDF de los lotes con pérdida; se dibuja por páginas (ver stock/exportar.py)."""
+    qs = _qs_perdidas(request.GET)
+    campo, descendente = leer_orden(request.GET.get("orden"), ORDEN_PERDIDAS, "-valor")
+    filas = _filas_perdidas(qs).order_by(f"-{campo}" if descendente else campo, "id")
+    calculado = qs.values_list("calculado", flat=True).first()
+
+    def renglones():
+        unidades, valor = 0, 0
+        for f in filas.iterator(chunk_size=2000):
+            unidades += f["perdida"]
+            valor += f["valor_perdida"]
+            yield [
+                f["codigo"], f["producto"], f["lote"], f["fecha_caducidad"].strftime("%d/%m/%Y"),
+                str(f["cantidad"]), str(f["vendible"]), str(f["perdida"]), f"{f['valor_perdida']:,.2f}",
+            ]
+        yield ["", "Total", "", "", "", "", str(unidades), f"{valor:,.2f}"]
+
+    nota = "Proyección calculada el " + (
+        timezone.localtime(calculado).strftime("%d/%m/%Y %H:%M") if calculado else "— (sin datos)"
+    ) + ": consumo FEFO al ritmo de venta de cada producto."
+    archivo = tabla_pdf(
+        renglones(),
+        ["Código", "Producto", "Lote", "Vence", "Disponible", "Se venderían", "Vencerían", "Valor (Q)"],
+        ratios=[0.10, 0.30, 0.11, 0.09, 0.09, 0.11, 0.09, 0.11],
+        titulo="Pérdida proyectada por vencimiento · SAIF",
+        alineaciones=[("ALIGN", (3, 1), (6, -1), "CENTER"), ("ALIGN", (7, 1), (7, -1), "RIGHT")],
+        nota=nota,
+    )
+    return FileResponse(archivo, as_attachment=True, filename="perdida_vencimiento.pdf",
+                        content_type="application/pdf")
 
 
 @login_required
 def alertas_vencidos(request):
-    hoy = timezone.now().date()
     lotes = (
         Lotes.objects
         .select_related('id_producto')
-        .filter(fecha_caducidad__lt=hoy, cantidad_disponible__gt=0)
+        .filter(id__in=contadores.obtener()["vencidos"])
         .order_by('-fecha_caducidad')
     )
     return render(request, "alertas/partials/vencidos.html", {"lotes": lotes})
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AlertasvencimientosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.alertas_vencimientos'
+
+    def ready(self):
+        # invalidación de los contadores de alertas (alertas/contadores.py)
+        from . import signals  # noqa: F401
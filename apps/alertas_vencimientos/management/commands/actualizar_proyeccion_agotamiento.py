@@ -0,0 +1,49 @@
+# apps/alertas_vencimientos/management/commands/actualizar_proyeccion_agotamiento.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.alertas_vencimientos.alertas import perdidas, proyeccion
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula la demanda diaria, los días de cobertura y la fecha estimada "
+        "de agotamiento de todos los productos activos, y con esa demanda las "
+        "unidades de cada lote que vencerían sin venderse. Pensado para correr "
+        "cada noche (cron), después de cerrar las ventas del día."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias-historial", type=int, default=proyeccion.DIAS_HISTORIAL,
+            help="Días de ventas y devoluciones que se cargan.",
+        )
+        parser.add_argument(
+            "--dias-media", type=int, default=proyeccion.DIAS_MEDIA,
+            help="Ventana de la media móvil.",
+        )
+        parser.add_argument(
+            "--alfa", type=float, default=proyeccion.ALFA,
+            help="Factor de la media exponencial (0-1); más alto da más peso a los últimos días.",
+        )
+
+    def handle(self, *args, **options):
+        if options["dias_historial"] < 1 or options["dias_media"] < 1:
+            raise CommandError("Los parámetros de días deben ser mayores que cero.")
+        if not 0 < options["alfa"] <= 1:
+            raise CommandError("--alfa debe estar entre 0 y 1.")
+
+        inicio = time.perf_counter()
+        total = proyeccion.actualizar(
+            dias_historial=options["dias_historial"],
+            dias_media=options["dias_media"],
+            alfa=options["alfa"],
+        )
+        # usa la demanda recién guardada
+        lotes = perdidas.actualizar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Proyección de agotamiento actualizada: {total} productos, "
+            f"{lotes} lotes con pérdida por vencimiento "
+            f"en {time.perf_counter() - inicio:.1f} s."
+        ))
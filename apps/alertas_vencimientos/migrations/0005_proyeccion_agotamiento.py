@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas_vencimientos', '0004_delete_alertas_inventario'),
+        ('inventario', '0009_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Proyeccion_Agotamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField(default=0)),
+                ('demanda_media', models.FloatField(default=0)),
+                ('demanda_ewma', models.FloatField(default=0)),
+                ('dias_cobertura', models.FloatField(blank=True, null=True)),
+                ('fecha_agotamiento', models.DateField(blank=True, db_index=True, null=True)),
+                ('calculado', models.DateTimeField()),
+                ('id_producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='proyeccion_agotamiento', to='inventario.productos')),
+            ],
+            options={
+                'verbose_name': 'Proyección de Agotamiento',
+                'verbose_name_plural': 'Proyecciones de Agotamiento',
+            },
+        ),
+    ]
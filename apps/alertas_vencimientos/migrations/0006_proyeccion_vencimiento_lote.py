@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas_vencimientos', '0005_proyeccion_agotamiento'),
+        ('inventario', '0009_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Proyeccion_Vencimiento_Lote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(default=0)),
+                ('vendible', models.IntegerField(default=0)),
+                ('perdida', models.IntegerField(default=0)),
+                ('valor_perdida', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('calculado', models.DateTimeField()),
+                ('id_lote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='proyeccion_vencimiento', to='inventario.lotes')),
+            ],
+            options={
+                'verbose_name': 'Proyección de Vencimiento por Lote',
+                'verbose_name_plural': 'Proyecciones de Vencimiento por Lote',
+            },
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.db import models
 from apps.mantenimiento.models import Estado_Vencimiento
 from apps.mantenimiento.usuarios.models import Usuario
-from apps.inventario.models import Lotes
+from apps.inventario.models import Lotes, Productos
 
 # Create your models here.
 class Reportes_Vencimiento(models.Model):
@@ -34,3 +34,49 @@ class Detalle_Reporte_Vencimiento(models.Model):
     class Meta:
         verbose_name = 'Detalle de Reporte de Vencimiento'
         verbose_name_plural = 'Detalles de Reporte de Vencimiento'
+
+
+class Proyeccion_Agotamiento(models.Model):
+    """Demanda y fecha estimada de agotamiento por producto (una fila por producto).
+
+    La recalcula cada noche el comando `actualizar_proyeccion_agotamiento`
+    (ver apps/alertas_vencimientos/alertas/proyeccion.py); la alerta de
+    "próximos a agotarse" lee de aquí.
+    """
+    id_producto = models.OneToOneField(Productos, on_delete=models.CASCADE, related_name='proyeccion_agotamiento')
+
+    stock = models.IntegerField(default=0)                         # stock vigente al calcular
+    demanda_media = models.FloatField(default=0)                   # unidades/día, media móvil
+    demanda_ewma = models.FloatField(default=0)                    # unidades/día, media exponencial
+    dias_cobertura = models.FloatField(null=True, blank=True)      # stock / demanda_ewma
+    fecha_agotamiento = models.DateField(null=True, blank=True, db_index=True)
+    calculado = models.DateTimeField()
+
+    def __str__(self):
+        return f'Proyección {self.id_producto_id}: {self.fecha_agotamiento}'
+
+    class Meta:
+        verbose_name = 'Proyección de Agotamiento'
+        verbose_name_plural = 'Proyecciones de Agotamiento'
+
+
+class Proyeccion_Vencimiento_Lote(models.Model):
+    """Unidades de un lote que se espera que venzan sin venderse (solo lotes con pérdida).
+
+    Se recalcula cada noche junto con `Proyeccion_Agotamiento` (ver
+    apps/alertas_vencimientos/alertas/perdidas.py).
+    """
+    id_lote = models.OneToOneField(Lotes, on_delete=models.CASCADE, related_name='proyeccion_vencimiento')
+
+    cantidad = models.IntegerField(default=0)                          # disponible al calcular
+    vendible = models.IntegerField(default=0)                          # se venderían antes de vencer
+    perdida = models.IntegerField(default=0)                           # vencerían sin venderse
+    valor_perdida = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # perdida * precio_compra
+    calculado = models.DateTimeField()
+
+    def __str__(self):
+        return f'Pérdida lote {self.id_lote_id}: {self.perdida}'
+
+    class Meta:
+        verbose_name = 'Proyección de Vencimiento por Lote'
+        verbose_name_plural = 'Proyecciones de Vencimiento por Lote'
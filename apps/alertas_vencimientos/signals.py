@@ -0,0 +1,16 @@
+# apps/alertas_vencimientos/signals.py
+from django.db.models.signals import post_delete, post_save
+
+from apps.alertas_vencimientos.alertas.contadores import invalidar
+from apps.alertas_vencimientos.alertas.eventos import notificar_stock
+from apps.inventario.models import Lotes, Productos
+from apps.inventario.resumen_stock import stock_actualizado
+
+# Cambios de stock, stock mínimo o caducidad invalidan los contadores de alertas
+stock_actualizado.connect(invalidar, dispatch_uid="alertas_contadores_stock")
+for _modelo in (Productos, Lotes):
+    post_save.connect(invalidar, sender=_modelo, dispatch_uid=f"alertas_contadores_save_{_modelo.__name__}")
+    post_delete.connect(invalidar, sender=_modelo, dispatch_uid=f"alertas_contadores_delete_{_modelo.__name__}")
+
+# Después de invalidar (los on_commit corren en orden): avisa a los flujos SSE abiertos
+stock_actualizado.connect(notificar_stock, dispatch_uid="alertas_eventos_stock")
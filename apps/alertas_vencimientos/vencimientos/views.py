@@ -16,6 +16,12 @@ from django.template.loader import render_to_string
 from .forms import ReporteVencimientoForm
 from apps.alertas_vencimientos.models import Reportes_Vencimiento, Detalle_Reporte_Vencimiento
 from apps.inventario.models import Lotes, Productos
+from apps.inventario.resumen_stock import sincronizar_stock_productos
+from apps.inventario.reversos import bloquear_lotes_reverso, revertir_deltas
+from apps.inventario.estados_lote import estado_por_fecha, recalcular_transiciones
+from apps.inventario.busqueda import responder_busqueda
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.auditoria import bitacora
 from apps.mantenimiento.models import Estado_Vencimiento, Estado_Lote
 
 from io import BytesIO
@@ -39,13 +45,8 @@ TRANSICIONES = {
 }
 
 def _estado_lote_por_regla(lote, hoy, proximo_dias):
-    if lote.fecha_caducidad and lote.fecha_caducidad < hoy:
-        nombre = "Vencido"
-    elif lote.fecha_caducidad and (lote.fecha_caducidad - hoy).days <= proximo_dias:
-        nombre = "Próximo a Vencer"
-    else:
-        nombre = "Disponible"
-    return Estado_Lote.objects.only("id").get(nombre_estado=nombre).id
+    nombre = estado_por_fecha(lote.fecha_caducidad, hoy, proximo_dias) or "Disponible"
+    return catalogos.obtener_id(Estado_Lote, nombre)
 
 @login_required
 def reporte_cambiar_estado_modal(request, reporte_id):
@@ -84,18 +85,19 @@ def reporte_cambiar_estado(request, reporte_id):
         }, status=400)
 
     if nuevo_estado.nombre_estado == "Cancelado":
-        hoy = timezone.now().date()
-        id_devuelto = Estado_Lote.objects.only("id").get(nombre_estado="Devuelto").id
+        hoy = timezone.localdate()
+        id_devuelto = catalogos.obtener_id(Estado_Lote, "Devuelto")
 
-        detalles = (
+        detalles = list(
             Detalle_Reporte_Vencimiento.objects
-            .select_related("id_lote")
-            .select_for_update()
             .filter(id_reporte=reporte)
+            .only("id_lote_id", "cantidad_reportada")
         )
+        # Un solo SELECT ... FOR UPDATE de los lotes, en orden de id
+        lotes = bloquear_lotes_reverso(d.id_lote_id for d in detalles)
 
         for d in detalles:
-            lote = d.id_lote
+            lote = lotes[d.id_lote_id]
             if lote.id_estado_lote_id != id_devuelto or (lote.cantidad_disponible or 0) != 0:
                 return JsonResponse({
                     "success": False,
@@ -103,14 +105,24 @@ def reporte_cambiar_estado(request, reporte_id):
                              "no se puede cancelar automáticamente."
                 }, status=409)
 
-        for d in detalles:
-            lote = d.id_lote
-            lote.cantidad_disponible = d.cantidad_reportada
-            lote.id_estado_lote_id = _estado_lote_por_regla(lote, hoy, PROXIMO_DIAS)
-            lote.save(update_fields=["cantidad_disponible", "id_estado_lote"])
+        # Los lotes están en 0: restaurar lo reportado es sumar cantidad_reportada
+        revertir_deltas(
+            {d.id_lote_id: int(d.cantidad_reportada or 0) for d in detalles},
+            lotes=lotes, validar=False, sincronizar=False,
+        )
+
+        # Estado por fecha: un UPDATE por estado resultante
+        por_estado = {}
+        for lote in lotes.values():
+            por_estado.setdefault(_estado_lote_por_regla(lote, hoy, PROXIMO_DIAS), []).append(lote.id)
+        for estado_id, ids in por_estado.items():
+            Lotes.objects.filter(id__in=ids).update(id_estado_lote_id=estado_id)
+        recalcular_transiciones(Lotes.objects.filter(id__in=lotes.keys()), hoy)
+        sincronizar_stock_productos({l.id_producto_id for l in lotes.values()})
 
     reporte.id_estado = nuevo_estado
     reporte.save(update_fields=["id_estado"])
+    bitacora.registrar(f"Reporte de vencimiento {reporte.documento}: {nuevo_estado.nombre_estado}", reporte)
     return JsonResponse({"success": True})
 
 
@@ -158,7 +170,7 @@ def reporte_vencimiento_create(request):
         documento = form_data.get("documento", f"Reporte Vencimiento - {fecha_reporte}")
 
         # Estado del reporte: “Vencido”
-        estado_inicial = Estado_Vencimiento.objects.get(nombre_estado="Completado")
+        estado_inicial = catalogos.obtener(Estado_Vencimiento, "Completado")
 
         # Crear cabecera del reporte
         reporte = Reportes_Vencimiento.objects.create(
@@ -174,11 +186,12 @@ def reporte_vencimiento_create(request):
         # Obtener el estado "Retirado" desde la tabla de Estado_Lote
         from apps.mantenimiento.models import Estado_Lote  # Importar dentro para evitar dependencia circular
         try:
-            estado_devuelto = Estado_Lote.objects.get(nombre_estado="Devuelto")
+            estado_devuelto = catalogos.obtener(Estado_Lote, "Devuelto")
         except Estado_Lote.DoesNotExist:
             raise ValueError("No existe el estado 'Devuelto' en la tabla de Estado_Lote.")
 
         # Procesar cada detalle
+        productos_afectados = set()
         for idx, det in enumerate(detalles_data, start=1):
             lote_id = det.get("lote_id")
             if not lote_id:
@@ -212,7 +225,10 @@ def reporte_vencimiento_create(request):
                 id_lote=lote,
                 cantidad_reportada=cantidad_retirada
             )
+            productos_afectados.add(lote.id_producto_id)
 
+        sincronizar_stock_productos(productos_afectados)
+        bitacora.registrar(f"Retiro por vencimiento {reporte.documento}", reporte)
         return JsonResponse({"success": True, "reporte_id": reporte.id})
 
     except ValueError as e:
@@ -249,7 +265,6 @@ def reporte_vencimiento_detail(request, reporte_id):
 # -----------------------------------------------------------
 @login_required
 def search_productos(request):
-    term = request.GET.get("term", "").strip()
     hoy = timezone.now().date()
 
     vencidos_qs = Lotes.objects.filter(
@@ -258,36 +273,8 @@ def search_productos(request):
         cantidad_disponible__gt=0
     )
 
-    productos = (
-        Productos.objects
-        .annotate(tiene_vencidos=Exists(vencidos_qs))
-        .filter(
-            Q(nombre__icontains=term) | Q(codigo_producto__icontains=term),
-            tiene_vencidos=True, # <-- Ahora es el segundo argumento (keyword)
-        )
-        .select_related(
-            "id_presentacion",
-            "id_unidad_medida",
-            "id_condicion_almacenamiento"
-        )
-        .order_by("nombre")[:20]
-    )
-
-    results = [
-        {
-            "id": p.id,
-            "codigo": p.codigo_producto,
-            "nombre": p.nombre,
-            "descripcion": p.descripcion or "",
-            "presentacion": str(p.id_presentacion) if p.id_presentacion_id else "",
-            "unidad": str(p.id_unidad_medida) if p.id_unidad_medida_id else "",
-            "condicion": str(p.id_condicion_almacenamiento) if p.id_condicion_almacenamiento_id else "",
-            "receta": bool(p.requiere_receta),
-            "controlado": bool(p.es_controlado),
-        }
-        for p in productos
-    ]
-    return JsonResponse(results, safe=False)
+    con_vencidos = Productos.objects.filter(Exists(vencidos_qs))
+    return responder_busqueda(request, con_vencidos)
 
 
 # -----------------------------------------------------------
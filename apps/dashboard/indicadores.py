@@ -0,0 +1,208 @@
+# apps/dashboard/indicadores.py
+"""
+Indicadores (KPI) del dashboard principal.
+
+Dos fuentes, ambas ya resumidas:
+
+- `Indicador_Inventario`: una foto por día con el valor del inventario (a
+  costo y a precio de venta), lo que vence en 30/60/90 días, los productos
+  agotados y los más vendidos. La genera `refrescar()` desde el comando
+  `actualizar_indicadores` (cron); son tres consultas agregadas.
+- `Resumen_Diario_Movimiento` (apps.inventario.resumen_diario), que las
+  transacciones mantienen al día, para las unidades vendidas y recibidas.
+
+Cada widget tiene su propio endpoint JSON y su propia entrada en la caché
+(`widget(nombre)`), así que la página se pinta sin esperar ninguna consulta y
+cada tarjeta se llena por separado.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.dashboard.models import Indicador_Inventario
+from apps.inventario.models import Lotes, Resumen_Diario_Movimiento
+from apps.inventario.resumen_diario import etiqueta_tipo, serie_movimientos
+from apps.inventario.resumen_stock import productos_con_stock
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Producto
+
+CACHE_SEGUNDOS = getattr(settings, "DASHBOARD_CACHE_SEGUNDOS", 120)
+DIAS_VENCE = (30, 60, 90)
+DIAS_SERIE = 30         # días de la gráfica de unidades y del ranking de más vendidos
+MAX_LISTA = 10
+
+
+def _clave(nombre: str) -> str:
+    return f"saif:dashboard:{nombre}"
+
+
+def _dinero(campo):
+    return Coalesce(
+        Sum(F("cantidad_disponible") * Coalesce(campo, Value(Decimal("0"))), output_field=DecimalField()),
+        Value(Decimal("0")),
+        output_field=DecimalField(),
+    )
+
+
+# ---------------------------------------------------------------
+# Foto diaria (job programado)
+# ---------------------------------------------------------------
+def _valores_lotes(hoy) -> dict:
+    """Unidades y valor del inventario, y lo que vence en 30/60/90 días: una consulta."""
+    agregados = {
+        "unidades": Coalesce(Sum("cantidad_disponible"), 0),
+        "valor_costo": _dinero("precio_compra"),
+        "valor_venta": _dinero("precio_venta"),
+    }
+    for dias in DIAS_VENCE:
+        ventana = Q(fecha_caducidad__gte=hoy, fecha_caducidad__lte=hoy + timedelta(days=dias))
+        agregados[f"unidades_vence_{dias}"] = Coalesce(Sum("cantidad_disponible", filter=ventana), 0)
+        agregados[f"valor_vence_{dias}"] = Coalesce(
+            Sum(F("cantidad_disponible") * Coalesce("precio_compra", Value(Decimal("0"))),
+                filter=ventana, output_field=DecimalField()),
+            Value(Decimal("0")),
+            output_field=DecimalField(),
+        )
+    return Lotes.objects.filter(cantidad_disponible__gt=0).aggregate(**agregados)
+
+
+def _agotados():
+    """Productos activos sin stock (según el resumen StockProducto)."""
+    qs = productos_con_stock().filter(stock_total__lte=0)
+    try:
+        qs = qs.exclude(id_estado_producto_id=catalogos.obtener_id(Estado_Producto, "Inactivo"))
+    except Estado_Producto.DoesNotExist:
+        pass
+    lista = [
+        {"id": p["id"], "codigo": p["codigo_producto"], "nombre": p["nombre"]}
+        for p in qs.order_by("nombre").values("id", "codigo_producto", "nombre")[:MAX_LISTA]
+    ]
+    return qs.count(), lista
+
+
+def _top_movimiento(hoy) -> list:
+    """Productos con más unidades vendidas en los últimos DIAS_SERIE días (del resumen diario)."""
+    filas = (
+        Resumen_Diario_Movimiento.objects
+        .filter(fecha__gt=hoy - timedelta(days=DIAS_SERIE), fecha__lte=hoy, tipo=etiqueta_tipo("VEN"))
+        .values("id_producto_id", "id_producto__codigo_producto", "id_producto__nombre")
+        .annotate(unidades=Sum("salidas"))
+        .filter(unidades__gt=0)
+        .order_by("-unidades", "id_producto__nombre")[:MAX_LISTA]
+    )
+    return [
+        {
+            "id": f["id_producto_id"],
+            "codigo": f["id_producto__codigo_producto"],
+            "nombre": f["id_producto__nombre"],
+            "unidades": int(f["unidades"]),
+        }
+        for f in filas
+    ]
+
+
+def refrescar(hoy=None) -> Indicador_Inventario:
+    """Calcula y guarda la foto del día (upsert) y descarta los widgets cacheados."""
+    hoy = hoy or timezone.localdate()
+    valores = _valores_lotes(hoy)
+    productos_agotados, agotados = _agotados()
+    foto, _ = Indicador_Inventario.objects.update_or_create(
+        fecha=hoy,
+        defaults={
+            **valores,
+            "productos_agotados": productos_agotados,
+            "agotados": agotados,
+            "top_movimiento": _top_movimiento(hoy),
+        },
+    )
+    cache.delete_many([_clave(n) for n in WIDGETS])
+    return foto
+
+
+def ultima_foto() -> Indicador_Inventario:
+    """La foto más reciente; si todavía no hay ninguna se genera una."""
+    return Indicador_Inventario.objects.order_by("-fecha").first() or refrescar()
+
+
+# ---------------------------------------------------------------
+# Widgets
+# ---------------------------------------------------------------
+def _meta(foto) -> dict:
+    return {"fecha": foto.fecha.isoformat(), "calculado": timezone.localtime(foto.calculado).isoformat()}
+
+
+def widget_unidades() -> dict:
+    """Unidades vendidas, recibidas y devueltas por día (últimos DIAS_SERIE días)."""
+    hoy = timezone.localdate()
+    serie = serie_movimientos(hoy - timedelta(days=DIAS_SERIE - 1), hoy)
+    vacia = {"entradas": [0] * len(serie["dias"]), "salidas": [0] * len(serie["dias"])}
+
+    def _de(codigo):
+        return serie["series"].get(etiqueta_tipo(codigo), vacia)
+
+    return {
+        "labels": [d.strftime("%d/%m") for d in serie["dias"]],
+        "vendidas": _de("VEN")["salidas"],
+        "recibidas": _de("REC")["entradas"],
+        "devueltas": _de("DEV")["entradas"],
+    }
+
+
+def widget_valor() -> dict:
+    foto = ultima_foto()
+    return {
+        **_meta(foto),
+        "unidades": foto.unidades,
+        "valor_costo": float(foto.valor_costo),
+        "valor_venta": float(foto.valor_venta),
+        "margen": float(foto.valor_venta - foto.valor_costo),
+    }
+
+
+def widget_vencimientos() -> dict:
+    foto = ultima_foto()
+    return {
+        **_meta(foto),
+        "ventanas": [
+            {
+                "dias": dias,
+                "unidades": getattr(foto, f"unidades_vence_{dias}"),
+                "valor_costo": float(getattr(foto, f"valor_vence_{dias}")),
+            }
+            for dias in DIAS_VENCE
+        ],
+    }
+
+
+def widget_top() -> dict:
+    foto = ultima_foto()
+    return {**_meta(foto), "dias": DIAS_SERIE, "productos": foto.top_movimiento}
+
+
+def widget_agotados() -> dict:
+    foto = ultima_foto()
+    return {**_meta(foto), "total": foto.productos_agotados, "productos": foto.agotados}
+
+
+WIDGETS = {
+    "unidades": widget_unidades,
+    "valor": widget_valor,
+    "vencimientos": widget_vencimientos,
+    "top": widget_top,
+    "agotados": widget_agotados,
+}
+
+
+def widget(nombre: str) -> dict:
+    """Datos del widget desde la caché (los calcula si no están). KeyError si no existe."""
+    calcular = WIDGETS[nombre]
+    datos = cache.get(_clave(nombre))
+    if datos is None:
+        datos = calcular()
+        cache.set(_clave(nombre), datos, CACHE_SEGUNDOS)
+    return datos
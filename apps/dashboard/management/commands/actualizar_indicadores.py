@@ -0,0 +1,18 @@
+# apps/dashboard/management/commands/actualizar_indicadores.py
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.indicadores import refrescar
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera la foto del día de los indicadores del dashboard (valor del inventario, "
+        "vencimientos, agotados y más vendidos). Pensado para correr cada hora (cron)."
+    )
+
+    def handle(self, *args, **options):
+        foto = refrescar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indicadores {foto.fecha}: valor_costo={foto.valor_costo}, valor_venta={foto.valor_venta}, "
+            f"agotados={foto.productos_agotados}, mas_vendidos={len(foto.top_movimiento)}"
+        ))
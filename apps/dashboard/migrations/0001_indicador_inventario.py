@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Indicador_Inventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('unidades', models.IntegerField(default=0)),
+                ('valor_costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_venta', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_vence_30', models.IntegerField(default=0)),
+                ('unidades_vence_60', models.IntegerField(default=0)),
+                ('unidades_vence_90', models.IntegerField(default=0)),
+                ('valor_vence_30', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_vence_60', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_vence_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('productos_agotados', models.IntegerField(default=0)),
+                ('agotados', models.JSONField(default=list)),
+                ('top_movimiento', models.JSONField(default=list)),
+                ('calculado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Indicador de Inventario',
+                'verbose_name_plural': 'Indicadores de Inventario',
+            },
+        ),
+    ]
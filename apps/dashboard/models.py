@@ -1,3 +1,36 @@
 from django.db import models
 
-# Create your models here.
+
+class Indicador_Inventario(models.Model):
+    """Foto diaria de los indicadores del dashboard (una fila por día).
+
+    La escribe el comando `actualizar_indicadores` (cron) con unas pocas
+    consultas agregadas; los widgets del dashboard leen la última fila en
+    lugar de recorrer lotes y movimientos (ver `apps.dashboard.indicadores`).
+    """
+    fecha = models.DateField(unique=True)
+
+    unidades = models.IntegerField(default=0)
+    valor_costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    valor_venta = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Valor a costo de lo que vence en los próximos 30 / 60 / 90 días (acumulado)
+    unidades_vence_30 = models.IntegerField(default=0)
+    unidades_vence_60 = models.IntegerField(default=0)
+    unidades_vence_90 = models.IntegerField(default=0)
+    valor_vence_30 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    valor_vence_60 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    valor_vence_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    productos_agotados = models.IntegerField(default=0)
+    agotados = models.JSONField(default=list)         # [{id, codigo, nombre}] (los primeros)
+    top_movimiento = models.JSONField(default=list)   # [{id, codigo, nombre, unidades}] vendidos en 30 días
+
+    calculado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Indicadores {self.fecha}'
+
+    class Meta:
+        verbose_name = 'Indicador de Inventario'
+        verbose_name_plural = 'Indicadores de Inventario'
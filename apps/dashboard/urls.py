@@ -5,4 +5,5 @@ app_name = "dashboard"
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("kpi/<str:widget>/", views.kpi_widget, name="kpi_widget"),
 ]
@@ -1,6 +1,20 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import JsonResponse
+
+from apps.dashboard import indicadores
+
 
 def index(request):
-    return render(request, "dashboard/index.html")
\ No newline at end of file
+    # Sin consultas: cada widget se llena desde su propio endpoint (kpi/<widget>/)
+    return render(request, "dashboard/index.html", {"widgets": list(indicadores.WIDGETS)})
+
+
+@login_required
+def kpi_widget(request, widget):
+    """Datos de un widget del dashboard (cacheados; ver apps.dashboard.indicadores)."""
+    try:
+        datos = indicadores.widget(widget)
+    except KeyError:
+        return JsonResponse({"success": False, "error": "Indicador no válido."}, status=404)
+    return JsonResponse({"success": True, **datos})
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Lotes, Productos 
+from .models import Lotes, Productos, StockProducto
 
 # Register your models here.
 admin.site.register(Lotes)
 admin.site.register(Productos)
+admin.site.register(StockProducto)
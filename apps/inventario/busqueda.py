@@ -0,0 +1,160 @@
+# apps/inventario/busqueda.py
+"""
+Búsqueda de productos para los autocompletados.
+
+En PostgreSQL con `pg_trgm` y `unaccent` (migración 0006) se filtra sobre
+`saif_unaccent(lower(nombre))` / `saif_unaccent(lower(codigo_producto))`,
+que tienen índices GIN de trigramas, y se ordena por: código exacto, prefijo
+de código, prefijo de nombre y luego similitud. Si las extensiones no están
+(otra base de datos o un servidor sin contrib) se usa una expresión regular
+sin acentos y el orden se calcula en Python.
+
+`responder_busqueda` es la respuesta JSON común de los endpoints de
+autocompletado: cada vista solo pasa su queryset base.
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from django.db import connection
+from django.db.models import Case, FloatField, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from django.http import JsonResponse
+
+from apps.inventario.models import Productos
+
+LIMITE_POR_DEFECTO = 20
+# Con menos letras los trigramas no sirven; se busca solo por prefijo
+MIN_TRIGRAMA = 3
+
+_soporte_trigramas = None
+
+_VOCALES = {
+    "a": "aáàäâ", "e": "eéèëê", "i": "iíìïî",
+    "o": "oóòöô", "u": "uúùüû", "n": "nñ", "c": "cç",
+}
+
+
+class SaifUnaccent(Func):
+    """Envoltura IMMUTABLE de unaccent creada en la migración 0006."""
+    function = "saif_unaccent"
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin acentos y con espacios simples."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return " ".join(texto.lower().split())
+
+
+def usa_trigramas() -> bool:
+    """True si la base tiene pg_trgm y la función saif_unaccent (se consulta una vez)."""
+    global _soporte_trigramas
+    if _soporte_trigramas is None:
+        if connection.vendor != "postgresql":
+            _soporte_trigramas = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT to_regprocedure('saif_unaccent(text)') IS NOT NULL "
+                    "AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+                )
+                _soporte_trigramas = bool(cursor.fetchone()[0])
+    return _soporte_trigramas
+
+
+def _buscar_trigramas(qs, termino, limite):
+    qs = qs.annotate(
+        busq_nombre=SaifUnaccent(Lower("nombre")),
+        busq_codigo=SaifUnaccent(Lower("codigo_producto")),
+    )
+    if len(termino) >= MIN_TRIGRAMA:
+        qs = qs.filter(Q(busq_nombre__contains=termino) | Q(busq_codigo__contains=termino))
+    else:
+        qs = qs.filter(Q(busq_nombre__startswith=termino) | Q(busq_codigo__startswith=termino))
+
+    return list(
+        qs.annotate(
+            busq_rango=Case(
+                When(busq_codigo=termino, then=Value(0)),
+                When(busq_codigo__startswith=termino, then=Value(1)),
+                When(busq_nombre__startswith=termino, then=Value(2)),
+                default=Value(3),
+                output_field=IntegerField(),
+            ),
+            busq_similitud=Func(
+                "busq_nombre", Value(termino), function="similarity", output_field=FloatField()
+            ),
+        )
+        .order_by("busq_rango", "-busq_similitud", "nombre", "id")[:limite]
+    )
+
+
+def _patron_sin_acentos(termino: str) -> str:
+    return "".join(
+        f"[{_VOCALES[ch]}]" if ch in _VOCALES else re.escape(ch) for ch in termino
+    )
+
+
+def _buscar_fallback(qs, termino, limite):
+    patron = _patron_sin_acentos(termino)
+    if len(termino) < MIN_TRIGRAMA:
+        patron = "^" + patron
+    candidatos = list(
+        qs.filter(Q(nombre__iregex=patron) | Q(codigo_producto__iregex=patron))
+        .order_by("nombre", "id")[: limite * 10]
+    )
+
+    def clave(p):
+        nombre, codigo = normalizar(p.nombre), normalizar(p.codigo_producto)
+        if codigo == termino:
+            rango = 0
+        elif codigo.startswith(termino):
+            rango = 1
+        elif nombre.startswith(termino):
+            rango = 2
+        else:
+            rango = 3
+        return rango, -SequenceMatcher(None, nombre, termino).ratio(), nombre, p.id
+
+    return sorted(candidatos, key=clave)[:limite]
+
+
+def buscar_productos(termino: str, qs=None, limite: int = LIMITE_POR_DEFECTO) -> list:
+    """
+    Productos que coinciden con `termino` (nombre o código, sin importar
+    acentos ni mayúsculas), del más al menos relevante. `qs` permite
+    restringir la base (solo activos, con lotes vencidos, etc.).
+    """
+    if qs is None:
+        qs = Productos.objects.all()
+    termino = normalizar(termino)
+    if not termino:
+        return list(qs.order_by("nombre", "id")[:limite])
+    if usa_trigramas():
+        return _buscar_trigramas(qs, termino, limite)
+    return _buscar_fallback(qs, termino, limite)
+
+
+def producto_a_dict(p) -> dict:
+    """Formato común de las respuestas de autocompletado."""
+    return {
+        "id": p.id,
+        "codigo": p.codigo_producto,
+        "nombre": p.nombre,
+        "descripcion": p.descripcion or "",
+        # usa __str__ de cada FK; si es NULL, devuelve ""
+        "presentacion": str(p.id_presentacion) if p.id_presentacion_id else "",
+        "unidad": str(p.id_unidad_medida) if p.id_unidad_medida_id else "",
+        "condicion": str(p.id_condicion_almacenamiento) if p.id_condicion_almacenamiento_id else "",
+        "receta": bool(p.requiere_receta),
+        "controlado": bool(p.es_controlado),
+    }
+
+
+def responder_busqueda(request, base_qs=None, limite: int = LIMITE_POR_DEFECTO) -> JsonResponse:
+    """Autocompletado ?term= (o ?q=) sobre `base_qs` (todos los productos si no viene)."""
+    termino = (request.GET.get("term") or request.GET.get("q") or "").strip()
+    qs = Productos.objects.all() if base_qs is None else base_qs
+    qs = qs.select_related("id_presentacion", "id_unidad_medida", "id_condicion_almacenamiento")
+    return JsonResponse([producto_a_dict(p) for p in buscar_productos(termino, qs, limite)], safe=False)
@@ -0,0 +1,160 @@
+# apps/inventario/estados_lote.py
+"""
+Estados automáticos de los lotes según su fecha de caducidad.
+
+Un lote pasa a "Próximo a Vencer" `PROXIMO_VENCER_DIAS` días antes de caducar
+y a "Vencido" el día siguiente a su caducidad. Cada lote guarda en
+`fecha_transicion` el día de su próximo cambio automático:
+
+- antes de la ventana:      fecha_caducidad - PROXIMO_VENCER_DIAS
+- dentro de la ventana:     fecha_caducidad + 1 día
+- vencido, retirado o devuelto: NULL (ya no cambia solo)
+
+El job diario (`actualizar_estados_lotes`) solo lee los lotes con
+`fecha_transicion <= hoy` (columna indexada) en lugar de recorrer todos.
+El pre_save de `Lotes` (ver signals.py) usa `asignar_estado`, que compara
+ids ya cargados del registro de catálogos, sin consultar la base.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, DateField, ExpressionWrapper, F, Value, When
+from django.utils import timezone
+
+from apps.inventario.models import Lotes
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Lote
+
+PROXIMO_VENCER_DIAS = getattr(settings, "PROXIMO_VENCER_DIAS", 30)
+
+VENCIDO = "Vencido"
+PROXIMO = "Próximo a Vencer"
+DISPONIBLE = "Disponible"
+AUTO_ESTADOS = {VENCIDO, PROXIMO}          # los que maneja el sistema
+ESTADOS_FUERTES = {"Retirado", "Devuelto"}  # nunca tocarlos automáticamente
+
+
+def estado_id(nombre: str) -> int:
+    """Id del estado desde el registro de catálogos (lo crea si falta)."""
+    return catalogos.obtener_o_crear(Estado_Lote, nombre, defaults={"descripcion": nombre}).id
+
+
+def _ids(nombres) -> set:
+    return {estado_id(n) for n in nombres}
+
+
+def _dias(dias) -> int:
+    return PROXIMO_VENCER_DIAS if dias is None else int(dias)
+
+
+def estado_por_fecha(fecha_caducidad, hoy=None, dias=None):
+    """"Vencido", "Próximo a Vencer" o None (fuera de ventana)."""
+    if not fecha_caducidad:
+        return None
+    hoy = hoy or timezone.localdate()
+    if fecha_caducidad < hoy:
+        return VENCIDO
+    if fecha_caducidad <= hoy + timedelta(days=_dias(dias)):
+        return PROXIMO
+    return None
+
+
+def proxima_transicion(fecha_caducidad, hoy=None, dias=None):
+    """Día del próximo cambio automático de un lote no retirado/devuelto."""
+    if not fecha_caducidad:
+        return None
+    estado = estado_por_fecha(fecha_caducidad, hoy, dias)
+    if estado == VENCIDO:
+        return None
+    if estado == PROXIMO:
+        return fecha_caducidad + timedelta(days=1)
+    return fecha_caducidad - timedelta(days=_dias(dias))
+
+
+def asignar_estado(lote, hoy=None) -> None:
+    """
+    Ajusta `id_estado_lote_id` y `fecha_transicion` de la instancia:
+      - Retirado o Devuelto → no se toca el estado y no hay transición.
+      - Fecha en ventana Vencido / Próximo a Vencer → se fuerza ese estado.
+      - Fuera de ventana y el estado era automático → vuelve a Disponible
+        (Disponible / En Cuarentena elegidos por el usuario se respetan).
+    """
+    actual = lote.id_estado_lote_id
+    if actual is not None and actual in _ids(ESTADOS_FUERTES):
+        lote.fecha_transicion = None
+        return
+
+    auto = estado_por_fecha(lote.fecha_caducidad, hoy)
+    if auto is not None:
+        lote.id_estado_lote_id = estado_id(auto)
+    elif actual is not None and actual in _ids(AUTO_ESTADOS):
+        lote.id_estado_lote_id = estado_id(DISPONIBLE)
+    lote.fecha_transicion = proxima_transicion(lote.fecha_caducidad, hoy)
+
+
+def _mas_dias(dias: int):
+    return ExpressionWrapper(F("fecha_caducidad") + timedelta(days=dias), output_field=DateField())
+
+
+def _transicion_sql(hoy, dias):
+    """Expresión SQL equivalente a `proxima_transicion` (para UPDATE por conjunto)."""
+    return Case(
+        When(id_estado_lote_id__in=_ids(ESTADOS_FUERTES), then=Value(None)),
+        When(fecha_caducidad__lt=hoy, then=Value(None)),
+        When(fecha_caducidad__lte=hoy + timedelta(days=dias), then=_mas_dias(1)),
+        default=_mas_dias(-dias),
+        output_field=DateField(),
+    )
+
+
+def aplicar_transiciones(hoy=None) -> dict:
+    """
+    Job diario: cambia de estado solo los lotes con `fecha_transicion <= hoy`
+    y les calcula la siguiente. Devuelve {"vencidos", "proximos", "productos"}.
+    """
+    hoy = hoy or timezone.localdate()
+    dias = _dias(None)
+    pendientes = Lotes.objects.filter(fecha_transicion__lte=hoy)
+    productos = set(pendientes.values_list("id_producto_id", flat=True).distinct())
+    if not productos:
+        return {"vencidos": 0, "proximos": 0, "productos": set()}
+
+    vencidos = pendientes.filter(fecha_caducidad__lt=hoy).update(
+        id_estado_lote_id=estado_id(VENCIDO), fecha_transicion=None,
+    )
+    proximos = pendientes.filter(
+        fecha_caducidad__gte=hoy, fecha_caducidad__lte=hoy + timedelta(days=dias),
+    ).update(id_estado_lote_id=estado_id(PROXIMO), fecha_transicion=_mas_dias(1))
+    # Si quedó alguna fecha atrasada fuera de ventana (p. ej. cambió la configuración)
+    pendientes.update(fecha_transicion=_transicion_sql(hoy, dias))
+    return {"vencidos": vencidos, "proximos": proximos, "productos": productos}
+
+
+def recalcular_transiciones(lotes=None, hoy=None) -> int:
+    """Recalcula solo `fecha_transicion` (un UPDATE) para el queryset dado o todos."""
+    hoy = hoy or timezone.localdate()
+    qs = Lotes.objects.all() if lotes is None else lotes
+    return qs.update(fecha_transicion=_transicion_sql(hoy, _dias(None)))
+
+
+def recalcular_estados(lotes=None, hoy=None) -> int:
+    """
+    Reconstrucción completa (estado + transición) con las mismas reglas que
+    `asignar_estado`, en tres UPDATE por conjunto. Útil si cambia
+    PROXIMO_VENCER_DIAS.
+    """
+    hoy = hoy or timezone.localdate()
+    dias = _dias(None)
+    qs = (Lotes.objects.all() if lotes is None else lotes).exclude(id_estado_lote_id__in=_ids(ESTADOS_FUERTES))
+    limite = hoy + timedelta(days=dias)
+    cambios = qs.filter(fecha_caducidad__lt=hoy).exclude(id_estado_lote_id=estado_id(VENCIDO)).update(
+        id_estado_lote_id=estado_id(VENCIDO)
+    )
+    cambios += qs.filter(fecha_caducidad__gte=hoy, fecha_caducidad__lte=limite).exclude(
+        id_estado_lote_id=estado_id(PROXIMO)
+    ).update(id_estado_lote_id=estado_id(PROXIMO))
+    cambios += qs.filter(fecha_caducidad__gt=limite, id_estado_lote_id__in=_ids(AUTO_ESTADOS)).update(
+        id_estado_lote_id=estado_id(DISPONIBLE)
+    )
+    recalcular_transiciones(lotes, hoy)
+    return cambios
@@ -0,0 +1,63 @@
+# apps/inventario/existencias.py
+"""
+Cambios de existencia en lote por conjunto.
+
+`aplicar_deltas_lotes` suma (o resta) cantidades a muchos lotes con un solo
+`UPDATE ... FROM (VALUES ...)` en lugar de un UPDATE por línea, y deja el
+resumen `StockProducto` al día para los productos tocados. Los lotes se
+bloquean primero en orden de id para que dos operaciones concurrentes sobre
+los mismos lotes no se bloqueen mutuamente (deadlock).
+"""
+from django.db import connection
+
+from apps.inventario.models import Lotes
+from apps.inventario.resumen_stock import sincronizar_stock_productos
+
+TAMANO_LOTE_SQL = 1000
+
+
+def bloquear_lotes(lote_ids) -> None:
+    """SELECT ... FOR UPDATE de los lotes, en orden de id."""
+    ids = sorted({int(i) for i in lote_ids})
+    if ids:
+        list(Lotes.objects.select_for_update().filter(id__in=ids).order_by("id").values_list("id", flat=True))
+
+
+def aplicar_deltas_lotes(deltas, sincronizar: bool = True, bloquear: bool = True) -> dict:
+    """
+    `deltas`: {lote_id: cantidad a sumar (negativa para descontar)}.
+    Devuelve {lote_id: cantidad_disponible resultante}.
+    Debe llamarse dentro de una transacción.
+    """
+    deltas = {int(k): int(v) for k, v in deltas.items() if v}
+    if not deltas:
+        return {}
+    if bloquear:
+        bloquear_lotes(deltas)
+
+    tabla = connection.ops.quote_name(Lotes._meta.db_table)
+    resultado = {}
+    productos = set()
+    items = sorted(deltas.items())
+    with connection.cursor() as cursor:
+        for i in range(0, len(items), TAMANO_LOTE_SQL):
+            parte = items[i:i + TAMANO_LOTE_SQL]
+            valores = ", ".join(["(%s, %s)"] * len(parte))
+            params = [x for par in parte for x in par]
+            cursor.execute(
+                f"""
+                UPDATE {tabla} AS l
+                SET cantidad_disponible = l.cantidad_disponible + v.delta
+                FROM (VALUES {valores}) AS v(id, delta)
+                WHERE l.id = v.id
+                RETURNING l.id, l.id_producto_id, l.cantidad_disponible
+                """,
+                params,
+            )
+            for lote_id, producto_id, cantidad in cursor.fetchall():
+                resultado[lote_id] = cantidad
+                productos.add(producto_id)
+
+    if sincronizar:
+        sincronizar_stock_productos(productos)
+    return resultado
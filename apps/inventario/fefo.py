@@ -0,0 +1,92 @@
+# apps/inventario/fefo.py
+"""
+Asignación FEFO (primero en vencer, primero en salir) por conjunto.
+
+`planificar_fefo` lee en una sola consulta todos los lotes con existencia de
+los productos pedidos (bloqueándolos con SELECT ... FOR UPDATE en orden de
+id), reparte las cantidades en memoria y devuelve el plan. `aplicar_plan`
+descuenta todo el plan con un solo UPDATE (`aplicar_deltas_lotes`).
+
+Con `bloquear=False` el plan es solo una simulación: no bloquea ni escribe,
+y sirve para que la interfaz muestre de qué lotes saldría la mercadería.
+"""
+from apps.inventario.existencias import aplicar_deltas_lotes
+from apps.inventario.models import Lotes
+
+
+class StockInsuficiente(Exception):
+    """El stock de uno o más productos no alcanza para lo solicitado."""
+
+    def __init__(self, faltantes):
+        # faltantes: {producto_id: (requerido, disponible)}
+        self.faltantes = faltantes
+        super().__init__(
+            "; ".join(
+                f"producto {pid}: requerido {req}, disponible {disp}"
+                for pid, (req, disp) in faltantes.items()
+            )
+        )
+
+
+def planificar_fefo(requeridos, bloquear: bool = True) -> list:
+    """
+    `requeridos`: {producto_id: cantidad}. Devuelve una lista de asignaciones
+    (dicts con producto_id, lote, cantidad) en orden FEFO por producto.
+    Lanza StockInsuficiente con todos los productos que no alcanzan.
+    """
+    requeridos = {int(pid): int(qty) for pid, qty in requeridos.items() if int(qty) > 0}
+    if not requeridos:
+        return []
+
+    qs = (
+        Lotes.objects
+        .filter(id_producto_id__in=requeridos.keys(), cantidad_disponible__gt=0)
+        .only("id", "id_producto_id", "numero_lote", "fecha_caducidad", "cantidad_disponible", "precio_venta")
+    )
+    if bloquear:
+        # Orden de bloqueo por id (igual que aplicar_deltas_lotes) para evitar deadlocks
+        qs = qs.select_for_update().order_by("id")
+    lotes = sorted(qs, key=lambda l: (l.id_producto_id, l.fecha_caducidad, l.id))
+
+    restante = dict(requeridos)
+    plan = []
+    for lote in lotes:
+        falta = restante[lote.id_producto_id]
+        if falta <= 0:
+            continue
+        tomar = min(int(lote.cantidad_disponible or 0), falta)
+        plan.append({"producto_id": lote.id_producto_id, "lote": lote, "cantidad": tomar})
+        restante[lote.id_producto_id] = falta - tomar
+
+    faltantes = {
+        pid: (requeridos[pid], requeridos[pid] - falta)
+        for pid, falta in restante.items() if falta > 0
+    }
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+    return plan
+
+
+def aplicar_plan(plan) -> dict:
+    """
+    Descuenta el plan con un UPDATE por conjunto y sincroniza el resumen de
+    stock. Los lotes ya quedaron bloqueados en `planificar_fefo`.
+    """
+    deltas = {}
+    for a in plan:
+        deltas[a["lote"].id] = deltas.get(a["lote"].id, 0) - a["cantidad"]
+    return aplicar_deltas_lotes(deltas, bloquear=False)
+
+
+def plan_a_dict(plan) -> list:
+    """Formato JSON del plan para la vista previa."""
+    return [
+        {
+            "producto_id": a["producto_id"],
+            "lote_id": a["lote"].id,
+            "numero_lote": a["lote"].numero_lote,
+            "fecha_caducidad": a["lote"].fecha_caducidad.isoformat(),
+            "cantidad": a["cantidad"],
+        }
+        for a in plan
+    ]
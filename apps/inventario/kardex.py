@@ -0,0 +1,246 @@
+# apps/inventario/kardex.py
+"""
+Kardex por producto con cierres mensuales.
+
+Cada renglón del kardex sale de un movimiento de sucursal (no cancelado) o de
+un ajuste físico completado. La cantidad con signo se toma de la naturaleza
+del tipo de movimiento (`naturaleza * abs(cantidad)`) y de `diferencia` en los
+ajustes.
+
+`Cierre_Kardex` guarda, por mes y lote, saldo inicial, entradas, salidas y
+saldo final (comando `cerrar_kardex`). El saldo inicial de un rango se
+obtiene del último cierre anterior más los movimientos posteriores a él, y
+el saldo acumulado del rango lo calcula PostgreSQL con
+`SUM() OVER (ORDER BY fecha)`.
+
+Si se cancela o anula algo de un mes ya cerrado, `invalidar_cierres` borra
+los cierres desde ese mes; el kardex sigue siendo correcto (parte de un
+cierre anterior) hasta que el comando los vuelva a generar.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from apps.ajustes_inventario.models import Detalle_Conteo, Inventario_Fisico
+from apps.inventario.models import Cierre_Kardex, Lotes
+from apps.mantenimiento.models import Estado_Movimiento_Inventario, Tipo_Movimiento_Inventario
+from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+
+INICIO_HISTORIA = date(1900, 1, 1)
+
+
+def _tabla(modelo):
+    return connection.ops.quote_name(modelo._meta.db_table)
+
+
+def primer_dia_mes(d: date) -> date:
+    return d.replace(day=1)
+
+
+def siguiente_mes(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _inicio_dia(d: date) -> datetime:
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def como_fecha(valor) -> date:
+    if isinstance(valor, datetime):
+        return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+    return valor
+
+
+def sql_renglones() -> str:
+    """
+    Renglones del kardex (movimientos + ajustes) en [desde, hasta), con
+    columnas: fecha, origen_orden, orden, lote_id, producto_id, tipo, origen,
+    cantidad (con signo). Parámetros: producto (o NULL), desde, hasta (fechas)
+    y tz. Los ajustes se ubican al final de su día, como en el kardex original.
+    """
+    return f"""
+        SELECT m.fecha_hora AS fecha, 0 AS origen_orden, m.id AS orden,
+               l.id AS lote_id, l.id_producto_id AS producto_id,
+               COALESCE(t.descripcion, t.codigo) AS tipo, 'Movimiento' AS origen,
+               t.naturaleza * abs(m.cantidad) AS cantidad
+        FROM {_tabla(Movimientos_Inventario_Sucursal)} m
+        JOIN {_tabla(Lotes)} l ON l.id = m.id_lote_id
+        JOIN {_tabla(Tipo_Movimiento_Inventario)} t ON t.id = m.id_tipo_movimiento_id
+        LEFT JOIN {_tabla(Estado_Movimiento_Inventario)} e ON e.id = m.estado_movimiento_inventario_id
+        WHERE (%(producto)s IS NULL OR l.id_producto_id = %(producto)s)
+          AND m.fecha_hora >= (%(desde)s::date)::timestamp AT TIME ZONE %(tz)s
+          AND m.fecha_hora < (%(hasta)s::date)::timestamp AT TIME ZONE %(tz)s
+          AND upper(COALESCE(e.nombre_estado, '')) <> 'CANCELADO'
+        UNION ALL
+        SELECT ((c.fecha_conteo + 1)::timestamp - interval '1 microsecond') AT TIME ZONE %(tz)s,
+               1, d.id, l.id, l.id_producto_id,
+               c.tipo_ajuste, 'Ajuste Físico', d.diferencia
+        FROM {_tabla(Detalle_Conteo)} d
+        JOIN {_tabla(Inventario_Fisico)} c ON c.id = d.id_conteo_id
+        JOIN {_tabla(Lotes)} l ON l.id = d.id_lote_id
+        WHERE (%(producto)s IS NULL OR l.id_producto_id = %(producto)s)
+          AND c.estado = 'Completado'
+          AND c.fecha_conteo >= %(desde)s AND c.fecha_conteo < %(hasta)s
+    """
+
+
+def params_renglones(producto_id, desde: date, hasta: date) -> dict:
+    return {"producto": producto_id, "desde": desde, "hasta": hasta, "tz": settings.TIME_ZONE}
+
+
+def saldo_inicial(producto_id: int, fecha: date) -> int:
+    """Saldo del producto al inicio de `fecha`: último cierre anterior + movimientos posteriores."""
+    periodo = (
+        Cierre_Kardex.objects
+        .filter(periodo__lt=primer_dia_mes(fecha))
+        .aggregate(p=Max("periodo"))["p"]
+    )
+    base, desde = 0, INICIO_HISTORIA
+    if periodo:
+        base = (
+            Cierre_Kardex.objects
+            .filter(periodo=periodo, id_producto_id=producto_id)
+            .aggregate(s=Sum("saldo_final"))["s"] or 0
+        )
+        desde = siguiente_mes(periodo)
+    if desde >= fecha:
+        return base
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COALESCE(SUM(cantidad), 0) FROM ({sql_renglones()}) k",
+            params_renglones(producto_id, desde, fecha),
+        )
+        return base + int(cursor.fetchone()[0])
+
+
+def kardex_producto(producto_id: int, fecha_inicio, fecha_fin) -> list:
+    """
+    Renglones del kardex entre dos fechas (inclusive), con el saldo acumulado
+    desde el saldo real al inicio del rango. Cada renglón es un dict con
+    fecha, tipo, origen, cantidad_total, entrada, salida y saldo.
+    """
+    inicio, fin = como_fecha(fecha_inicio), como_fecha(fecha_fin)
+    apertura = saldo_inicial(producto_id, inicio)
+
+    params = params_renglones(producto_id, inicio, fin + timedelta(days=1))
+    params["apertura"] = apertura
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT fecha, tipo, origen, cantidad,
+                   GREATEST(cantidad, 0) AS entrada,
+                   GREATEST(-cantidad, 0) AS salida,
+                   %(apertura)s + SUM(cantidad) OVER (
+                       ORDER BY fecha, origen_orden, orden
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                   ) AS saldo
+            FROM ({sql_renglones()}) k
+            ORDER BY fecha, origen_orden, orden
+            """,
+            params,
+        )
+        return [
+            {
+                "fecha": timezone.localtime(fecha),
+                "tipo": tipo,
+                "origen": origen,
+                "cantidad_total": cantidad,
+                "entrada": entrada,
+                "salida": salida,
+                "saldo": saldo,
+            }
+            for fecha, tipo, origen, cantidad, entrada, salida, saldo in cursor.fetchall()
+        ]
+
+
+# ---------------------------------------------------------------
+# Cierres mensuales
+# ---------------------------------------------------------------
+def _primer_mes_con_historia():
+    primeros = [
+        Movimientos_Inventario_Sucursal.objects.aggregate(f=Min("fecha_hora"))["f"],
+        Inventario_Fisico.objects.aggregate(f=Min("fecha_conteo"))["f"],
+    ]
+    fechas = [como_fecha(f) for f in primeros if f]
+    return primer_dia_mes(min(fechas)) if fechas else None
+
+
+def cerrar_mes(periodo: date, apertura: dict) -> dict:
+    """
+    Genera los cierres de `periodo` a partir de `apertura`
+    ({lote_id: (producto_id, saldo)}) y devuelve la apertura del mes siguiente.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT lote_id, producto_id,
+                   SUM(GREATEST(cantidad, 0)), SUM(GREATEST(-cantidad, 0))
+            FROM ({sql_renglones()}) k
+            GROUP BY lote_id, producto_id
+            """,
+            params_renglones(None, periodo, siguiente_mes(periodo)),
+        )
+        movimientos = {lote_id: (producto_id, int(e), int(s)) for lote_id, producto_id, e, s in cursor.fetchall()}
+
+    cierres, siguiente = [], {}
+    for lote_id in set(apertura) | set(movimientos):
+        producto_id, inicial = apertura.get(lote_id, (None, 0))
+        producto_id, entradas, salidas = movimientos.get(lote_id, (producto_id, 0, 0))
+        final = inicial + entradas - salidas
+        cierres.append(Cierre_Kardex(
+            periodo=periodo, id_lote_id=lote_id, id_producto_id=producto_id,
+            saldo_inicial=inicial, entradas=entradas, salidas=salidas, saldo_final=final,
+        ))
+        if final:
+            siguiente[lote_id] = (producto_id, final)
+
+    with transaction.atomic():
+        Cierre_Kardex.objects.filter(periodo=periodo).delete()
+        Cierre_Kardex.objects.bulk_create(cierres, batch_size=1000)
+    return siguiente
+
+
+def cerrar_periodos(hasta: date = None) -> list:
+    """
+    Cierra los meses pendientes hasta `hasta` (por defecto el mes anterior al
+    actual). Continúa desde el último cierre existente. Devuelve los periodos
+    cerrados.
+    """
+    hasta = primer_dia_mes(hasta or (primer_dia_mes(timezone.localdate()) - timedelta(days=1)))
+    ultimo = Cierre_Kardex.objects.aggregate(p=Max("periodo"))["p"]
+    if ultimo:
+        periodo = siguiente_mes(ultimo)
+        apertura = {
+            lote_id: (producto_id, saldo)
+            for lote_id, producto_id, saldo in Cierre_Kardex.objects
+            .filter(periodo=ultimo).exclude(saldo_final=0)
+            .values_list("id_lote_id", "id_producto_id", "saldo_final")
+        }
+    else:
+        periodo = _primer_mes_con_historia()
+        apertura = {}
+    if periodo is None:
+        return []
+
+    cerrados = []
+    while periodo <= hasta:
+        apertura = cerrar_mes(periodo, apertura)
+        cerrados.append(periodo)
+        periodo = siguiente_mes(periodo)
+    return cerrados
+
+
+def invalidar_cierres(desde) -> None:
+    """
+    Borra los cierres desde el mes de `desde` (fecha o datetime) cuando se
+    cancela o anula una operación de un mes ya cerrado.
+    """
+    if not desde:
+        return
+    mes = primer_dia_mes(como_fecha(desde))
+    if mes < primer_dia_mes(timezone.localdate()):
+        Cierre_Kardex.objects.filter(periodo__gte=mes).delete()
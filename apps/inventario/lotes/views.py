@@ -3,6 +3,8 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
 from django.db.models import ProtectedError
 from apps.inventario.models import Lotes
+from apps.inventario.resumen_stock import sincronizar_stock_productos
+from apps.mantenimiento import catalogos
 from apps.mantenimiento.models import Estado_Lote
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
@@ -12,7 +14,7 @@ from decimal import Decimal, InvalidOperation
 # ---------------------------
 
 def _estado_id(nombre: str) -> int:
-    return Estado_Lote.objects.only("id").get(nombre_estado=nombre).id
+    return catalogos.obtener_id(Estado_Lote, nombre)
 
 def _permitidos_para_usuario_qs():
     # Solo "Disponible" y "En Cuarentena" se muestran en el <select>
@@ -111,6 +113,8 @@ def editar_lote(request, id):
 
         lote.id_estado_lote_id = estado_post
         lote.save(update_fields=["fecha_caducidad", "ubicacion_almacen", "id_estado_lote", "precio_compra", "precio_venta"])
+        # El estado/caducidad cambian el stock vigente y en cuarentena del producto
+        sincronizar_stock_productos([lote.id_producto_id], marcar_movimiento=False)
         return JsonResponse({"success": True})
 
     return render(request, "lotes/partials/_form.html", {"lote": lote, "estados": estados})
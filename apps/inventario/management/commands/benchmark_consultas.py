@@ -0,0 +1,157 @@
+# apps/inventario/management/commands/benchmark_consultas.py
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.inventario.models import Lotes, Productos
+from apps.mantenimiento.models import Estado_Lote
+from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+
+# Modelos cuyos índices declarados en Meta.indexes se comparan con --sin-indices
+MODELOS_CON_INDICES = [Lotes, Productos, Movimientos_Inventario_Sucursal]
+
+
+def _muestras():
+    """Valores reales para parametrizar las consultas (producto con más lotes, etc.)."""
+    producto = (
+        Lotes.objects.values("id_producto_id")
+        .annotate(n=Count("id")).order_by("-n").first()
+    )
+    producto_id = producto["id_producto_id"] if producto else 0
+    venta = (
+        Movimientos_Inventario_Sucursal.objects
+        .filter(id_tipo_movimiento__codigo="VEN")
+        .exclude(referencia_transaccion__isnull=True)
+        .values_list("referencia_transaccion", flat=True).last()
+    )
+    recepcion = (
+        Movimientos_Inventario_Sucursal.objects
+        .filter(id_tipo_movimiento__codigo="REC")
+        .exclude(referencia_transaccion__isnull=True)
+        .values_list("referencia_transaccion", flat=True).last()
+    )
+    codigo = Productos.objects.filter(pk=producto_id).values_list("codigo_producto", flat=True).first()
+    return {
+        "producto_id": producto_id,
+        "producto_ids": list(Productos.objects.values_list("id", flat=True)[:50]),
+        "venta": venta or "",
+        "recepcion": recepcion or "",
+        "codigo": codigo or "",
+    }
+
+
+def consultas_criticas(m):
+    """Nombre -> queryset de cada consulta caliente del sistema."""
+    hoy = timezone.localdate()
+    ahora = timezone.now()
+    return {
+        "fefo_lotes_producto": (
+            Lotes.objects
+            .filter(id_producto_id=m["producto_id"], cantidad_disponible__gt=0)
+            .order_by("fecha_caducidad", "id")
+        ),
+        "resumen_stock_productos": (
+            Lotes.objects
+            .filter(id_producto_id__in=m["producto_ids"], cantidad_disponible__gt=0)
+            .values("id_producto_id").annotate(total=Sum("cantidad_disponible")).order_by()
+        ),
+        "lotes_proximos_a_vencer": (
+            Lotes.objects
+            .filter(fecha_caducidad__range=(hoy, hoy + timedelta(days=30)), cantidad_disponible__gt=0)
+            .order_by("fecha_caducidad")
+        ),
+        "venta_por_factura": Movimientos_Inventario_Sucursal.objects.filter(
+            id_tipo_movimiento__codigo="VEN", referencia_transaccion=m["venta"]
+        ),
+        "recepcion_por_referencia": Movimientos_Inventario_Sucursal.objects.filter(
+            referencia_transaccion=m["recepcion"]
+        ),
+        "kardex_producto": (
+            Movimientos_Inventario_Sucursal.objects
+            .filter(id_lote__id_producto_id=m["producto_id"], fecha_hora__gte=ahora - timedelta(days=90))
+            .order_by("fecha_hora")
+        ),
+        "producto_por_codigo": Productos.objects.filter(codigo_producto=m["codigo"]),
+        "estado_lote_por_nombre": Estado_Lote.objects.filter(nombre_estado="Disponible"),
+    }
+
+
+def _tiempo(plan: str):
+    m = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return float(m.group(1)) if m else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Imprime EXPLAIN ANALYZE de las consultas críticas. Con --sin-indices "
+        "también las mide sin los índices declarados en los modelos (se eliminan "
+        "dentro de una transacción que se revierte; bloquea esas tablas mientras "
+        "corre, no usar en horario de operación)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--consulta",
+            action="append",
+            dest="consultas",
+            help="Nombre de la consulta a medir (se puede repetir). Por defecto todas.",
+        )
+        parser.add_argument(
+            "--sin-indices",
+            action="store_true",
+            help="Compara contra el plan sin los índices de Meta.indexes.",
+        )
+        parser.add_argument(
+            "--resumen",
+            action="store_true",
+            help="Solo imprime la tabla de tiempos, sin los planes.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Este comando requiere PostgreSQL (EXPLAIN ANALYZE con BUFFERS).")
+
+        todas = consultas_criticas(_muestras())
+        nombres = options["consultas"] or list(todas)
+        desconocidas = [n for n in nombres if n not in todas]
+        if desconocidas:
+            raise CommandError(
+                f"Consultas desconocidas: {', '.join(desconocidas)}. "
+                f"Disponibles: {', '.join(todas)}"
+            )
+
+        con_indices = self._medir(todas, nombres, "con índices", options["resumen"])
+        sin_indices = {}
+        if options["sin_indices"]:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for modelo in MODELOS_CON_INDICES:
+                        for indice in modelo._meta.indexes:
+                            cursor.execute(f'DROP INDEX IF EXISTS "{indice.name}"')
+                sin_indices = self._medir(todas, nombres, "sin índices", options["resumen"])
+                transaction.set_rollback(True)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'consulta':<28} {'con índices':>12} {'sin índices':>12}")
+        for nombre in nombres:
+            a = con_indices.get(nombre)
+            b = sin_indices.get(nombre)
+            self.stdout.write(
+                f"{nombre:<28} {(f'{a:.3f} ms' if a is not None else '-'):>12} "
+                f"{(f'{b:.3f} ms' if b is not None else '-'):>12}"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark terminado."))
+
+    def _medir(self, todas, nombres, etiqueta, solo_resumen):
+        tiempos = {}
+        for nombre in nombres:
+            plan = todas[nombre].explain(analyze=True, buffers=True)
+            tiempos[nombre] = _tiempo(plan)
+            if not solo_resumen:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"== {nombre} ({etiqueta})"))
+                self.stdout.write(plan)
+        return tiempos
@@ -0,0 +1,46 @@
+# apps/inventario/management/commands/cerrar_kardex.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventario.kardex import cerrar_periodos
+from apps.inventario.models import Cierre_Kardex
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera los cierres mensuales del kardex (saldo inicial, entradas, salidas "
+        "y saldo final por lote) para los meses pendientes. Pensado para correr "
+        "a diario o al inicio de cada mes (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hasta",
+            help="Último mes a cerrar, AAAA-MM. Por defecto el mes anterior al actual.",
+        )
+        parser.add_argument(
+            "--reconstruir",
+            action="store_true",
+            help="Borra todos los cierres y los genera de nuevo desde el primer movimiento.",
+        )
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options["hasta"]:
+            try:
+                hasta = datetime.strptime(options["hasta"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--hasta debe tener el formato AAAA-MM.")
+
+        if options["reconstruir"]:
+            borrados, _ = Cierre_Kardex.objects.all().delete()
+            self.stdout.write(f"Cierres eliminados: {borrados}")
+
+        cerrados = cerrar_periodos(hasta)
+        if not cerrados:
+            self.stdout.write("No hay meses pendientes de cierre.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Meses cerrados: {len(cerrados)} ({cerrados[0]:%Y-%m} a {cerrados[-1]:%Y-%m})"
+        ))
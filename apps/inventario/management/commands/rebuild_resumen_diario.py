@@ -0,0 +1,73 @@
+# apps/inventario/management/commands/rebuild_resumen_diario.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.inventario.models import Resumen_Diario_Documento, Resumen_Diario_Movimiento
+from apps.inventario.resumen_diario import reconstruir
+
+
+def _filas(desde, hasta) -> set:
+    rango = {}
+    if desde:
+        rango["fecha__gte"] = desde
+    if hasta:
+        rango["fecha__lte"] = hasta
+    return set(
+        Resumen_Diario_Movimiento.objects.filter(**rango)
+        .values_list("fecha", "tipo", "id_producto_id", "entradas", "salidas", "movimientos")
+    ) | set(
+        Resumen_Diario_Documento.objects.filter(**rango)
+        .values_list("fecha", "documento", "estado", "cantidad")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Llena o reconstruye el resumen diario de movimientos y documentos que "
+        "usan las gráficas. Las transacciones lo mantienen al día; este comando "
+        "sirve para la carga inicial o para corregir un rango."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="Primer día, AAAA-MM-DD. Por defecto el primer movimiento.")
+        parser.add_argument("--hasta", help="Último día, AAAA-MM-DD. Por defecto hoy.")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Solo reporta las filas que difieren del recálculo, no modifica nada.",
+        )
+
+    def _fecha(self, valor, nombre):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"--{nombre} debe tener el formato AAAA-MM-DD.")
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options["desde"], "desde")
+        hasta = self._fecha(options["hasta"], "hasta")
+        if desde and hasta and desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta.")
+
+        with transaction.atomic():
+            antes = _filas(desde, hasta)
+            tramos = reconstruir(desde, hasta)
+            diferencias = antes ^ _filas(desde, hasta)
+            if options["check"]:
+                transaction.set_rollback(True)
+
+        if not tramos:
+            self.stdout.write("No hay historial que resumir.")
+            return
+        if options["check"]:
+            estilo = self.style.WARNING if diferencias else self.style.SUCCESS
+            self.stdout.write(estilo(f"Filas con diferencias: {len(diferencias)}"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen diario reconstruido: {tramos[0][0]} a {tramos[-1][1]} "
+            f"({len(tramos)} tramos, filas corregidas: {len(diferencias)})"
+        ))
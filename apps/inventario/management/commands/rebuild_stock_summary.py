@@ -0,0 +1,59 @@
+# apps/inventario/management/commands/rebuild_stock_summary.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.inventario.models import Productos, StockProducto
+from apps.inventario.resumen_stock import CAMPOS_RESUMEN, calcular_resumen, ultimos_movimientos
+
+
+class Command(BaseCommand):
+    help = "Verifica el resumen StockProducto contra los lotes y corrige las diferencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Solo reporta las diferencias, no modifica nada.",
+        )
+
+    def handle(self, *args, **options):
+        solo_verificar = options["check"]
+
+        with transaction.atomic():
+            esperado = calcular_resumen()
+            actuales = {
+                r["id_producto_id"]: r
+                for r in StockProducto.objects.values("id_producto_id", *CAMPOS_RESUMEN)
+            }
+            vacio = {k: 0 for k in CAMPOS_RESUMEN}
+
+            diferencias = []
+            for pid in Productos.objects.values_list("id", flat=True).iterator(chunk_size=2000):
+                calc = esperado.get(pid, vacio)
+                actual = actuales.get(pid)
+                if actual is None or any(actual[k] != calc[k] for k in CAMPOS_RESUMEN):
+                    diferencias.append((pid, actual, calc))
+
+            if options["verbosity"] >= 2:
+                for pid, actual, calc in diferencias[:50]:
+                    antes = {k: actual[k] for k in CAMPOS_RESUMEN} if actual else "sin fila"
+                    self.stdout.write(f"  producto {pid}: {antes} -> {calc}")
+
+            if solo_verificar or not diferencias:
+                estilo = self.style.WARNING if diferencias else self.style.SUCCESS
+                self.stdout.write(estilo(f"Productos con diferencias: {len(diferencias)}"))
+                return
+
+            ultimos = ultimos_movimientos()
+            StockProducto.objects.bulk_create(
+                [
+                    StockProducto(id_producto_id=pid, ultimo_movimiento=ultimos.get(pid), **calc)
+                    for pid, _actual, calc in diferencias
+                ],
+                update_conflicts=True,
+                unique_fields=["id_producto"],
+                update_fields=CAMPOS_RESUMEN + ["ultimo_movimiento", "actualizado"],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Resumen corregido: productos_actualizados={len(diferencias)}"))
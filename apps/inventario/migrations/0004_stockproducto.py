@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+
+def poblar_resumen(apps, schema_editor):
+    """Carga inicial del resumen a partir de los lotes existentes."""
+    Lotes = apps.get_model('inventario', 'Lotes')
+    StockProducto = apps.get_model('inventario', 'StockProducto')
+    hoy = timezone.localdate()
+    no_vigentes = ['En Cuarentena', 'Vencido', 'Retirado', 'Devuelto']
+
+    filas = (
+        Lotes.objects.filter(cantidad_disponible__gt=0)
+        .values('id_producto_id')
+        .annotate(
+            total=Sum('cantidad_disponible'),
+            vigente=Sum('cantidad_disponible', filter=Q(fecha_caducidad__gte=hoy) & ~Q(id_estado_lote__nombre_estado__in=no_vigentes)),
+            cuarentena=Sum('cantidad_disponible', filter=Q(id_estado_lote__nombre_estado='En Cuarentena')),
+        )
+        .order_by()
+    )
+    StockProducto.objects.bulk_create([
+        StockProducto(
+            id_producto_id=f['id_producto_id'],
+            stock_total=f['total'] or 0,
+            stock_vigente=f['vigente'] or 0,
+            stock_cuarentena=f['cuarentena'] or 0,
+        )
+        for f in filas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_lotes_uq_lotes_producto_numero'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_total', models.IntegerField(default=0)),
+                ('stock_vigente', models.IntegerField(default=0)),
+                ('stock_cuarentena', models.IntegerField(default=0)),
+                ('ultimo_movimiento', models.DateTimeField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('id_producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_resumen', to='inventario.productos')),
+            ],
+            options={
+                'verbose_name': 'Stock por Producto',
+                'verbose_name_plural': 'Stock por Producto',
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no puede ir en una transacción
+    atomic = False
+
+    dependencies = [
+        ('inventario', '0004_stockproducto'),
+        ('mantenimiento', '0003_delete_estado_alerta_delete_tipo_alerta'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='lotes',
+            index=models.Index(condition=models.Q(('cantidad_disponible__gt', 0)), fields=['id_producto', 'fecha_caducidad', 'id'], name='idx_lotes_fefo'),
+        ),
+        AddIndexConcurrently(
+            model_name='lotes',
+            index=models.Index(fields=['fecha_caducidad'], name='idx_lotes_caducidad'),
+        ),
+        AddIndexConcurrently(
+            model_name='productos',
+            index=models.Index(fields=['codigo_producto'], name='idx_productos_codigo'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+import logging
+
+from django.db import ProgrammingError, migrations
+
+logger = logging.getLogger(__name__)
+
+# Los índices se crean solo si las extensiones pg_trgm y unaccent (contrib)
+# ya están instaladas o el rol puede instalarlas. Si no, la búsqueda usa el
+# modo alterno de apps/inventario/busqueda.py y esta migración no hace nada.
+EXTENSIONES = ["pg_trgm", "unaccent"]
+SIN_PRIVILEGIO = "42501"  # insufficient_privilege
+
+CREAR = [
+    # unaccent() es STABLE; para indexar se necesita una envoltura IMMUTABLE
+    # con el diccionario fijo.
+    """
+    CREATE OR REPLACE FUNCTION saif_unaccent(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_productos_nombre_trgm
+    ON inventario_productos USING gin (saif_unaccent(lower(nombre)) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_productos_codigo_trgm
+    ON inventario_productos USING gin (saif_unaccent(lower(codigo_producto)) gin_trgm_ops)
+    """,
+]
+
+BORRAR = [
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_productos_codigo_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_productos_nombre_trgm",
+    "DROP FUNCTION IF EXISTS saif_unaccent(text)",
+]
+
+
+def _instalar_extensiones(cursor) -> bool:
+    """True si las extensiones quedan instaladas; False si faltan o el rol no puede crearlas."""
+    cursor.execute("SELECT extname FROM pg_extension WHERE extname = ANY(%s)", [EXTENSIONES])
+    faltan = [e for e in EXTENSIONES if e not in {fila[0] for fila in cursor.fetchall()}]
+    if not faltan:
+        return True
+    cursor.execute("SELECT count(*) FROM pg_available_extensions WHERE name = ANY(%s)", [faltan])
+    if cursor.fetchone()[0] < len(faltan):
+        logger.warning("pg_trgm/unaccent no disponibles: se omiten los índices de búsqueda.")
+        return False
+    return _ejecutar(cursor, [f"CREATE EXTENSION IF NOT EXISTS {e}" for e in faltan])
+
+
+def _ejecutar(cursor, sentencias) -> bool:
+    """Ejecuta en orden; False (sin error) si el rol no tiene privilegio para alguna."""
+    for sql in sentencias:
+        try:
+            cursor.execute(sql)
+        except ProgrammingError as e:
+            if getattr(e.__cause__, "pgcode", None) != SIN_PRIVILEGIO:
+                raise
+            logger.warning("Sin privilegio para crear los índices de búsqueda de productos (%s); se omiten.", str(e).strip())
+            return False
+    return True
+
+
+def crear_indices(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != "postgresql":
+        return
+    with conn.cursor() as cursor:
+        if _instalar_extensiones(cursor):
+            _ejecutar(cursor, CREAR)
+
+
+def borrar_indices(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != "postgresql":
+        return
+    with conn.cursor() as cursor:
+        for sql in BORRAR:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('inventario', '0005_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
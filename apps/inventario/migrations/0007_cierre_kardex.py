@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cierre_Kardex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('saldo_inicial', models.IntegerField(default=0)),
+                ('entradas', models.IntegerField(default=0)),
+                ('salidas', models.IntegerField(default=0)),
+                ('saldo_final', models.IntegerField(default=0)),
+                ('fecha_generacion', models.DateTimeField(auto_now_add=True)),
+                ('id_lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventario.lotes')),
+                ('id_producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventario.productos')),
+            ],
+            options={
+                'verbose_name': 'Cierre de Kardex',
+                'verbose_name_plural': 'Cierres de Kardex',
+                'indexes': [models.Index(fields=['id_producto', 'periodo'], name='idx_cierre_producto_periodo')],
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'id_lote'), name='uq_cierre_kardex_periodo_lote')],
+            },
+        ),
+    ]
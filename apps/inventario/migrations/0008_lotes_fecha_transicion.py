@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:13
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def poblar_transiciones(apps, schema_editor):
+    """Misma regla que apps.inventario.estados_lote.proxima_transicion."""
+    Lotes = apps.get_model("inventario", "Lotes")
+    Estado_Lote = apps.get_model("mantenimiento", "Estado_Lote")
+    hoy = timezone.localdate()
+    dias = int(getattr(settings, "PROXIMO_VENCER_DIAS", 30))
+    fuertes = list(Estado_Lote.objects.filter(nombre_estado__in=["Retirado", "Devuelto"]).values_list("id", flat=True))
+
+    def mas_dias(n):
+        return models.ExpressionWrapper(models.F("fecha_caducidad") + timedelta(days=n), output_field=models.DateField())
+
+    Lotes.objects.update(fecha_transicion=models.Case(
+        models.When(id_estado_lote_id__in=fuertes, then=models.Value(None)),
+        models.When(fecha_caducidad__lt=hoy, then=models.Value(None)),
+        models.When(fecha_caducidad__lte=hoy + timedelta(days=dias), then=mas_dias(1)),
+        default=mas_dias(-dias),
+        output_field=models.DateField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_cierre_kardex'),
+        ('mantenimiento', '0003_delete_estado_alerta_delete_tipo_alerta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotes',
+            name='fecha_transicion',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lotes',
+            index=models.Index(condition=models.Q(('fecha_transicion__isnull', False)), fields=['fecha_transicion'], name='idx_lotes_transicion'),
+        ),
+        migrations.RunPython(poblar_transiciones, migrations.RunPython.noop),
+    ]
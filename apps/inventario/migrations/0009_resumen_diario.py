@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_lotes_fecha_transicion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resumen_Diario_Documento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('documento', models.CharField(max_length=30)),
+                ('estado', models.CharField(max_length=100)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Documentos',
+                'verbose_name_plural': 'Resumen Diario de Documentos',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'documento', 'estado'), name='uq_resumen_doc_dia_estado')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Resumen_Diario_Movimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo', models.CharField(max_length=120)),
+                ('entradas', models.IntegerField(default=0)),
+                ('salidas', models.IntegerField(default=0)),
+                ('movimientos', models.IntegerField(default=0)),
+                ('id_producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventario.productos')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Movimientos',
+                'verbose_name_plural': 'Resumen Diario de Movimientos',
+                'indexes': [models.Index(fields=['id_producto', 'fecha'], name='idx_resumen_mov_producto')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'tipo', 'id_producto'), name='uq_resumen_mov_dia_tipo_producto')],
+            },
+        ),
+    ]
@@ -31,6 +31,9 @@ class Productos(models.Model):
     class Meta:
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            models.Index(fields=['codigo_producto'], name='idx_productos_codigo'),
+        ]
 
 
 class Lotes(models.Model):
@@ -45,9 +48,19 @@ class Lotes(models.Model):
     ubicacion_almacen = models.CharField(max_length=100, null=True, blank=True)
     precio_compra = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     precio_venta = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Día del próximo cambio automático de estado (ver apps.inventario.estados_lote)
+    fecha_transicion = models.DateField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return f'Lote {self.numero_lote} de {self.id_producto.nombre}'
+
+    def save(self, *args, **kwargs):
+        # El pre_save recalcula fecha_transicion cuando cambia la fecha o el
+        # estado; con update_fields hay que incluirla para que se guarde.
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"fecha_caducidad", "id_estado_lote", "id_estado_lote_id"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"fecha_transicion"}
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = 'Lote'
@@ -58,6 +71,22 @@ class Lotes(models.Model):
                 name='uq_lotes_producto_numero'
             )
         ]
+        indexes = [
+            # FEFO: lotes con existencia de un producto en orden de caducidad
+            models.Index(
+                fields=['id_producto', 'fecha_caducidad', 'id'],
+                condition=models.Q(cantidad_disponible__gt=0),
+                name='idx_lotes_fefo',
+            ),
+            # Alertas de vencimiento y actualización de estados por fecha
+            models.Index(fields=['fecha_caducidad'], name='idx_lotes_caducidad'),
+            # Job diario de estados: solo lotes con transición pendiente
+            models.Index(
+                fields=['fecha_transicion'],
+                condition=models.Q(fecha_transicion__isnull=False),
+                name='idx_lotes_transicion',
+            ),
+        ]
 
     @property
     def codigo_lote(self):
@@ -67,3 +96,105 @@ class Lotes(models.Model):
         """
         return self.numero_lote
 
+
+class StockProducto(models.Model):
+    """Resumen desnormalizado del stock de un producto (una fila por producto).
+
+    Se mantiene dentro de las mismas transacciones que modifican
+    `Lotes.cantidad_disponible` (ver `apps.inventario.resumen_stock`) para que
+    alertas y validaciones lean una sola fila en lugar de sumar todos los lotes.
+    """
+    id_producto = models.OneToOneField(Productos, on_delete=models.CASCADE, related_name='stock_resumen')
+
+    stock_total = models.IntegerField(default=0)        # suma de lotes con stock > 0
+    stock_vigente = models.IntegerField(default=0)      # disponible y no vencido
+    stock_cuarentena = models.IntegerField(default=0)   # lotes "En Cuarentena"
+    ultimo_movimiento = models.DateTimeField(null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Stock {self.id_producto_id}: {self.stock_total}'
+
+    class Meta:
+        verbose_name = 'Stock por Producto'
+        verbose_name_plural = 'Stock por Producto'
+
+
+class Cierre_Kardex(models.Model):
+    """Cierre mensual del kardex por lote (saldo inicial, entradas y salidas del mes).
+
+    Lo genera el comando `cerrar_kardex`. El kardex de un rango parte del
+    último cierre anterior y solo suma los movimientos posteriores
+    (ver `apps.inventario.kardex`).
+    """
+    periodo = models.DateField()  # primer día del mes cerrado
+    id_lote = models.ForeignKey(Lotes, on_delete=models.CASCADE)
+    id_producto = models.ForeignKey(Productos, on_delete=models.CASCADE)
+
+    saldo_inicial = models.IntegerField(default=0)
+    entradas = models.IntegerField(default=0)
+    salidas = models.IntegerField(default=0)
+    saldo_final = models.IntegerField(default=0)
+    fecha_generacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Cierre {self.periodo:%Y-%m} lote {self.id_lote_id}: {self.saldo_final}'
+
+    class Meta:
+        verbose_name = 'Cierre de Kardex'
+        verbose_name_plural = 'Cierres de Kardex'
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'id_lote'], name='uq_cierre_kardex_periodo_lote'),
+        ]
+        indexes = [
+            models.Index(fields=['id_producto', 'periodo'], name='idx_cierre_producto_periodo'),
+        ]
+
+
+class Resumen_Diario_Movimiento(models.Model):
+    """Hechos diarios de inventario: unidades por día, tipo de movimiento y producto.
+
+    Mismos renglones que el kardex (movimientos no cancelados y ajustes
+    completados). Se recalcula por día al confirmar cada transacción que mueve
+    stock (ver `apps.inventario.resumen_diario`) y con el comando
+    `rebuild_resumen_diario`. Las gráficas leen de aquí en lugar de agrupar
+    movimientos.
+    """
+    fecha = models.DateField()
+    tipo = models.CharField(max_length=120)  # descripción del tipo de movimiento o "Ajuste <tipo>"
+    id_producto = models.ForeignKey(Productos, on_delete=models.CASCADE)
+
+    entradas = models.IntegerField(default=0)
+    salidas = models.IntegerField(default=0)
+    movimientos = models.IntegerField(default=0)  # renglones agregados
+
+    def __str__(self):
+        return f'{self.fecha} {self.tipo} producto {self.id_producto_id}: +{self.entradas}/-{self.salidas}'
+
+    class Meta:
+        verbose_name = 'Resumen Diario de Movimientos'
+        verbose_name_plural = 'Resumen Diario de Movimientos'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'tipo', 'id_producto'], name='uq_resumen_mov_dia_tipo_producto'),
+        ]
+        indexes = [
+            models.Index(fields=['id_producto', 'fecha'], name='idx_resumen_mov_producto'),
+        ]
+
+
+class Resumen_Diario_Documento(models.Model):
+    """Cantidad de documentos (recepciones, ventas, devoluciones, ajustes) por día y estado."""
+    fecha = models.DateField()
+    documento = models.CharField(max_length=30)
+    estado = models.CharField(max_length=100)
+    cantidad = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.fecha} {self.documento} {self.estado}: {self.cantidad}'
+
+    class Meta:
+        verbose_name = 'Resumen Diario de Documentos'
+        verbose_name_plural = 'Resumen Diario de Documentos'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'documento', 'estado'], name='uq_resumen_doc_dia_estado'),
+        ]
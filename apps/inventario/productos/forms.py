@@ -1,5 +1,6 @@
 from django import forms
 from apps.inventario.models import Productos
+from apps.mantenimiento import catalogos
 from apps.mantenimiento.models import Estado_Producto
 
 
@@ -60,8 +61,7 @@ class ProductoForm(forms.ModelForm):
         obj.es_controlado = self.cleaned_data.get("es_controlado") in (True, "1", 1)
 
         if not getattr(obj, "id_estado_producto_id", None):
-            estado, _ = Estado_Producto.objects.get_or_create(nombre_estado="Activo")
-            obj.id_estado_producto = estado
+            obj.id_estado_producto = catalogos.obtener_o_crear(Estado_Producto, "Activo")
 
         if commit:
             obj.save()
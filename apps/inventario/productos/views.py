@@ -5,31 +5,26 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse, HttpResponse
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
+from apps.mantenimiento import catalogos
 from apps.mantenimiento.models import Estado_Producto
 from apps.inventario.models import Productos, Lotes
+from apps.inventario.resumen_stock import stock_total_por_producto
+from apps.inventario.busqueda import responder_busqueda
+from apps.inventario.kardex import kardex_producto
 from .forms import ProductoForm
 
-from itertools import chain
-from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
-from apps.ajustes_inventario.models import Detalle_Conteo
-from django.db.models import F, Value, Case, When, IntegerField, CharField
 from django.utils.dateparse import parse_date
 from django.utils.timezone import (
-    is_aware,
-    make_naive,
     make_aware,
     get_current_timezone,
     localdate,
 )
 
-from django.db.models import F, Value, Case, When, IntegerField, CharField, ExpressionWrapper
-from django.db.models.functions import Abs, Cast
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.lib.styles import getSampleStyleSheet
 from io import BytesIO
-from django.db.models import Sum  
 # Listado
 def productos_list(request):
     """
@@ -131,6 +126,18 @@ def productos_detail(request, pk):
     return HttpResponse(html)
 
 
+# Búsqueda (autocompletado)
+@require_http_methods(["GET"])
+def productos_buscar(request):
+    """
+    Autocompletado de productos: ?term= (o ?q=), ?solo_activos=1.
+    """
+    qs = Productos.objects.all()
+    if request.GET.get("solo_activos") == "1":
+        qs = qs.filter(id_estado_producto__nombre_estado__iexact="Activo")
+    return responder_busqueda(request, qs)
+
+
 # Editar
 @require_http_methods(["GET", "POST"])
 def productos_edit(request, pk):
@@ -166,7 +173,7 @@ def inactivar_producto(request, pk):
 
     if request.method == "POST":
         try:
-            inactivo = Estado_Producto.objects.get(nombre_estado="Inactivo")
+            inactivo = catalogos.obtener(Estado_Producto, "Inactivo")
         except Estado_Producto.DoesNotExist:
             return JsonResponse(
                 {"success": False, "error": "Estado 'Inactivo' no existe."}, status=500
@@ -176,12 +183,8 @@ def inactivar_producto(request, pk):
         if producto.id_estado_producto_id == inactivo.id:
             return JsonResponse({"success": True, "message": "El producto ya estaba inactivo."})
 
-        # Validación de stock
-        tot = (
-            Lotes.objects.filter(id_producto=producto, cantidad_disponible__gt=0)
-            .aggregate(total=Sum("cantidad_disponible"))
-            .get("total") or 0
-        )
+        # Validación de stock (resumen StockProducto)
+        tot = stock_total_por_producto([producto.id]).get(producto.id, 0)
         if tot > 0:
             lotes = list(
                 Lotes.objects.filter(id_producto=producto, cantidad_disponible__gt=0)
@@ -223,7 +226,7 @@ def activar_producto(request, pk):
 
     if request.method == "POST":
         try:
-            activo = Estado_Producto.objects.get(nombre_estado="Activo")
+            activo = catalogos.obtener(Estado_Producto, "Activo")
         except Estado_Producto.DoesNotExist:
             return JsonResponse(
                 {"success": False, "error": "Estado 'Activo' no existe."}, status=500
@@ -310,97 +313,8 @@ def _resolver_rango_fechas(request):
 
 
 def obtener_kardex_data(producto, fecha_inicio, fecha_fin):
-    """Devuelve los movimientos del kardex con su saldo calculado"""
-    tz = get_current_timezone()
-
-    # 🔹 Movimientos normales
-    movimientos = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(
-            fecha_hora__range=[fecha_inicio, fecha_fin],
-            id_lote__id_producto=producto,
-        )
-        .exclude(estado_movimiento_inventario__nombre_estado__iexact="Cancelado")
-        .select_related("id_tipo_movimiento", "id_lote")
-        .annotate(
-            naturaleza_int=Cast(F("id_tipo_movimiento__naturaleza"), IntegerField()),
-            fecha=F("fecha_hora"),
-            tipo=F("id_tipo_movimiento__descripcion"),
-            origen=Value("Movimiento", output_field=CharField()),
-            cantidad_total=ExpressionWrapper(
-                Case(
-                    When(naturaleza_int=1, then=F("cantidad")),
-                    When(naturaleza_int=-1, then=F("cantidad") * Value(-1)),
-                    default=Value(0),
-                    output_field=IntegerField(),
-                ),
-                output_field=IntegerField(),
-            ),
-            entrada=Case(
-                When(naturaleza_int=1, then=F("cantidad")),
-                default=Value(0),
-                output_field=IntegerField()
-            ),
-            salida=Case(
-                When(naturaleza_int=-1, then=F("cantidad")),
-                default=Value(0),
-                output_field=IntegerField()
-            ),
-        )
-        .values("fecha", "tipo", "origen", "cantidad_total", "entrada", "salida")
-    )
-
-    # 🔹 Ajustes físicos
-    ajustes = (
-        Detalle_Conteo.objects
-        .filter(
-            id_conteo__estado="Completado",
-            id_conteo__fecha_conteo__range=[fecha_inicio.date(), fecha_fin.date()],
-            id_lote__id_producto=producto,
-        )
-        .select_related("id_conteo", "id_lote")
-        .annotate(
-            fecha=F("id_conteo__fecha_conteo"),
-            tipo=F("id_conteo__tipo_ajuste"),
-            origen=Value("Ajuste Físico", output_field=CharField()),
-            cantidad_total=F("diferencia"),
-            entrada=Case(
-                When(diferencia__gt=0, then=F("diferencia")),
-                default=Value(0),
-                output_field=IntegerField()
-            ),
-            salida=Case(
-                When(diferencia__lt=0, then=Abs(F("diferencia"))),
-                default=Value(0),
-                output_field=IntegerField()
-            ),
-        )
-        .values("fecha", "tipo", "origen", "cantidad_total", "entrada", "salida")
-    )
-
-    def normalizar_fecha(f):
-        if isinstance(f, datetime):
-            dt = f
-        else:
-            dt = datetime.combine(f, time.max)
-        if is_aware(dt):
-            dt = make_naive(dt, tz)
-        return dt
-
-    kardex_data = sorted(chain(movimientos, ajustes), key=lambda x: normalizar_fecha(x["fecha"]))
-
-    # 🔹 Calcular saldo acumulado
-    saldo = 0
-    for k in kardex_data:
-        cantidad = int(k.get("cantidad_total") or 0)
-        if k["tipo"].lower().startswith(("venta", "salida")):
-            cantidad = -abs(cantidad)
-        elif k["tipo"].lower().startswith(("recepción", "ingreso", "devolución")):
-            cantidad = abs(cantidad)
-        saldo += cantidad
-        k["saldo"] = saldo
-
-    return kardex_data
+    """Devuelve los movimientos del kardex con su saldo calculado (ver apps.inventario.kardex)"""
+    return kardex_producto(producto.id, fecha_inicio, fecha_fin)
 
 
 # ---------------------------------------------------------------
@@ -0,0 +1,76 @@
+# apps/inventario/pruebas.py
+"""
+Datos base compartidos por las pruebas de inventario, ventas y devoluciones.
+
+No es un módulo de pruebas (el runner no lo descubre): los `tests.py` de cada
+app heredan de `InventarioBase`.
+"""
+from datetime import datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.inventario.models import Lotes, Productos
+from apps.inventario.resumen_stock import sincronizar_por_lotes
+from apps.mantenimiento.models import (
+    Estado_Lote,
+    Estado_Movimiento_Inventario,
+    Estado_Producto,
+    Presentaciones,
+    Tipo_Movimiento_Inventario,
+    Unidades_Medida,
+)
+from apps.mantenimiento.usuarios.models import Usuario
+from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+
+
+class InventarioBase(TestCase):
+    """Catálogos, un usuario y dos productos; cada prueba agrega sus lotes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Los catálogos se crean antes que cualquier lote: el pre_save de Lotes
+        # los lee del registro en memoria (apps.mantenimiento.catalogos).
+        for nombre in ["Disponible", "Próximo a Vencer", "Vencido", "Retirado", "Devuelto"]:
+            Estado_Lote.objects.create(nombre_estado=nombre)
+        cls.estado_ok = Estado_Movimiento_Inventario.objects.create(nombre_estado="Completado")
+        cls.estado_cancelado = Estado_Movimiento_Inventario.objects.create(nombre_estado="Cancelado")
+        cls.tipo_ven = Tipo_Movimiento_Inventario.objects.create(codigo="VEN", descripcion="Venta", naturaleza=-1)
+        cls.tipo_dev = Tipo_Movimiento_Inventario.objects.create(codigo="DEV", descripcion="Devolución", naturaleza=1)
+
+        activo = Estado_Producto.objects.create(nombre_estado="Activo")
+        presentacion = Presentaciones.objects.create(nombre_presentacion="Tableta")
+        unidad = Unidades_Medida.objects.create(nombre_unidad="Unidad")
+        cls.producto = Productos.objects.create(
+            codigo_producto="P001", nombre="Acetaminofén 500 mg",
+            id_presentacion=presentacion, id_unidad_medida=unidad, id_estado_producto=activo,
+        )
+        cls.otro = Productos.objects.create(
+            codigo_producto="P002", nombre="Ibuprofeno 400 mg",
+            id_presentacion=presentacion, id_unidad_medida=unidad, id_estado_producto=activo,
+        )
+        cls.usuario = Usuario.objects.create_user("ventas@saif.test", "Ana", "Pérez", "clave-prueba")
+
+    def crear_lote(self, producto, numero, dias, cantidad, precio=10):
+        lote = Lotes.objects.create(
+            id_producto=producto,
+            numero_lote=numero,
+            fecha_caducidad=timezone.localdate() + timedelta(days=dias),
+            cantidad_disponible=cantidad,
+            precio_venta=precio,
+        )
+        sincronizar_por_lotes([lote.id])
+        return lote
+
+    def existencias(self, *lotes):
+        return [Lotes.objects.get(pk=l.pk).cantidad_disponible for l in lotes]
+
+    def movimiento(self, lote, tipo, cantidad, dia, estado=None, ref="DOC-1"):
+        """Movimiento registrado al mediodía (hora local) de `dia`."""
+        m = Movimientos_Inventario_Sucursal.objects.create(
+            id_lote=lote, id_tipo_movimiento=tipo, cantidad=cantidad, id_usuario=self.usuario,
+            referencia_transaccion=ref, estado_movimiento_inventario=estado or self.estado_ok,
+        )
+        fecha = timezone.make_aware(datetime.combine(dia, time(12)))
+        Movimientos_Inventario_Sucursal.objects.filter(pk=m.pk).update(fecha_hora=fecha)
+        return m
@@ -0,0 +1,288 @@
+# apps/inventario/resumen_diario.py
+"""
+Tablas de hechos diarias para las gráficas operativas.
+
+- `Resumen_Diario_Movimiento`: unidades de entrada/salida por día, tipo de
+  movimiento y producto. Sale de los mismos renglones que el kardex
+  (`kardex.sql_renglones`): movimientos no cancelados y ajustes completados.
+- `Resumen_Diario_Documento`: cantidad de recepciones, ventas, devoluciones y
+  ajustes por día y estado.
+
+Mantenimiento incremental: cuando una transacción cambia stock o el estado de
+un documento se marcan los días (y productos) afectados con
+`marcar_movimientos` / `marcar_documentos`; al confirmar la transacción se
+recalculan solo esos días con un DELETE + INSERT ... SELECT agrupado. Las
+cancelaciones marcan el día del documento original. El comando
+`rebuild_resumen_diario` llena o reconstruye todo el historial.
+
+Las gráficas de un año leen unos cientos de filas ya agregadas.
+"""
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from apps.ajustes_inventario.models import Inventario_Fisico
+from apps.inventario.kardex import como_fecha, params_renglones, sql_renglones
+from apps.inventario.models import Resumen_Diario_Documento, Resumen_Diario_Movimiento
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Movimiento_Inventario, Estado_Recepcion, Tipo_Movimiento_Inventario
+from apps.recepcion_almacenamiento.models import Recepciones_Envio
+from apps.salidas_devoluciones.models import Devolucion, Movimientos_Inventario_Sucursal, Venta
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTOS = {
+    "recepcion": "Recepciones",
+    "venta": "Ventas",
+    "devolucion": "Devoluciones",
+    "ajuste_ingreso": "Ajustes de ingreso",
+    "ajuste_salida": "Ajustes de salida",
+}
+
+# Campo de fecha de cada encabezado (receptor `documento_guardado`)
+CAMPO_FECHA = {
+    Recepciones_Envio: "fecha_recepcion",
+    Venta: "fecha_hora",
+    Devolucion: "fecha_hora",
+    Inventario_Fisico: "fecha_conteo",
+}
+
+# Candado de aplicación para que dos recálculos del mismo día no se crucen
+_CANDADO = 7_202_017
+
+
+def _tabla(modelo):
+    return connection.ops.quote_name(modelo._meta.db_table)
+
+
+def _rangos(dias) -> list:
+    """Agrupa fechas sueltas en rangos contiguos [(desde, hasta_exclusivo)]."""
+    rangos = []
+    for d in sorted(set(dias)):
+        if rangos and rangos[-1][1] == d:
+            rangos[-1][1] = d + timedelta(days=1)
+        else:
+            rangos.append([d, d + timedelta(days=1)])
+    return [tuple(r) for r in rangos]
+
+
+# ---------------------------------------------------------------
+# Recálculo
+# ---------------------------------------------------------------
+def _sql_movimientos() -> str:
+    return f"""
+        INSERT INTO {_tabla(Resumen_Diario_Movimiento)}
+            (fecha, tipo, id_producto_id, entradas, salidas, movimientos)
+        SELECT (k.fecha AT TIME ZONE %(tz)s)::date,
+               CASE WHEN k.origen = 'Movimiento' THEN k.tipo ELSE 'Ajuste ' || k.tipo END,
+               k.producto_id,
+               SUM(GREATEST(k.cantidad, 0)), SUM(GREATEST(-k.cantidad, 0)), COUNT(*)
+        FROM ({sql_renglones()}) k
+        WHERE %(productos)s::int[] IS NULL OR k.producto_id = ANY(%(productos)s::int[])
+        GROUP BY 1, 2, 3
+    """
+
+
+def _sql_documentos() -> str:
+    rango = "{col} >= (%(desde)s::date)::timestamp AT TIME ZONE %(tz)s AND {col} < (%(hasta)s::date)::timestamp AT TIME ZONE %(tz)s"
+    dia = "({col} AT TIME ZONE %(tz)s)::date"
+    encabezados = [
+        ("recepcion", Recepciones_Envio, "fecha_recepcion", Estado_Recepcion, "estado_recepcion_id"),
+        ("venta", Venta, "fecha_hora", Estado_Movimiento_Inventario, "estado_movimiento_inventario_id"),
+        ("devolucion", Devolucion, "fecha_hora", Estado_Movimiento_Inventario, "estado_movimiento_inventario_id"),
+    ]
+    partes = [
+        f"""
+        SELECT {dia.format(col='d.' + fecha)} AS fecha, '{clave}' AS documento,
+               COALESCE(e.nombre_estado, 'Sin estado') AS estado
+        FROM {_tabla(modelo)} d
+        LEFT JOIN {_tabla(estado)} e ON e.id = d.{fk}
+        WHERE {rango.format(col='d.' + fecha)}
+        """
+        for clave, modelo, fecha, estado, fk in encabezados
+    ]
+    partes.append(f"""
+        SELECT c.fecha_conteo, 'ajuste_' || lower(c.tipo_ajuste), COALESCE(NULLIF(c.estado, ''), 'Sin estado')
+        FROM {_tabla(Inventario_Fisico)} c
+        WHERE c.fecha_conteo >= %(desde)s AND c.fecha_conteo < %(hasta)s
+    """)
+    return f"""
+        INSERT INTO {_tabla(Resumen_Diario_Documento)} (fecha, documento, estado, cantidad)
+        SELECT fecha, documento, estado, COUNT(*)
+        FROM ({" UNION ALL ".join(partes)}) d
+        GROUP BY 1, 2, 3
+    """
+
+
+def recalcular_movimientos(desde: date, hasta: date, productos=None) -> None:
+    """Reescribe los hechos de movimientos en [desde, hasta) (solo `productos` si vienen)."""
+    params = params_renglones(None, desde, hasta)
+    params["productos"] = sorted(productos) if productos is not None else None
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_CANDADO])
+        qs = Resumen_Diario_Movimiento.objects.filter(fecha__gte=desde, fecha__lt=hasta)
+        if productos is not None:
+            qs = qs.filter(id_producto_id__in=params["productos"])
+        qs.delete()
+        cursor.execute(_sql_movimientos(), params)
+
+
+def recalcular_documentos(desde: date, hasta: date) -> None:
+    """Reescribe los conteos de documentos en [desde, hasta)."""
+    params = {"desde": desde, "hasta": hasta, "tz": settings.TIME_ZONE}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_CANDADO + 1])
+        Resumen_Diario_Documento.objects.filter(fecha__gte=desde, fecha__lt=hasta).delete()
+        cursor.execute(_sql_documentos(), params)
+
+
+def _recalcular(dias, productos, documentos: bool) -> None:
+    try:
+        for desde, hasta in _rangos(dias):
+            if documentos:
+                recalcular_documentos(desde, hasta)
+            else:
+                recalcular_movimientos(desde, hasta, productos)
+    except Exception:
+        # El documento ya está confirmado: el comando de reconstrucción corrige el día
+        logger.exception("No se pudo actualizar el resumen diario (%s).", sorted(dias))
+
+
+# ---------------------------------------------------------------
+# Marcado incremental (se ejecuta al confirmar la transacción)
+# ---------------------------------------------------------------
+def _dias(fechas) -> set:
+    return {como_fecha(f) for f in fechas if f}
+
+
+def marcar_movimientos(fechas, productos=None) -> None:
+    """Recalcula al confirmar los días dados (solo `productos` si vienen)."""
+    dias = _dias(fechas)
+    if not dias:
+        return
+    productos = {int(p) for p in productos} if productos is not None else None
+    transaction.on_commit(lambda: _recalcular(dias, productos, documentos=False))
+
+
+def marcar_documentos(fechas) -> None:
+    """Recalcula al confirmar los conteos de documentos de los días dados."""
+    dias = _dias(fechas)
+    if dias:
+        transaction.on_commit(lambda: _recalcular(dias, None, documentos=True))
+
+
+def al_actualizar_stock(producto_ids=(), **kwargs):
+    """Receptor de `stock_actualizado`: lo movido hoy entra al resumen de hoy."""
+    marcar_movimientos([timezone.localdate()], producto_ids)
+
+
+def documento_guardado(sender, instance, **kwargs):
+    """Receptor de post_save/post_delete de los encabezados de documento."""
+    marcar_documentos([getattr(instance, CAMPO_FECHA[sender])])
+
+
+# ---------------------------------------------------------------
+# Historial completo
+# ---------------------------------------------------------------
+def primer_dia_con_historia():
+    primeros = [
+        Movimientos_Inventario_Sucursal.objects.aggregate(f=Min("fecha_hora"))["f"],
+        Inventario_Fisico.objects.aggregate(f=Min("fecha_conteo"))["f"],
+        Recepciones_Envio.objects.aggregate(f=Min("fecha_recepcion"))["f"],
+    ]
+    fechas = [como_fecha(f) for f in primeros if f]
+    return min(fechas) if fechas else None
+
+
+def reconstruir(desde: date = None, hasta: date = None, dias_por_lote: int = 31):
+    """
+    Recalcula el resumen de [desde, hasta] (por defecto todo el historial) en
+    tramos de `dias_por_lote` días. Devuelve los tramos procesados.
+    """
+    desde = desde or primer_dia_con_historia()
+    hasta = (hasta or timezone.localdate()) + timedelta(days=1)
+    tramos = []
+    while desde and desde < hasta:
+        fin = min(desde + timedelta(days=dias_por_lote), hasta)
+        recalcular_movimientos(desde, fin)
+        recalcular_documentos(desde, fin)
+        tramos.append((desde, fin - timedelta(days=1)))
+        desde = fin
+    return tramos
+
+
+# ---------------------------------------------------------------
+# Series para gráficas
+# ---------------------------------------------------------------
+def _dias_rango(desde: date, hasta: date) -> list:
+    return [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+
+
+def serie_documentos(documento: str, desde: date, hasta: date, estado: str = None) -> dict:
+    """
+    Documentos por día (opcionalmente de un estado) y total por estado en
+    [desde, hasta]. Lee solo filas del resumen.
+    """
+    filas = (
+        Resumen_Diario_Documento.objects
+        .filter(documento=documento, fecha__range=(desde, hasta))
+        .values_list("fecha", "estado", "cantidad")
+    )
+    if estado:
+        filas = filas.filter(estado__iexact=estado)
+    por_dia, por_estado = {}, {}
+    for fecha, nombre, cantidad in filas:
+        por_dia[fecha] = por_dia.get(fecha, 0) + cantidad
+        por_estado[nombre] = por_estado.get(nombre, 0) + cantidad
+    dias = _dias_rango(desde, hasta)
+    return {
+        "dias": dias,
+        "por_dia": [por_dia.get(d, 0) for d in dias],
+        "por_estado": por_estado,
+    }
+
+
+def serie_movimientos(desde: date, hasta: date, tipo: str = None, producto_id: int = None) -> dict:
+    """
+    Unidades de entrada y salida por día y tipo de movimiento en [desde, hasta]
+    (todos los productos o uno). Agrupa en la base sobre el resumen.
+    """
+    qs = Resumen_Diario_Movimiento.objects.filter(fecha__range=(desde, hasta))
+    if tipo:
+        qs = qs.filter(tipo__iexact=tipo)
+    if producto_id:
+        qs = qs.filter(id_producto_id=producto_id)
+    filas = (
+        qs.values("fecha", "tipo")
+        .annotate(e=Sum("entradas"), s=Sum("salidas"))
+        .order_by()
+    )
+    dias = _dias_rango(desde, hasta)
+    indice = {d: i for i, d in enumerate(dias)}
+    series = {}
+    for f in filas:
+        serie = series.setdefault(f["tipo"], {"entradas": [0] * len(dias), "salidas": [0] * len(dias)})
+        serie["entradas"][indice[f["fecha"]]] = int(f["e"] or 0)
+        serie["salidas"][indice[f["fecha"]]] = int(f["s"] or 0)
+    return {"dias": dias, "series": dict(sorted(series.items()))}
+
+
+def etiqueta_tipo(codigo: str) -> str:
+    """Valor de `tipo` en el resumen para un código de movimiento ("VEN" -> descripción)."""
+    try:
+        t = catalogos.obtener(Tipo_Movimiento_Inventario, codigo)
+    except Tipo_Movimiento_Inventario.DoesNotExist:
+        return codigo
+    return t.descripcion if t.descripcion is not None else t.codigo  # igual que COALESCE en el kardex
+
+
+def rango_con_datos(documento: str = None):
+    """(primer día, último día) del resumen, para el filtro "Todo"."""
+    qs = Resumen_Diario_Documento.objects.filter(documento=documento) if documento \
+        else Resumen_Diario_Movimiento.objects.all()
+    r = qs.aggregate(desde=Min("fecha"), hasta=Max("fecha"))
+    return r["desde"], r["hasta"]
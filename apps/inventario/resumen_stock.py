@@ -0,0 +1,139 @@
+# apps/inventario/resumen_stock.py
+"""
+Mantenimiento del resumen de stock por producto (`StockProducto`).
+
+Las vistas que modifican `Lotes.cantidad_disponible` (recepciones, ventas,
+devoluciones, ajustes, vencimientos) llaman a `sincronizar_stock_productos`
+dentro de su propia transacción con los productos afectados. El recálculo es
+una sola consulta agrupada sobre los lotes de esos productos más un upsert,
+así que el costo no depende del tamaño total de la tabla de lotes.
+
+Después de cada sincronización se envía la señal `stock_actualizado` (con los
+ids de producto) para que otros módulos invaliden lo que derivan del stock,
+p. ej. los contadores de alertas.
+"""
+from django.db.models import F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from apps.inventario.models import Lotes, Productos, StockProducto
+
+# Enviada con producto_ids después de sincronizar el resumen
+stock_actualizado = Signal()
+
+ESTADOS_NO_VIGENTES = ["En Cuarentena", "Vencido", "Retirado", "Devuelto"]
+CAMPOS_RESUMEN = ["stock_total", "stock_vigente", "stock_cuarentena"]
+
+
+def calcular_resumen(producto_ids=None) -> dict:
+    """
+    Calcula {producto_id: {stock_total, stock_vigente, stock_cuarentena}} en una
+    sola consulta agrupada. Si `producto_ids` es None se calcula para todos.
+    """
+    hoy = timezone.localdate()
+    qs = Lotes.objects.filter(cantidad_disponible__gt=0)
+    if producto_ids is not None:
+        qs = qs.filter(id_producto_id__in=list(producto_ids))
+
+    filas = (
+        qs.values("id_producto_id")
+        .annotate(
+            stock_total=Coalesce(Sum("cantidad_disponible"), Value(0)),
+            stock_vigente=Coalesce(
+                Sum(
+                    "cantidad_disponible",
+                    filter=Q(fecha_caducidad__gte=hoy)
+                    & ~Q(id_estado_lote__nombre_estado__in=ESTADOS_NO_VIGENTES),
+                ),
+                Value(0),
+            ),
+            stock_cuarentena=Coalesce(
+                Sum("cantidad_disponible", filter=Q(id_estado_lote__nombre_estado="En Cuarentena")),
+                Value(0),
+            ),
+        )
+        .order_by()
+    )
+    return {
+        f["id_producto_id"]: {k: int(f[k] or 0) for k in CAMPOS_RESUMEN}
+        for f in filas
+    }
+
+
+def sincronizar_stock_productos(producto_ids, marcar_movimiento: bool = True) -> int:
+    """
+    Recalcula y guarda el resumen de los productos indicados.
+    Debe llamarse dentro de la transacción que modificó los lotes.
+    Devuelve la cantidad de filas escritas.
+    """
+    ids = {int(pid) for pid in producto_ids if pid}
+    if not ids:
+        return 0
+
+    resumen = calcular_resumen(ids)
+    ahora = timezone.now()
+    vacio = {k: 0 for k in CAMPOS_RESUMEN}
+
+    filas = [
+        StockProducto(
+            id_producto_id=pid,
+            ultimo_movimiento=ahora if marcar_movimiento else None,
+            **resumen.get(pid, vacio),
+        )
+        for pid in sorted(ids)
+    ]
+    # No se pisa `ultimo_movimiento` cuando solo cambió el estado de un lote.
+    update_fields = CAMPOS_RESUMEN + ["actualizado"]
+    if marcar_movimiento:
+        update_fields.append("ultimo_movimiento")
+
+    StockProducto.objects.bulk_create(
+        filas,
+        update_conflicts=True,
+        unique_fields=["id_producto"],
+        update_fields=update_fields,
+    )
+    stock_actualizado.send(sender=StockProducto, producto_ids=ids)
+    return len(filas)
+
+
+def sincronizar_por_lotes(lote_ids, marcar_movimiento: bool = True) -> int:
+    """Atajo: sincroniza los productos a los que pertenecen los lotes dados."""
+    ids = set(
+        Lotes.objects.filter(id__in=list(lote_ids)).values_list("id_producto_id", flat=True)
+    )
+    return sincronizar_stock_productos(ids, marcar_movimiento=marcar_movimiento)
+
+
+def productos_con_stock():
+    """
+    Productos anotados con `stock_total` leído del resumen (LEFT JOIN a una fila
+    por producto). Reemplaza a `annotate(Sum('lotes__cantidad_disponible'))`.
+    """
+    return Productos.objects.annotate(
+        stock_total=Coalesce(F("stock_resumen__stock_total"), Value(0)),
+    )
+
+
+def stock_total_por_producto(producto_ids) -> dict:
+    """{producto_id: stock_total} leído del resumen."""
+    return dict(
+        StockProducto.objects
+        .filter(id_producto_id__in=list(producto_ids))
+        .values_list("id_producto_id", "stock_total")
+    )
+
+
+def ultimos_movimientos() -> dict:
+    """{producto_id: fecha_hora} del último movimiento registrado por producto."""
+    from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+
+    return dict(
+        Movimientos_Inventario_Sucursal.objects
+        .values("id_lote__id_producto_id")
+        .annotate(ultimo=Max("fecha_hora"))
+        .order_by()
+        .values_list("id_lote__id_producto_id", "ultimo")
+    )
+
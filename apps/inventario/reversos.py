@@ -0,0 +1,120 @@
+# apps/inventario/reversos.py
+"""
+Reversos por conjunto para cancelaciones, rechazos y anulaciones.
+
+Todas las cancelaciones siguen el mismo camino:
+
+1. `bloquear_lotes_reverso` bloquea los lotes afectados en una sola consulta
+   (SELECT ... FOR UPDATE en orden de id, igual que `aplicar_deltas_lotes`).
+2. `revertir_deltas` valida que ningún lote quede en negativo y aplica todas
+   las diferencias con un solo UPDATE.
+3. `revertir_movimientos` además marca los movimientos originales como
+   cancelados con un UPDATE y crea los asientos compensatorios con
+   `bulk_create`.
+
+Así una factura o recepción grande se cancela con el mismo número de
+consultas que una de una sola línea.
+"""
+from apps.inventario.existencias import aplicar_deltas_lotes
+from apps.inventario.kardex import invalidar_cierres
+from apps.inventario.models import Lotes
+from apps.inventario.resumen_diario import marcar_movimientos
+from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+
+
+class ReversoSinStock(Exception):
+    """Revertir dejaría uno o más lotes con existencia negativa."""
+
+    def __init__(self, faltantes):
+        # faltantes: [(lote, disponible, a_revertir)]
+        self.faltantes = faltantes
+        super().__init__("; ".join(self.mensajes()))
+
+    def mensajes(self) -> list:
+        return [
+            f"Lote {lote.numero_lote}: disponible {disp}, a revertir {qty}."
+            for lote, disp, qty in self.faltantes
+        ]
+
+
+def bloquear_lotes_reverso(lote_ids) -> dict:
+    """{lote_id: Lotes} bloqueados en orden de id, con una sola consulta."""
+    ids = sorted({int(i) for i in lote_ids})
+    if not ids:
+        return {}
+    qs = (
+        Lotes.objects
+        .select_for_update()
+        .filter(id__in=ids)
+        .only("id", "id_producto_id", "numero_lote", "cantidad_disponible", "id_estado_lote_id", "fecha_caducidad")
+        .order_by("id")
+    )
+    return {l.id: l for l in qs}
+
+
+def revertir_deltas(deltas, lotes=None, validar: bool = True, sincronizar: bool = True) -> dict:
+    """
+    Aplica `deltas` ({lote_id: cantidad con signo}) con un UPDATE por
+    conjunto. Si `lotes` no viene, los bloquea aquí. Con `validar`, lanza
+    ReversoSinStock si algún lote quedaría en negativo (y no escribe nada).
+    Con `sincronizar=False` el llamador actualiza StockProducto después (p. ej.
+    si también cambia el estado de los lotes).
+    """
+    deltas = {int(k): int(v) for k, v in deltas.items() if v}
+    if not deltas:
+        return {}
+    if lotes is None:
+        lotes = bloquear_lotes_reverso(deltas)
+
+    if validar:
+        faltantes = []
+        for lote_id, delta in sorted(deltas.items()):
+            lote = lotes[lote_id]
+            disp = int(lote.cantidad_disponible or 0)
+            if delta < 0 and disp + delta < 0:
+                faltantes.append((lote, disp, -delta))
+        if faltantes:
+            raise ReversoSinStock(faltantes)
+
+    return aplicar_deltas_lotes(deltas, sincronizar=sincronizar, bloquear=False)
+
+
+def revertir_movimientos(movimientos, *, estado_cancelado, usuario, comentario, validar: bool = True) -> int:
+    """
+    Cancela los `movimientos` de un documento (ya filtrados a los completados):
+    devuelve al lote lo que cada uno movió, los marca como cancelados y crea
+    un asiento inverso (mismo tipo, cantidad con signo contrario, estado
+    cancelado) por cada uno. `comentario(m)` da el texto del asiento inverso.
+    Devuelve cuántos movimientos se revirtieron.
+    """
+    movimientos = list(
+        movimientos.select_for_update().order_by("id")
+        .only("id", "id_lote_id", "id_tipo_movimiento_id", "cantidad", "fecha_hora", "referencia_transaccion")
+    )
+    if not movimientos:
+        return 0
+
+    deltas = {}
+    for m in movimientos:
+        deltas[m.id_lote_id] = deltas.get(m.id_lote_id, 0) - int(m.cantidad or 0)
+    revertir_deltas(deltas, validar=validar)
+
+    invalidar_cierres(min(m.fecha_hora for m in movimientos))
+    marcar_movimientos(m.fecha_hora for m in movimientos)
+    Movimientos_Inventario_Sucursal.objects.filter(id__in=[m.id for m in movimientos]).update(
+        estado_movimiento_inventario=estado_cancelado
+    )
+    Movimientos_Inventario_Sucursal.objects.bulk_create([
+        Movimientos_Inventario_Sucursal(
+            id_lote_id=m.id_lote_id,
+            id_tipo_movimiento_id=m.id_tipo_movimiento_id,
+            cantidad=-int(m.cantidad or 0),
+            id_usuario=usuario,
+            referencia_transaccion=m.referencia_transaccion,
+            comentario=comentario(m),
+            estado_movimiento_inventario=estado_cancelado,
+        )
+        for m in movimientos if m.cantidad
+    ])
+    return len(movimientos)
+
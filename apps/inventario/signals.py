@@ -1,37 +1,11 @@
 # apps/inventario/signals.py
-from datetime import timedelta
-from django.conf import settings
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django.utils import timezone
 
+from apps.inventario import resumen_diario
+from apps.inventario.estados_lote import asignar_estado
 from apps.inventario.models import Lotes
-from apps.mantenimiento.models import Estado_Lote
-
-PROX_VENCER_DIAS = getattr(settings, "PROXIMO_VENCER_DIAS", 30)
-AUTO_ESTADOS = {"Vencido", "Próximo a Vencer"}          # los que maneja el sistema
-ESTADOS_FUERTES = {"Retirado", "Devuelto"}              # nunca tocarlos automáticamente
-
-# Caché simple en memoria de ids por nombre (evita hits repetidos a BD)
-_estado_id_cache = {}
-def estado_id(nombre: str) -> int:
-    if nombre not in _estado_id_cache:
-        obj, _ = Estado_Lote.objects.get_or_create(
-            nombre_estado=nombre,
-            defaults={"descripcion": nombre},
-        )
-        _estado_id_cache[nombre] = obj.id
-    return _estado_id_cache[nombre]
-
-def calcular_estado_por_fecha(fecha_caducidad):
-    if not fecha_caducidad:
-        return None
-    hoy = timezone.localdate()
-    if fecha_caducidad < hoy:
-        return "Vencido"
-    if fecha_caducidad <= hoy + timedelta(days=PROX_VENCER_DIAS):
-        return "Próximo a Vencer"
-    return None
+from apps.inventario.resumen_stock import stock_actualizado
 
 @receiver(pre_save, sender=Lotes)
 def lotes_auto_estado_por_fecha(sender, instance: Lotes, **kwargs):
@@ -42,21 +16,15 @@ def lotes_auto_estado_por_fecha(sender, instance: Lotes, **kwargs):
       - Si la fecha NO cae en esas ventanas y el estado actual era uno de los
         auto-manejados (Vencido / Próximo a Vencer) → devolver a 'Disponible'
         (o dejar el que el usuario eligió: Disponible / En Cuarentena).
+    También deja al día `fecha_transicion` (ver apps.inventario.estados_lote).
     """
-    estado_actual = (getattr(instance.id_estado_lote, "nombre_estado", "") or "").strip()
-    if estado_actual in ESTADOS_FUERTES:
-        return  # no tocar
-
-    auto = calcular_estado_por_fecha(instance.fecha_caducidad)
-
-    if auto in AUTO_ESTADOS:
-        instance.id_estado_lote_id = estado_id(auto)
-        return
+    asignar_estado(instance)
 
-    # Si ya no aplica auto-estado y el actual era uno "auto", vuélvelo a Disponible.
-    if estado_actual in AUTO_ESTADOS:
-        instance.id_estado_lote_id = estado_id("Disponible")
-        return
 
-    # Si el usuario eligió Disponible o En Cuarentena, respétalo.
-    # (No hacer nada aquí).
+# Resumen diario para gráficas: el stock movido hoy y los encabezados de documento
+stock_actualizado.connect(resumen_diario.al_actualizar_stock, dispatch_uid="resumen_diario_stock")
+for _modelo in resumen_diario.CAMPO_FECHA:
+    post_save.connect(resumen_diario.documento_guardado, sender=_modelo,
+                      dispatch_uid=f"resumen_diario_save_{_modelo.__name__}")
+    post_delete.connect(resumen_diario.documento_guardado, sender=_modelo,
+                        dispatch_uid=f"resumen_diario_delete_{_modelo.__name__}")
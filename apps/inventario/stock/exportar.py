@@ -0,0 +1,236 @@
+# apps/inventario/stock/exportar.py
+"""
+Exportación del reporte de stock en PDF, CSV y XLSX.
+
+Las tres salidas recorren los lotes con `values_list().iterator()` en bloques
+de `TAMANO_BLOQUE` filas, así que nunca se cargan todos los lotes a la vez:
+- CSV: se genera fila a fila dentro de un StreamingHttpResponse.
+- XLSX: openpyxl en modo write_only (las filas van a un archivo temporal).
+- PDF: se dibuja página por página con el canvas de reportlab sobre un
+  archivo temporal; cada página es una tabla pequeña de texto plano.
+
+`tabla_pdf` es el mismo dibujo por páginas para cualquier listado (lo usa
+también el PDF de pérdida por vencimiento de alertas).
+"""
+import csv
+import os
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.platypus import Table, TableStyle
+
+TAMANO_BLOQUE = 2000
+
+ENCABEZADOS = ["Código", "Producto", "Descripción", "Presentación", "Disp.",
+               "Lote", "Vencimiento", "Estado Lote", "P. Compra", "P. Venta"]
+
+CAMPOS = [
+    "id_producto__codigo_producto",
+    "id_producto__nombre",
+    "id_producto__descripcion",
+    "id_producto__id_presentacion__nombre_presentacion",
+    "cantidad_disponible",
+    "numero_lote",
+    "fecha_caducidad",
+    "id_estado_lote__nombre_estado",
+    "precio_compra",
+    "precio_venta",
+]
+
+
+class ExportacionNoDisponible(Exception):
+    """El formato pedido necesita una librería que no está instalada."""
+
+
+def iterar_filas(qs, tamano=TAMANO_BLOQUE):
+    """Genera listas de hasta `tamano` tuplas (en el orden de `CAMPOS`)."""
+    filas = qs.order_by("fecha_caducidad", "id").values_list(*CAMPOS).iterator(chunk_size=tamano)
+    while True:
+        bloque = list(islice(filas, tamano))
+        if not bloque:
+            return
+        yield bloque
+
+
+# ---------- CSV ----------
+class _Echo:
+    """Objeto tipo archivo que devuelve lo escrito (para csv.writer)."""
+    def write(self, value):
+        return value
+
+
+def stock_csv(qs):
+    """Generador de texto CSV; pensado para StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    # BOM para que Excel reconozca UTF-8
+    yield "\ufeff" + writer.writerow(ENCABEZADOS)
+    for bloque in iterar_filas(qs):
+        yield "".join(
+            writer.writerow(["" if v is None else v for v in fila]) for fila in bloque
+        )
+
+
+# ---------- XLSX ----------
+def stock_xlsx(qs):
+    """Devuelve un archivo temporal (abierto, en posición 0) con el XLSX."""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportacionNoDisponible("La exportación a Excel requiere el paquete openpyxl.")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Stock")
+    ws.append(ENCABEZADOS)
+    for bloque in iterar_filas(qs):
+        for fila in bloque:
+            ws.append(list(fila))
+
+    salida = tempfile.TemporaryFile()
+    wb.save(salida)
+    salida.seek(0)
+    return salida
+
+
+# ---------- PDF ----------
+def _register_fonts():
+    # intenta cargar DejaVuSans si existe en static/fonts, si no usa Helvetica
+    try:
+        font_path = os.path.join(settings.BASE_DIR, "static", "fonts", "DejaVuSans.ttf")
+        if os.path.exists(font_path):
+            pdfmetrics.registerFont(TTFont("DejaVu", font_path))
+            return "DejaVu"
+    except Exception:
+        pass
+    return "Helvetica"
+
+
+def _header_footer(c, pagina, titulo, nota=""):
+    c.saveState()
+    w, h = landscape(A4)
+    c.setFillColorRGB(0.054, 0.478, 0.227)  # #0E7A3A
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(24, h - 18, titulo)
+    c.setFont("Helvetica", 9)
+    c.setFillColorRGB(0.25, 0.25, 0.25)
+    c.drawRightString(w - 24, h - 18, now().strftime("%d/%m/%Y %H:%M"))
+    c.setFont("Helvetica", 9)
+    c.setFillColorRGB(0.35, 0.35, 0.35)
+    c.drawRightString(w - 24, 16, f"Página {pagina}")
+    if nota:
+        c.setFont("Helvetica", 8)
+        c.drawString(24, 16, nota)
+    c.restoreState()
+
+
+def _money(val):
+    if val is None:
+        return ""
+    try:
+        return f"Q {float(val):,.2f}"
+    except (TypeError, ValueError):
+        return ""
+
+
+def _recortar(texto, ancho, font_name, size):
+    """Recorta el texto con '…' para que quepa en `ancho` puntos."""
+    texto = " ".join(str(texto or "").split())
+    if pdfmetrics.stringWidth(texto, font_name, size) <= ancho:
+        return texto
+    while texto and pdfmetrics.stringWidth(texto + "…", font_name, size) > ancho:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+def tabla_pdf(filas, encabezados, ratios, titulo, alineaciones=(), nota=""):
+    """
+    PDF apaisado dibujado por páginas; devuelve un archivo temporal (abierto,
+    en posición 0). `filas` es un iterable de listas de textos ya formateados
+    en el orden de `encabezados` y se consume de a una página, así que puede
+    ser un generador sobre `.iterator()`. `ratios` son los anchos relativos de
+    las columnas y `alineaciones` comandos ALIGN extra para el cuerpo.
+    """
+    font_name = _register_fonts()
+    page_w, page_h = landscape(A4)
+    left, right, top, bottom = 18, 18, 40, 28
+    total_w = page_w - left - right
+
+    col_widths = [total_w * r for r in ratios]
+    alto_hdr, alto_fila = 16, 13
+    filas_por_pagina = int((page_h - top - bottom - alto_hdr) // alto_fila)
+
+    estilo = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0E7A3A")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, -1), font_name),
+        ("FONTSIZE", (0, 0), (-1, 0), 9),
+        ("FONTSIZE", (0, 1), (-1, -1), 8),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 1),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+        *alineaciones,
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f6f8fa")]),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cfd8dc")),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.6, colors.HexColor("#0E7A3A")),
+    ])
+
+    def celdas(textos):
+        # 6 pt de padding horizontal por celda
+        return [_recortar(t, w - 6, font_name, 8) for t, w in zip(textos, col_widths)]
+
+    salida = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    c = pdf_canvas.Canvas(salida, pagesize=landscape(A4), pageCompression=1)
+    c.setTitle(titulo)
+
+    def dibujar_pagina(filas):
+        tabla = Table([encabezados] + filas, colWidths=col_widths,
+                      rowHeights=[alto_hdr] + [alto_fila] * len(filas))
+        tabla.setStyle(estilo)
+        _w, alto = tabla.wrapOn(c, total_w, page_h)
+        tabla.drawOn(c, left, page_h - top - alto)
+        _header_footer(c, c.getPageNumber(), titulo, nota)
+        c.showPage()
+
+    pendientes = []
+    for fila in filas:
+        pendientes.append(celdas(fila))
+        if len(pendientes) == filas_por_pagina:
+            dibujar_pagina(pendientes)
+            pendientes = []
+    if pendientes or c.getPageNumber() == 1:
+        dibujar_pagina(pendientes)
+
+    c.save()
+    salida.seek(0)
+    return salida
+
+
+def stock_pdf(qs):
+    """Devuelve un archivo temporal (abierto, en posición 0) con el PDF."""
+    def filas():
+        for bloque in iterar_filas(qs):
+            for codigo, nombre, desc, pres, disp, lote, venc, est, pcomp, pvent in bloque:
+                yield [
+                    codigo, nombre, desc, pres, str(disp or 0), lote,
+                    venc.strftime("%d/%m/%Y") if venc else "", est,
+                    _money(pcomp), _money(pvent),
+                ]
+
+    return tabla_pdf(
+        filas(), ENCABEZADOS,
+        ratios=[0.08, 0.15, 0.15, 0.12, 0.06, 0.10, 0.09, 0.08, 0.08, 0.09],
+        titulo="Reporte de Stock · SAIF",
+        alineaciones=[
+            ("ALIGN", (0, 1), (0, -1), "CENTER"),
+            ("ALIGN", (4, 1), (7, -1), "CENTER"),
+            ("ALIGN", (8, 1), (9, -1), "RIGHT"),
+        ],
+    )
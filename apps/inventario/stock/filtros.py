@@ -0,0 +1,109 @@
+# apps/inventario/stock/filtros.py
+"""
+Filtros del listado de stock. Los usan la lista paginada (API JSON) y la
+exportación a PDF para que ambos devuelvan exactamente los mismos lotes.
+
+Parámetros aceptados (querystring):
+- codigo, nombre, desc, pres, lote
+- cadu_desde (yyyy-mm-dd), cadu_hasta (yyyy-mm-dd)
+- estado: nombre del estado (sin importar acentos/mayúsculas) u "otros"
+- solo_disponibles: "1" para incluir únicamente lotes con stock > 0
+"""
+import unicodedata
+from datetime import datetime
+
+from django.db.models import Q
+
+from apps.inventario.models import Lotes
+
+ESTADOS_VALIDOS = {
+    "disponible": "Disponible",
+    "devuelto": "Devuelto",
+    "en cuarentena": "En Cuarentena",
+    "proximo a vencer": "Próximo a Vencer",
+    "retirado": "Retirado",
+    "vencido": "Vencido",
+    "vigente": "Vigente",  # compatibilidad con filtros anteriores
+}
+
+# Nombre público del orden -> lookup del ORM. Solo columnas NOT NULL, porque
+# la paginación por cursor compara el valor de la última fila vista.
+ORDEN_STOCK = {
+    "codigo": "id_producto__codigo_producto",
+    "nombre": "id_producto__nombre",
+    "pres": "id_producto__id_presentacion__nombre_presentacion",
+    "disp": "cantidad_disponible",
+    "lote": "numero_lote",
+    "cadu": "fecha_caducidad",
+}
+
+
+def normalize_estado(nombre: str) -> str:
+    """Normaliza el estado a una cadena en minúsculas sin acentos."""
+    nombre = unicodedata.normalize("NFKD", nombre or "")
+    nombre = "".join(ch for ch in nombre if not unicodedata.combining(ch))
+    nombre = nombre.replace("_", " ").replace("-", " ")
+    return " ".join(nombre.strip().lower().split())
+
+
+def _parse_date(d):
+    try:
+        return datetime.strptime(d, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def leer_filtros_stock(params) -> dict:
+    """Lee los filtros desde un QueryDict (request.GET)."""
+    def texto(clave):
+        return (params.get(clave) or "").strip()
+
+    return {
+        "codigo": texto("codigo"),
+        "nombre": texto("nombre"),
+        "desc": texto("desc"),
+        "pres": texto("pres"),
+        "lote": texto("lote"),
+        "cadu_desde": _parse_date(texto("cadu_desde")),
+        "cadu_hasta": _parse_date(texto("cadu_hasta")),
+        "estado": normalize_estado(texto("estado")),
+        "solo_disponibles": params.get("solo_disponibles") == "1",
+    }
+
+
+def filtrar_lotes_stock(filtros: dict, qs=None):
+    """Aplica los filtros leídos por `leer_filtros_stock` sobre los lotes."""
+    if qs is None:
+        qs = Lotes.objects.select_related(
+            "id_producto", "id_producto__id_presentacion", "id_estado_lote"
+        )
+
+    if filtros["codigo"]:
+        qs = qs.filter(id_producto__codigo_producto__icontains=filtros["codigo"])
+    if filtros["nombre"]:
+        qs = qs.filter(id_producto__nombre__icontains=filtros["nombre"])
+    if filtros["desc"]:
+        qs = qs.filter(id_producto__descripcion__icontains=filtros["desc"])
+    if filtros["pres"]:
+        qs = qs.filter(id_producto__id_presentacion__nombre_presentacion__icontains=filtros["pres"])
+    if filtros["lote"]:
+        # `Lotes` usa `numero_lote`; `codigo_lote` es solo un alias en el modelo.
+        qs = qs.filter(Q(numero_lote__icontains=filtros["lote"]))
+
+    if filtros["cadu_desde"]:
+        qs = qs.filter(fecha_caducidad__gte=filtros["cadu_desde"])
+    if filtros["cadu_hasta"]:
+        qs = qs.filter(fecha_caducidad__lte=filtros["cadu_hasta"])
+
+    estado = filtros["estado"]
+    if estado:
+        estado_objetivo = ESTADOS_VALIDOS.get(estado)
+        if estado_objetivo:
+            qs = qs.filter(id_estado_lote__nombre_estado__iexact=estado_objetivo)
+        elif estado == "otros":
+            qs = qs.exclude(id_estado_lote__nombre_estado__in=list(set(ESTADOS_VALIDOS.values())))
+
+    if filtros["solo_disponibles"]:
+        qs = qs.filter(cantidad_disponible__gt=0)
+
+    return qs
@@ -6,7 +6,10 @@ app_name = "stock"
 urlpatterns = [
     path("", views.stock_list, name="lista"),
     path("<int:pk>/consultar/", views.stock_detail, name="consultar"),
+    path("api/", views.stock_api, name="api"),
     path("exportar/pdf/", views.exportar_stock_pdf, name="exportar_pdf"),
+    path("exportar/csv/", views.exportar_stock_csv, name="exportar_csv"),
+    path("exportar/xlsx/", views.exportar_stock_xlsx, name="exportar_xlsx"),
     path("reporte/stock-critico/", views.reporte_stock_critico, name="reporte_stock_critico"),
 
 ]
@@ -1,3 +1,50 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.utils import timezone
+
+from apps.inventario.kardex import cerrar_periodos, kardex_producto, primer_dia_mes
+from apps.inventario.models import Cierre_Kardex
+from apps.inventario.pruebas import InventarioBase
+
+
+class KardexCierreTests(InventarioBase):
+    def setUp(self):
+        self.mes_actual = primer_dia_mes(timezone.localdate())
+        self.mes_anterior = primer_dia_mes(self.mes_actual - timedelta(days=1))
+        self.mes_cerrado = primer_dia_mes(self.mes_anterior - timedelta(days=1))
+
+        lote = self.crear_lote(self.producto, "L-K1", 300, 0)
+        self.movimiento(lote, self.tipo_dev, 10, self.mes_cerrado + timedelta(days=4))
+        self.movimiento(lote, self.tipo_ven, -3, self.mes_cerrado + timedelta(days=19))
+        self.movimiento(lote, self.tipo_ven, -100, self.mes_cerrado + timedelta(days=20), self.estado_cancelado)
+        self.movimiento(lote, self.tipo_ven, -2, self.mes_anterior + timedelta(days=9))
+        self.movimiento(lote, self.tipo_dev, 4, self.mes_actual)
+        # Otro producto en el mismo mes no entra en el saldo
+        self.movimiento(self.crear_lote(self.otro, "L-K2", 300, 0), self.tipo_dev, 50, self.mes_anterior)
+
+        cerrar_periodos(hasta=self.mes_cerrado)
+
+    def saldos(self, desde):
+        return [
+            (r["entrada"], r["salida"], r["saldo"])
+            for r in kardex_producto(self.producto.id, desde, timezone.localdate())
+        ]
+
+    def test_cierre_guarda_el_saldo_del_mes_sin_cancelados(self):
+        cierre = Cierre_Kardex.objects.get(periodo=self.mes_cerrado, id_producto=self.producto)
+        self.assertEqual(
+            (cierre.saldo_inicial, cierre.entradas, cierre.salidas, cierre.saldo_final), (0, 10, 3, 7)
+        )
+
+    def test_saldo_acumulado_parte_del_cierre_anterior(self):
+        self.assertEqual(self.saldos(self.mes_anterior), [(0, 2, 5), (4, 0, 9)])
+
+    def test_rango_a_mitad_de_mes_suma_lo_posterior_al_cierre(self):
+        self.assertEqual(self.saldos(self.mes_anterior + timedelta(days=14)), [(4, 0, 9)])
+
+    def test_mismo_kardex_con_y_sin_cierres(self):
+        con_cierre = self.saldos(self.mes_cerrado)
+        Cierre_Kardex.objects.all().delete()
+
+        self.assertEqual(self.saldos(self.mes_cerrado), con_cierre)
+        self.assertEqual(con_cierre, [(10, 0, 10), (0, 3, 7), (0, 2, 5), (4, 0, 9)])
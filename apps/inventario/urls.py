@@ -6,6 +6,10 @@ app_name = "inventario"
 urlpatterns = [
     path("", views.index, name="index"),
 
+    # Gráficas (resumen diario)
+    path("graficas/movimientos/", views.grafica_movimientos, name="grafica_movimientos"),
+    path("graficas/documentos/<str:documento>/", views.grafica_documentos, name="grafica_documentos"),
+
     # Submódulo de Productos
     path("productos/", include(("apps.inventario.productos.urls", "productos"), namespace="productos")),
     # Submódulo de Stock
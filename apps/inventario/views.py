@@ -1,4 +1,76 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils import timezone
+
+from apps.inventario.resumen_diario import DOCUMENTOS, serie_documentos, serie_movimientos
+
+MAX_DIAS_GRAFICA = 731  # dos años de puntos diarios
+
 
 def index(request):
     return render(request, "inventario/index.html")
+
+
+# -----------------------------------------------------------
+# GRÁFICAS (JSON leído del resumen diario)
+# -----------------------------------------------------------
+def _rango_fechas(request):
+    """(desde, hasta) de ?desde=&hasta= (AAAA-MM-DD); por defecto los últimos 30 días."""
+    hoy = timezone.localdate()
+    try:
+        hasta = datetime.strptime(request.GET["hasta"], "%Y-%m-%d").date() if request.GET.get("hasta") else hoy
+        desde = (
+            datetime.strptime(request.GET["desde"], "%Y-%m-%d").date() if request.GET.get("desde")
+            else hasta - timedelta(days=29)
+        )
+    except ValueError:
+        raise ValueError("Las fechas deben tener el formato AAAA-MM-DD.")
+    if desde > hasta:
+        raise ValueError("La fecha inicial no puede ser posterior a la final.")
+    if (hasta - desde).days >= MAX_DIAS_GRAFICA:
+        raise ValueError(f"El rango no puede superar {MAX_DIAS_GRAFICA} días.")
+    return desde, hasta
+
+
+@login_required
+def grafica_movimientos(request):
+    """Unidades que entran y salen por día y tipo de movimiento (?tipo=, ?producto=)."""
+    try:
+        desde, hasta = _rango_fechas(request)
+        producto_id = int(request.GET["producto"]) if request.GET.get("producto") else None
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    serie = serie_movimientos(desde, hasta, tipo=request.GET.get("tipo") or None, producto_id=producto_id)
+    return JsonResponse({
+        "success": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "labels": [d.strftime("%d/%m/%Y") for d in serie["dias"]],
+        "series": serie["series"],
+    })
+
+
+@login_required
+def grafica_documentos(request, documento):
+    """Documentos por día y por estado: recepcion, venta, devolucion, ajuste_ingreso, ajuste_salida."""
+    if documento not in DOCUMENTOS:
+        return JsonResponse({"success": False, "error": "Documento no válido."}, status=404)
+    try:
+        desde, hasta = _rango_fechas(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    serie = serie_documentos(documento, desde, hasta, estado=request.GET.get("estado") or None)
+    return JsonResponse({
+        "success": True,
+        "documento": DOCUMENTOS[documento],
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "labels": [d.strftime("%d/%m/%Y") for d in serie["dias"]],
+        "por_dia": serie["por_dia"],
+        "por_estado": serie["por_estado"],
+    })
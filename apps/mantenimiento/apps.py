@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MantenimientoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.mantenimiento'
+
+    def ready(self):
+        # invalidación del registro de catálogos (apps/mantenimiento/catalogos.py)
+        from . import signals  # noqa: F401
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class AuditoriaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.mantenimiento.auditoria'
+    label = "mnt_auditoria"
+    verbose_name = "Auditoría"
@@ -0,0 +1,171 @@
+# apps/mantenimiento/auditoria/bitacora.py
+"""
+Bitácora de auditoría (`Auditoria`) con escritura diferida por lotes.
+
+- `registrar()` no toca la base: arma la fila (con la hora de la acción) y la
+  entrega al buffer del proceso cuando la transacción confirma
+  (`transaction.on_commit`). Si la transacción se revierte, no queda nada.
+- Un hilo escritor por proceso (se inicia con la primera fila) vacía el
+  buffer con un solo `bulk_create` cada `AUDITORIA_INTERVALO_MS` ms, o antes
+  si se juntan `AUDITORIA_LOTE` filas. Lo pendiente se escribe también al
+  terminar el proceso (atexit).
+- Si el lote falla por una fila inválida (IntegrityError/DataError, p. ej.
+  el usuario se borró antes de escribir) se reintenta fila por fila y las
+  inválidas se descartan con un aviso en el log. Solo los errores de
+  conexión devuelven las filas al buffer para el siguiente ciclo.
+- El usuario es el de la petición en curso (`AuditoriaMiddleware`) salvo que
+  se pase explícito. Sin usuario autenticado (comandos, login) no se registra.
+
+Las altas, cambios y bajas de los modelos en `signals.py` se registran con
+`al_guardar` / `al_borrar`; las acciones de negocio (venta, anulación,
+recepción, ajuste, retiro) llaman a `registrar()` desde su vista.
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import (
+    DataError, IntegrityError, InterfaceError, OperationalError, close_old_connections, transaction,
+)
+from django.utils import timezone
+
+from apps.mantenimiento.models import Auditoria
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_MS = getattr(settings, "AUDITORIA_INTERVALO_MS", 500)
+LOTE = getattr(settings, "AUDITORIA_LOTE", 200)
+MAX_PENDIENTES = getattr(settings, "AUDITORIA_MAX_PENDIENTES", 50_000)
+
+usuario_actual = ContextVar("auditoria_usuario", default=None)
+
+
+class _Escritor:
+    """Buffer en memoria + hilo que lo vacía por lotes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = deque()
+        self._aviso = threading.Event()
+        self._hilo = None
+
+    def encolar(self, fila) -> None:
+        with self._lock:
+            if len(self._pendientes) >= MAX_PENDIENTES:
+                # la base no responde: se descarta lo más viejo antes que crecer sin límite
+                self._pendientes.popleft()
+                logger.warning("Bitácora de auditoría llena; se descartó una fila.")
+            self._pendientes.append(fila)
+            lleno = len(self._pendientes) >= LOTE
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name="auditoria", daemon=True)
+                self._hilo.start()
+        if lleno:
+            self._aviso.set()
+
+    def _ciclo(self) -> None:
+        while True:
+            self._aviso.wait(INTERVALO_MS / 1000)
+            self._aviso.clear()
+            try:
+                self.vaciar()
+            except (OperationalError, InterfaceError) as e:
+                logger.warning("Bitácora de auditoría sin conexión (%s filas pendientes): %s", self.pendientes(), e)
+            except Exception:
+                logger.exception("No se pudo escribir la bitácora de auditoría.")
+
+    def _devolver(self, filas) -> None:
+        with self._lock:
+            self._pendientes.extendleft(reversed(filas))
+
+    def vaciar(self) -> int:
+        """
+        Escribe todo lo pendiente y devuelve cuántas filas quedaron escritas.
+        Sin conexión, las filas vuelven al buffer y se propaga el error.
+        """
+        with self._lock:
+            filas = list(self._pendientes)
+            self._pendientes.clear()
+        if not filas:
+            return 0
+        close_old_connections()
+        try:
+            Auditoria.objects.bulk_create(filas, batch_size=1000)
+        except (IntegrityError, DataError):
+            return self._una_por_una(filas)
+        except (OperationalError, InterfaceError):
+            self._devolver(filas)
+            raise
+        return len(filas)
+
+    def _una_por_una(self, filas) -> int:
+        """Inserta fila por fila y descarta las que la base rechaza."""
+        escritas = 0
+        for i, fila in enumerate(filas):
+            try:
+                Auditoria.objects.bulk_create([fila])
+            except (IntegrityError, DataError) as e:
+                logger.warning(
+                    "Fila de auditoría descartada (%s, %s #%s, usuario %s): %s",
+                    fila.accion, fila.tabla_afectada, fila.id_registro_afectado, fila.id_usuario_id, e,
+                )
+            except (OperationalError, InterfaceError):
+                self._devolver(filas[i:])
+                raise
+            else:
+                escritas += 1
+        return escritas
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+
+_escritor = _Escritor()
+vaciar = _escritor.vaciar
+pendientes = _escritor.pendientes
+
+
+@atexit.register
+def _al_salir():
+    try:
+        vaciar()
+    except Exception:
+        logger.exception("Quedaron filas de auditoría sin escribir al terminar el proceso.")
+
+
+def registrar(accion: str, registro=None, usuario=None, tabla=None, id_registro=None) -> None:
+    """
+    Agenda una fila de auditoría. `registro` (instancia de modelo) completa
+    tabla e id; `usuario` por defecto es el de la petición en curso.
+    """
+    usuario = usuario or usuario_actual.get()
+    if usuario is None or not usuario.is_authenticated:
+        return
+    if registro is not None:
+        tabla = tabla or registro._meta.db_table
+        id_registro = registro.pk if id_registro is None else id_registro
+    fila = Auditoria(
+        accion=accion[:255],
+        fecha_hora=timezone.now(),
+        tabla_afectada=tabla,
+        id_registro_afectado=id_registro,
+        id_usuario_id=usuario.pk,
+    )
+    transaction.on_commit(partial(_escritor.encolar, fila))
+
+
+# ---------------------------------------------------------------
+# Receptores (conectados en apps/mantenimiento/signals.py)
+# ---------------------------------------------------------------
+def al_guardar(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        registrar("Crear" if created else "Actualizar", instance)
+
+
+def al_borrar(sender, instance, **kwargs):
+    registrar("Eliminar", instance)
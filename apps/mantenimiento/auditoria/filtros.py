@@ -0,0 +1,59 @@
+# apps/mantenimiento/auditoria/filtros.py
+"""
+Filtros del visor de auditoría (querystring):
+- usuario: id del usuario
+- tabla: nombre de la tabla afectada (contiene)
+- accion: texto de la acción (contiene)
+- desde / hasta (yyyy-mm-dd): días completos en la zona horaria local
+
+El rango de fechas se traduce a límites de `fecha_hora` para que lo resuelva
+el índice BRIN.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+# Nombre público del orden -> lookup del ORM (NOT NULL, ver farmacia/paginacion.py)
+ORDEN_AUDITORIA = {
+    "fecha": "fecha_hora",
+}
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _inicio_del_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def leer_filtros(params) -> dict:
+    """Lee los filtros desde un QueryDict (request.GET)."""
+    def texto(clave):
+        return (params.get(clave) or "").strip()
+
+    usuario = texto("usuario")
+    return {
+        "usuario": int(usuario) if usuario.isdigit() else None,
+        "tabla": texto("tabla"),
+        "accion": texto("accion"),
+        "desde": _fecha(texto("desde")),
+        "hasta": _fecha(texto("hasta")),
+    }
+
+
+def filtrar(filtros: dict, qs):
+    if filtros["usuario"]:
+        qs = qs.filter(id_usuario_id=filtros["usuario"])
+    if filtros["tabla"]:
+        qs = qs.filter(tabla_afectada__icontains=filtros["tabla"])
+    if filtros["accion"]:
+        qs = qs.filter(accion__icontains=filtros["accion"])
+    if filtros["desde"]:
+        qs = qs.filter(fecha_hora__gte=_inicio_del_dia(filtros["desde"]))
+    if filtros["hasta"]:
+        qs = qs.filter(fecha_hora__lt=_inicio_del_dia(filtros["hasta"] + timedelta(days=1)))
+    return qs
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = "mantenimiento_auditoria"
+
+urlpatterns = [
+    path("", views.lista, name="lista"),
+    path("api/", views.api, name="api"),
+]
@@ -0,0 +1,52 @@
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from apps.mantenimiento.decorators import solo_admin
+from apps.mantenimiento.models import Auditoria
+from apps.mantenimiento.usuarios.models import Usuario
+from farmacia.paginacion import leer_limite, leer_orden, paginar_keyset
+from .filtros import ORDEN_AUDITORIA, filtrar, leer_filtros
+
+
+# =============== LISTA ===============
+@solo_admin
+def lista(request):
+    # Las filas se cargan por página desde `api`
+    usuarios = Usuario.objects.order_by("nombre", "apellido").values("id", "nombre", "apellido")
+    return render(request, "mantenimiento_auditoria/lista.html", {"usuarios": usuarios})
+
+
+# =============== LISTA (JSON paginado) ===============
+@solo_admin
+def api(request):
+    """
+    Página de la bitácora, la más reciente primero. Filtros en `filtros.py`
+    más orden (fecha / -fecha), limite y los cursores despues / antes.
+    El total solo se calcula en la primera página.
+    """
+    qs = filtrar(leer_filtros(request.GET), Auditoria.objects.all())
+    campo, descendente = leer_orden(request.GET.get("orden"), ORDEN_AUDITORIA, "-fecha")
+    despues = request.GET.get("despues")
+    antes = request.GET.get("antes")
+
+    filas = qs.values(
+        "id", "accion", "fecha_hora", "tabla_afectada", "id_registro_afectado",
+        usuario=Concat(F("id_usuario__nombre"), Value(" "), F("id_usuario__apellido")),
+    )
+    resultados, siguiente, anterior = paginar_keyset(
+        filas, campo, descendente,
+        despues=despues, antes=antes,
+        limite=leer_limite(request.GET.get("limite")),
+    )
+    for fila in resultados:
+        fila["fecha_hora"] = timezone.localtime(fila["fecha_hora"]).strftime("%d/%m/%Y %H:%M:%S")
+
+    return JsonResponse({
+        "results": resultados,
+        "siguiente": siguiente,
+        "anterior": anterior,
+        "total": None if (despues or antes) else qs.count(),
+    })
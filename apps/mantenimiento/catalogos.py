@@ -0,0 +1,151 @@
+# apps/mantenimiento/catalogos.py
+"""
+Registro de catálogos (estados y tipos de movimiento).
+
+Las vistas transaccionales buscan siempre las mismas filas ("Completado",
+"VEN", "Disponible"...). Aquí se cargan todas las filas de cada catálogo la
+primera vez que se piden y se guardan en memoria del proceso:
+
+    from apps.mantenimiento import catalogos
+    tipo_ven = catalogos.obtener(Tipo_Movimiento_Inventario, "VEN")
+
+`obtener` lanza `<Modelo>.DoesNotExist` igual que `.objects.get()`, así que
+los `try/except` existentes no cambian.
+
+Invalidación: los signals post_save/post_delete de cada catálogo (ver
+signals.py) limpian la copia local y suben un número de versión en la caché
+de Django; los demás procesos comparan esa versión cada
+`CATALOGOS_VERIFICAR_SEGUNDOS` y recargan si cambió. Con la caché por defecto
+(LocMemCache) la versión solo es visible dentro del mismo proceso; para
+varios workers conviene una caché compartida (Redis, Memcached, base de datos).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.mantenimiento.models import (
+    Estado_Envio_Receta,
+    Estado_Lote,
+    Estado_Movimiento_Inventario,
+    Estado_Producto,
+    Estado_Recepcion,
+    Estado_Solicitud,
+    Estado_Vencimiento,
+    Tipo_Movimiento_Inventario,
+)
+
+# Modelo -> campo único por el que se busca
+CATALOGOS = {
+    Estado_Lote: "nombre_estado",
+    Estado_Producto: "nombre_estado",
+    Estado_Envio_Receta: "nombre_estado",
+    Estado_Movimiento_Inventario: "nombre_estado",
+    Estado_Solicitud: "nombre_estado",
+    Estado_Vencimiento: "nombre_estado",
+    Estado_Recepcion: "nombre_estado",
+    Tipo_Movimiento_Inventario: "codigo",
+}
+
+CLAVE_VERSION = "saif:catalogos:version"
+VERIFICAR_SEGUNDOS = getattr(settings, "CATALOGOS_VERIFICAR_SEGUNDOS", 5)
+
+_lock = threading.Lock()
+_filas = {}            # modelo -> {clave: instancia}
+_version = None        # versión con la que se cargó _filas
+_verificado = 0.0      # última vez que se comparó la versión compartida
+
+
+def _version_compartida():
+    return cache.get(CLAVE_VERSION, 0)
+
+
+def _vigentes():
+    """Limpia la copia local si otro proceso invalidó los catálogos."""
+    global _version, _verificado
+    ahora = time.monotonic()
+    if ahora - _verificado < VERIFICAR_SEGUNDOS:
+        return
+    version = _version_compartida()
+    with _lock:
+        if version != _version:
+            _filas.clear()
+            _version = version
+        _verificado = ahora
+
+
+def _cargar(modelo) -> dict:
+    campo = CATALOGOS[modelo]
+    filas = {getattr(obj, campo): obj for obj in modelo.objects.all()}
+    with _lock:
+        _filas[modelo] = filas
+    return filas
+
+
+def obtener(modelo, clave):
+    """Fila del catálogo por su nombre/código. Lanza modelo.DoesNotExist."""
+    _vigentes()
+    filas = _filas.get(modelo)
+    if filas is None or clave not in filas:
+        # Puede haberse creado en otro proceso antes de subir la versión
+        filas = _cargar(modelo)
+    try:
+        return filas[clave]
+    except KeyError:
+        raise modelo.DoesNotExist(
+            f"{modelo.__name__} con {CATALOGOS[modelo]}={clave!r} no existe."
+        ) from None
+
+
+def obtener_id(modelo, clave) -> int:
+    return obtener(modelo, clave).id
+
+
+def obtener_por_pk(modelo, pk):
+    """Fila del catálogo por id, o None si no existe."""
+    _vigentes()
+
+    def buscar(filas):
+        return next((obj for obj in filas.values() if obj.pk == pk), None)
+
+    filas = _filas.get(modelo)
+    obj = buscar(filas) if filas is not None else None
+    if obj is None:
+        obj = buscar(_cargar(modelo))
+    return obj
+
+
+def obtener_o_crear(modelo, clave, defaults=None):
+    """Como get_or_create, pero sin consulta cuando la fila ya está en memoria."""
+    try:
+        return obtener(modelo, clave)
+    except modelo.DoesNotExist:
+        # si se crea, post_save invalida el registro
+        obj, _ = modelo.objects.get_or_create(**{CATALOGOS[modelo]: clave}, defaults=defaults or {})
+        return obj
+
+
+def _limpiar_local():
+    global _verificado
+    with _lock:
+        _filas.clear()
+        _verificado = 0.0
+
+
+def _subir_version():
+    _limpiar_local()
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 1, None)
+
+
+def invalidar(**kwargs):
+    """
+    Descarta la copia local y, al confirmar la transacción, avisa a los demás
+    procesos (se usa como receptor de post_save/post_delete).
+    """
+    _limpiar_local()
+    transaction.on_commit(_subir_version)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:41
+
+import django.contrib.postgres.indexes
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenimiento', '0003_delete_estado_alerta_delete_tipo_alerta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditoria',
+            name='fecha_hora',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='auditoria',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['fecha_hora'], name='auditoria_fecha_brin'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
+from django.utils import timezone
+
 from apps.mantenimiento.usuarios.models import Usuario
 
 # Create your models here.
@@ -154,8 +157,13 @@ class Tipo_Movimiento_Inventario(models.Model):
 
 
 class Auditoria(models.Model):
+    """Bitácora de acciones de los usuarios.
+
+    Solo se escribe en lotes desde apps.mantenimiento.auditoria.bitacora;
+    `fecha_hora` es el momento de la acción, no el de la escritura.
+    """
     accion = models.CharField(max_length=255)
-    fecha_hora = models.DateTimeField(auto_now_add=True)
+    fecha_hora = models.DateTimeField(default=timezone.now)
     tabla_afectada = models.CharField(max_length=100, null=True, blank=True)
     id_registro_afectado = models.IntegerField(null=True, blank=True)
     id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)  # 👈 cambio aquí
@@ -165,4 +173,8 @@ class Auditoria(models.Model):
     
     class Meta:
         verbose_name = 'Auditoría'
-        verbose_name_plural = 'Auditorías'
\ No newline at end of file
+        verbose_name_plural = 'Auditorías'
+        indexes = [
+            # tabla solo de inserción en orden de fecha: BRIN ocupa unas pocas páginas
+            BrinIndex(fields=["fecha_hora"], name="auditoria_fecha_brin"),
+        ]
@@ -0,0 +1,28 @@
+# apps/mantenimiento/signals.py
+from django.db.models.signals import post_delete, post_save
+
+from apps.inventario.models import Lotes, Productos
+from apps.mantenimiento.auditoria import bitacora
+from apps.mantenimiento.catalogos import CATALOGOS, invalidar
+from apps.mantenimiento.models import Condiciones_Almacenamiento, Laboratorio, Presentaciones, Roles, Unidades_Medida
+from apps.mantenimiento.usuarios.models import Usuario
+from apps.recetas.models import EnvioReceta, RecetaMedica
+from apps.solicitudes_bodega_central.models import Solicitudes_Faltantes
+
+# Cualquier cambio en un catálogo invalida el registro en memoria
+for _modelo in CATALOGOS:
+    post_save.connect(invalidar, sender=_modelo, dispatch_uid=f"catalogos_save_{_modelo.__name__}")
+    post_delete.connect(invalidar, sender=_modelo, dispatch_uid=f"catalogos_delete_{_modelo.__name__}")
+
+# Altas, cambios y bajas que quedan en la bitácora de auditoría. Los documentos
+# que mueven stock (ventas, devoluciones, recepciones, ajustes, retiros) se registran
+# como acción de negocio desde su vista.
+AUDITADOS = [
+    *CATALOGOS,
+    Usuario, Roles, Laboratorio, Presentaciones, Unidades_Medida, Condiciones_Almacenamiento,
+    Productos, Lotes,
+    Solicitudes_Faltantes, RecetaMedica, EnvioReceta,
+]
+for _modelo in AUDITADOS:
+    post_save.connect(bitacora.al_guardar, sender=_modelo, dispatch_uid=f"auditoria_save_{_modelo.__name__}")
+    post_delete.connect(bitacora.al_borrar, sender=_modelo, dispatch_uid=f"auditoria_delete_{_modelo.__name__}")
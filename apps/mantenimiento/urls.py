@@ -12,4 +12,5 @@ urlpatterns = [
     path("presentaciones/", include(("apps.mantenimiento.presentaciones.urls", "presentaciones"), namespace="mantenimiento_presentaciones")),
     path("unidadesmedida/", include(("apps.mantenimiento.unidadesmedida.urls", "unidadesmedida"), namespace="unidadesmedida")),
     path("condicionesalmacenamiento/", include(("apps.mantenimiento.condicionesalmacenamiento.urls", "condicionesalmacenamiento"), namespace="mantenimiento_condicionesalmacenamiento")),
+    path("auditoria/", include(("apps.mantenimiento.auditoria.urls", "auditoria"), namespace="mantenimiento_auditoria")),
 ]
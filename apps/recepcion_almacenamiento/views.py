@@ -8,7 +8,6 @@ from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import F, Q
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
@@ -16,7 +15,15 @@ from django.utils import timezone
 from .forms import RecepcionForm
 from .models import Detalle_Recepcion, Recepciones_Envio
 from apps.inventario.models import Lotes, Productos
+from apps.inventario.existencias import aplicar_deltas_lotes
+from apps.inventario.kardex import invalidar_cierres
+from apps.inventario.resumen_diario import marcar_movimientos, rango_con_datos, serie_documentos
+from apps.inventario.reversos import revertir_deltas
+from apps.inventario.signals import lotes_auto_estado_por_fecha
+from apps.inventario.busqueda import responder_busqueda
 from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.auditoria import bitacora
 from apps.mantenimiento.models import (
     Estado_Recepcion,
     Estado_Lote,
@@ -36,10 +43,10 @@ from django.views.decorators.http import require_POST
 
 # ------------- utilidades internas -------------
 def _get_estado_recepcion(nombre: str) -> Estado_Recepcion:
-    return Estado_Recepcion.objects.get(nombre_estado=nombre)
+    return catalogos.obtener(Estado_Recepcion, nombre)
 
 def _get_estado_mov(nombre: str) -> Estado_Movimiento_Inventario:
-    return Estado_Movimiento_Inventario.objects.get(nombre_estado=nombre)
+    return catalogos.obtener(Estado_Movimiento_Inventario, nombre)
 
 # -------------------------------
 # Cambio de estado 
@@ -87,6 +94,7 @@ def recepcion_cambiar_estado(request, pk: int):
     if nuevo_estado_nombre in ("Recibido Completo", "Recibido Parcialmente"):
         recepcion.estado_recepcion = estado_nuevo
         recepcion.save(update_fields=["estado_recepcion"])
+        bitacora.registrar(f"Recepción {recepcion.numero_envio_bodega}: {nuevo_estado_nombre}", recepcion)
         return JsonResponse({"success": True, "nuevo_estado": nuevo_estado_nombre})
 
     # Rechazado: validaciones + reversión "blanda"
@@ -133,20 +141,25 @@ def recepcion_cambiar_estado(request, pk: int):
             }, status=400)
 
         # 1) Marcar todos los REC de esta recepción como Cancelado
-        Movimientos_Inventario_Sucursal.objects.filter(
+        recs = Movimientos_Inventario_Sucursal.objects.filter(
             referencia_transaccion=recepcion.numero_envio_bodega,
             id_tipo_movimiento__codigo="REC",
-        ).update(estado_movimiento_inventario=estado_mov_cancelado, comentario=motivo)
+        )
+        fechas = list(recs.values_list("fecha_hora", flat=True))
+        invalidar_cierres(min(fechas, default=None))
+        marcar_movimientos(fechas)
+        recs.update(estado_movimiento_inventario=estado_mov_cancelado, comentario=motivo)
 
-        # 2) Revertir stock (restar lo que sumó la recepción)
+        # 2) Revertir stock (restar lo que sumó la recepción) con un solo UPDATE
+        deltas = {}
         for d in detalles:
-            Lotes.objects.filter(pk=d.id_lote_id).update(
-                cantidad_disponible=F("cantidad_disponible") - int(d.cantidad_recibida or 0)
-            )
+            deltas[d.id_lote_id] = deltas.get(d.id_lote_id, 0) - int(d.cantidad_recibida or 0)
+        revertir_deltas(deltas, validar=False)
 
         # 3) Guardar estado en el header
         recepcion.estado_recepcion = estado_nuevo
         recepcion.save(update_fields=["estado_recepcion"])
+        bitacora.registrar(f"Recepción {recepcion.numero_envio_bodega}: Rechazado", recepcion)
 
         return JsonResponse({"success": True, "nuevo_estado": nuevo_estado_nombre})
     
@@ -191,15 +204,10 @@ def recepcion_detail(request, pk):
 
 @login_required
 def recepcion_graficas(request):
-    """Vista simple de graficas para Recepciones."""
-    qs = Recepciones_Envio.objects.select_related("estado_recepcion")
-
+    """Vista simple de graficas para Recepciones (lee el resumen diario de documentos)."""
     estado_param = (request.GET.get("estado") or "").strip()
     rango_raw = (request.GET.get("rango") or "").strip()
 
-    if estado_param:
-        qs = qs.filter(estado_recepcion__nombre_estado__iexact=estado_param)
-
     from datetime import timedelta
     today = timezone.localdate()
 
@@ -209,52 +217,18 @@ def recepcion_graficas(request):
 
     rango_param = _normalize_rango(rango_raw) or "max"
 
-    rango_inicio = None
-    rango_fin = None
     if rango_param in {"7", "14", "30"}:
-        dias = int(rango_param)
-        rango_fin = today
-        rango_inicio = today - timedelta(days=dias - 1)
-        qs = qs.filter(fecha_recepcion__date__range=(rango_inicio, rango_fin))
-
-    registros = list(
-        qs.values("estado_recepcion__nombre_estado", "fecha_recepcion")
-    )
-
-    estados: dict[str, int] = {}
-    for r in registros:
-        key = r.get("estado_recepcion__nombre_estado") or "Sin estado"
-        estados[key] = estados.get(key, 0) + 1
-
-    fechas = [r["fecha_recepcion"].date() for r in registros if r.get("fecha_recepcion")]
-    if rango_inicio and rango_fin:
-        inicio = rango_inicio
-        fin = rango_fin
-    elif fechas:
-        inicio = min(fechas)
-        fin = max(fechas)
-    else:
         fin = today
-        inicio = today - timedelta(days=6)
-
-    if inicio > fin:
-        inicio, fin = fin, inicio
-
-    labels_dates = []
-    current = inicio
-    while current <= fin:
-        labels_dates.append(current)
-        current += timedelta(days=1)
-
-    diarios = {fecha: 0 for fecha in labels_dates}
-    for r in registros:
-        dt = r.get("fecha_recepcion")
-        if not dt:
-            continue
-        fecha = dt.date()
-        if fecha < inicio or fecha > fin:
-            continue
-        diarios[fecha] += 1
+        inicio = today - timedelta(days=int(rango_param) - 1)
+    else:
+        inicio, fin = rango_con_datos("recepcion")
+        if not inicio:
+            fin = today
+            inicio = today - timedelta(days=6)
+
+    serie = serie_documentos("recepcion", inicio, fin, estado=estado_param or None)
+    estados = serie["por_estado"]
+    labels_dates = serie["dias"]
 
     estados_catalogo = list(
         Estado_Recepcion.objects.order_by("nombre_estado").values_list("nombre_estado", flat=True)
@@ -266,7 +240,7 @@ def recepcion_graficas(request):
 
     context = {
         "labels_dias": [d.strftime("%d/%m") for d in labels_dates],
-        "data_dias": [diarios[d] for d in labels_dates],
+        "data_dias": serie["por_dia"],
         "labels_estados": labels_estados,
         "data_estados": data_estados,
         "estados_catalogo": estados_catalogo,
@@ -279,7 +253,6 @@ def recepcion_graficas(request):
 
 @login_required
 def search_productos(request):
-    term = request.GET.get("term", "").strip()
     factura = (request.GET.get("factura") or "").strip()
 
     # If a factura is provided, limit products to those that appear in that factura
@@ -295,31 +268,8 @@ def search_productos(request):
     else:
         productos_qs = Productos.objects.all()
 
-    productos = (
-        productos_qs
-        .select_related("id_presentacion", "id_unidad_medida", "id_condicion_almacenamiento", "id_estado_producto")
-        .filter(
-            Q(nombre__icontains=term) | Q(codigo_producto__icontains=term),
-            id_estado_producto__nombre_estado__iexact="Activo",
-        )
-        [:20]
-    )
-
-    results = []
-    for p in productos:
-        results.append({
-            "id": p.id,
-            "codigo": p.codigo_producto,
-            "nombre": p.nombre,
-            "descripcion": p.descripcion or "",
-            # 👇 usa __str__ de cada FK; si es NULL, devuelve ""
-            "presentacion": str(p.id_presentacion) if p.id_presentacion_id else "",
-            "unidad": str(p.id_unidad_medida) if p.id_unidad_medida_id else "",
-            "condicion": str(p.id_condicion_almacenamiento) if p.id_condicion_almacenamiento_id else "",
-            "receta": bool(p.requiere_receta),
-            "controlado": bool(p.es_controlado),
-        })
-    return JsonResponse(results, safe=False)
+    activos = productos_qs.filter(id_estado_producto__nombre_estado__iexact="Activo")
+    return responder_busqueda(request, activos)
 
 @login_required
 def search_lotes(request, producto_id: int):
@@ -384,9 +334,8 @@ def create_lote(request):
         except ValueError:
             return JsonResponse({"success": False, "error": "Formato de fecha inválido."}, status=400)
 
-    estado_disponible, _ = Estado_Lote.objects.get_or_create(
-        nombre_estado="Disponible",
-        defaults={"descripcion": "Disponible"},
+    estado_disponible = catalogos.obtener_o_crear(
+        Estado_Lote, "Disponible", defaults={"descripcion": "Disponible"}
     )
 
     lote = Lotes.objects.create(
@@ -413,6 +362,127 @@ def create_lote(request):
 # -------------------------------
 # Crear recepción (form + detalle)
 # -------------------------------
+def _como_id(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _preparar_detalles_recepcion(detalles_data):
+    """
+    Valida las líneas (mismo orden y mensajes que la validación línea a línea)
+    y resuelve productos y lotes existentes con una consulta cada uno.
+    Devuelve una lista de dicts: producto, lote (o None), numero_lote,
+    fecha_caducidad, cantidad, costo.
+    """
+    productos = Productos.objects.in_bulk(
+        {i for i in (_como_id(d.get("producto_id")) for d in detalles_data) if i}
+    )
+    lotes = Lotes.objects.in_bulk(
+        {i for i in (_como_id(d.get("lote_id")) for d in detalles_data) if i}
+    )
+
+    lineas = []
+    for idx, det in enumerate(detalles_data, start=1):
+        producto_id = det.get("producto_id")
+        lote_id = det.get("lote_id")
+        numero_lote = (det.get("numero_lote") or "").strip()
+        fecha_caducidad_str = det.get("fecha_caducidad")
+        cantidad_raw = det.get("cantidad_recibida")
+        costo_raw = det.get("costo_unitario")
+
+        # Validaciones de presencia
+        if not producto_id:
+            raise ValidationError(f"Falta producto en línea {idx}.")
+        if not lote_id and not numero_lote:
+            raise ValidationError(f"Falta número de lote en línea {idx}.")
+        if not fecha_caducidad_str and not lote_id:
+            raise ValidationError(f"Falta fecha de caducidad en línea {idx}.")
+
+        # Conversión y validación de cantidad y costo
+        try:
+            cantidad = int(cantidad_raw or 0)
+            if cantidad <= 0:
+                raise ValidationError(f"Cantidad inválida en línea {idx}.")
+        except (TypeError, ValueError):
+            raise ValidationError(f"Cantidad inválida en línea {idx}.")
+
+        try:
+            costo = float(costo_raw or 0.0)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Costo inválido en línea {idx}.")
+
+        # Parse de fecha (si viene)
+        fecha_caducidad = None
+        if fecha_caducidad_str:
+            try:
+                fecha_caducidad = datetime.strptime(fecha_caducidad_str, "%Y-%m-%d").date()
+            except ValueError:
+                raise ValidationError(f"Fecha de caducidad inválida en línea {idx}.")
+
+        # Entidades (si no se resolvió en bloque, se usa la búsqueda original
+        # para conservar el mismo error)
+        producto = productos.get(_como_id(producto_id)) or get_object_or_404(Productos, pk=producto_id)
+        lote = None
+        if lote_id:
+            lote = lotes.get(_como_id(lote_id)) or get_object_or_404(Lotes, pk=lote_id)
+
+        lineas.append({
+            "producto": producto,
+            "lote": lote,
+            "numero_lote": numero_lote,
+            "fecha_caducidad": fecha_caducidad,
+            "cantidad": cantidad,
+            "costo": costo,
+        })
+    return lineas
+
+
+def _resolver_lotes_recepcion(lineas):
+    """
+    Asigna `linea["lote"]` a las líneas que vienen por número de lote: toma el
+    lote existente del producto o lo crea (equivalente a get_or_create, pero
+    con un bulk_create para todos los faltantes).
+    """
+    pares = {(l["producto"].id, l["numero_lote"]) for l in lineas if l["lote"] is None}
+    if not pares:
+        return
+
+    def buscar():
+        return {
+            (x.id_producto_id, x.numero_lote): x
+            for x in Lotes.objects.filter(
+                id_producto_id__in={p for p, _ in pares},
+                numero_lote__in={n for _, n in pares},
+            )
+        }
+
+    existentes = buscar()
+    nuevos = {}
+    for linea in lineas:
+        par = (linea["producto"].id, linea["numero_lote"])
+        if linea["lote"] is None and par not in existentes and par not in nuevos:
+            lote = Lotes(
+                id_producto=linea["producto"],
+                numero_lote=linea["numero_lote"],
+                fecha_caducidad=linea["fecha_caducidad"],
+                cantidad_disponible=0,
+            )
+            # bulk_create no emite pre_save: se aplica el estado por fecha aquí
+            lotes_auto_estado_por_fecha(Lotes, instance=lote)
+            nuevos[par] = lote
+
+    if nuevos:
+        # ignore_conflicts: si otra recepción creó el mismo lote a la vez, se reutiliza
+        Lotes.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+        existentes = buscar()
+
+    for linea in lineas:
+        if linea["lote"] is None:
+            linea["lote"] = existentes[(linea["producto"].id, linea["numero_lote"])]
+
+
 @login_required
 @transaction.atomic
 def recepcion_create(request):
@@ -461,18 +531,18 @@ def recepcion_create(request):
 
         # Estados y tipo de movimiento requeridos
         try:
-            estado_recepcion = Estado_Recepcion.objects.get(nombre_estado="Recibido Completo")
+            estado_recepcion = catalogos.obtener(Estado_Recepcion, "Recibido Completo")
         except Estado_Recepcion.DoesNotExist:
             return JsonResponse(
                 {"success": False, "errors": "No existe el estado 'Recibido Completo'."},
                 status=400,
             )
         try:
-            tipo_mov_recepcion = Tipo_Movimiento_Inventario.objects.get(codigo="REC")
+            tipo_mov_recepcion = catalogos.obtener(Tipo_Movimiento_Inventario, "REC")
         except Tipo_Movimiento_Inventario.DoesNotExist:
             return JsonResponse({"success": False, "errors": "No existe el tipo REC."}, status=400)
         try:
-            estado_mov = Estado_Movimiento_Inventario.objects.get(nombre_estado="Completado")
+            estado_mov = catalogos.obtener(Estado_Movimiento_Inventario, "Completado")
         except Estado_Movimiento_Inventario.DoesNotExist:
             return JsonResponse(
                 {"success": False, "errors": "No existe el estado de movimiento 'Completado'."}, status=400
@@ -481,87 +551,50 @@ def recepcion_create(request):
         # request.user debe ser tu modelo Usuario si AUTH_USER_MODEL está bien configurado
         usuario_instance = request.user
 
+        # Se validan todas las líneas antes de escribir nada
+        lineas = _preparar_detalles_recepcion(detalles_data)
+
         # Encabezado
         recepcion = form.save(commit=False)
         recepcion.id_usuario = usuario_instance
         recepcion.estado_recepcion = estado_recepcion
         recepcion.save()
 
-        # Detalles
-        for idx, det in enumerate(detalles_data, start=1):
-            producto_id = det.get("producto_id")
-            lote_id = det.get("lote_id")
-            numero_lote = (det.get("numero_lote") or "").strip()
-            fecha_caducidad_str = det.get("fecha_caducidad")
-            cantidad_raw = det.get("cantidad_recibida")
-            costo_raw = det.get("costo_unitario")
-
-            # Validaciones de presencia
-            if not producto_id:
-                raise ValidationError(f"Falta producto en línea {idx}.")
-            if not lote_id and not numero_lote:
-                raise ValidationError(f"Falta número de lote en línea {idx}.")
-            if not fecha_caducidad_str and not lote_id:
-                raise ValidationError(f"Falta fecha de caducidad en línea {idx}.")
-
-            # Conversión y validación de cantidad y costo
-            try:
-                cantidad = int(cantidad_raw or 0)
-                if cantidad <= 0:
-                    raise ValidationError(f"Cantidad inválida en línea {idx}.")
-            except (TypeError, ValueError):
-                raise ValidationError(f"Cantidad inválida en línea {idx}.")
-
-            try:
-                costo = float(costo_raw or 0.0)
-            except (TypeError, ValueError):
-                raise ValidationError(f"Costo inválido en línea {idx}.")
-
-            # Parse de fecha (si viene)
-            fecha_caducidad = None
-            if fecha_caducidad_str:
-                try:
-                    fecha_caducidad = datetime.strptime(fecha_caducidad_str, "%Y-%m-%d").date()
-                except ValueError:
-                    raise ValidationError(f"Fecha de caducidad inválida en línea {idx}.")
-
-            # Entidades
-            producto = get_object_or_404(Productos, pk=producto_id)
-
-            # Resolver lote
-            if lote_id:
-                lote = get_object_or_404(Lotes, pk=lote_id)
-            else:
-                # Crea o toma el lote del producto por número
-                lote, _creado = Lotes.objects.get_or_create(
-                    id_producto=producto,
-                    numero_lote=numero_lote,
-                    defaults={"fecha_caducidad": fecha_caducidad, "cantidad_disponible": 0},
-                )
+        # Lotes nuevos (por producto + número) en bloque
+        _resolver_lotes_recepcion(lineas)
 
-            # Sumar stock de forma segura (evita race conditions)
-            Lotes.objects.filter(pk=lote.pk).update(cantidad_disponible=F("cantidad_disponible") + cantidad)
-            lote.refresh_from_db(fields=["cantidad_disponible"])
+        # Sumar stock: un solo UPDATE para todos los lotes (actualiza el resumen)
+        deltas = {}
+        for linea in lineas:
+            deltas[linea["lote"].id] = deltas.get(linea["lote"].id, 0) + linea["cantidad"]
+        aplicar_deltas_lotes(deltas)
 
-            # Detalle de recepción
-            Detalle_Recepcion.objects.create(
+        # Detalle de recepción
+        Detalle_Recepcion.objects.bulk_create([
+            Detalle_Recepcion(
                 id_recepcion=recepcion,
-                id_lote=lote,
-                cantidad_recibida=cantidad,
-                costo_unitario=costo,
+                id_lote=linea["lote"],
+                cantidad_recibida=linea["cantidad"],
+                costo_unitario=linea["costo"],
             )
+            for linea in lineas
+        ])
 
-            # Auditoría de inventario
-            Movimientos_Inventario_Sucursal.objects.create(
-                id_lote=lote,
+        # Auditoría de inventario
+        Movimientos_Inventario_Sucursal.objects.bulk_create([
+            Movimientos_Inventario_Sucursal(
+                id_lote=linea["lote"],
                 id_tipo_movimiento=tipo_mov_recepcion,
-                cantidad=cantidad,
+                cantidad=linea["cantidad"],
                 id_usuario=usuario_instance,
                 referencia_transaccion=recepcion.numero_envio_bodega,
                 comentario=comentario or None,
                 estado_movimiento_inventario=estado_mov,
             )
+            for linea in lineas
+        ])
 
+        bitacora.registrar(f"Recepción {recepcion.numero_envio_bodega}", recepcion)
         return JsonResponse({"success": True, "recepcion_id": recepcion.id})
 
     except ValidationError as e:
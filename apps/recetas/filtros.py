@@ -0,0 +1,134 @@
+# apps/recetas/filtros.py
+"""
+Filtros de los listados de recetas y envíos. Los usan las APIs JSON
+paginadas (`recetas_api`, `envios_api`) y el resumen del dashboard de
+recetas, así que la tabla y las gráficas cuentan exactamente las mismas filas.
+
+Parámetros aceptados (querystring):
+- factura, referente, producto, usuario: texto contenido (sin mayúsculas)
+- producto_id, usuario_id: id exacto (selects del dashboard)
+- desde, hasta (yyyy-mm-dd): rango de fechas, ambos días incluidos
+- q: texto libre en factura, referente, producto o usuario (buscador de recetas)
+Solo envíos:
+- reporte, estado: texto contenido
+- factura / referente / producto filtran los envíos que incluyen alguna
+  receta que cumpla el filtro
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import DetalleEnvioReceta
+
+# Nombre público del orden -> lookup del ORM (solo columnas NOT NULL, ver
+# farmacia.paginacion).
+ORDEN_RECETAS = {
+    "fecha": "fecha_venta",
+    "producto": "id_producto__nombre",
+    "usuario": "id_usuario_venta__nombre",
+}
+
+ORDEN_ENVIOS = {
+    "fecha": "fecha_envio",
+    "usuario": "id_usuario__nombre",
+    "estado": "id_estado_envio__nombre_estado",
+}
+
+
+def _parse_date(d):
+    try:
+        return datetime.strptime(d, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def _parse_id(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _inicio_dia(d):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def leer_filtros(params) -> dict:
+    """Lee los filtros desde un QueryDict (request.GET)."""
+    def texto(clave):
+        return (params.get(clave) or "").strip()
+
+    return {
+        "q": texto("q"),
+        "factura": texto("factura"),
+        "referente": texto("referente"),
+        "producto": texto("producto"),
+        "usuario": texto("usuario"),
+        "reporte": texto("reporte"),
+        "estado": texto("estado"),
+        "producto_id": _parse_id(params.get("producto_id")),
+        "usuario_id": _parse_id(params.get("usuario_id")),
+        "desde": _parse_date(texto("desde")),
+        "hasta": _parse_date(texto("hasta")),
+    }
+
+
+def _rango(campo: str, filtros: dict) -> Q:
+    """Rango de días sobre un DateTimeField comparando contra instantes (usa el índice)."""
+    q = Q()
+    if filtros["desde"]:
+        q &= Q(**{f"{campo}__gte": _inicio_dia(filtros["desde"])})
+    if filtros["hasta"]:
+        q &= Q(**{f"{campo}__lt": _inicio_dia(filtros["hasta"] + timedelta(days=1))})
+    return q
+
+
+def _de_receta(filtros: dict, prefijo: str = "") -> Q:
+    """Filtros propios de la receta; `prefijo` permite aplicarlos desde el detalle de envío."""
+    q = Q()
+    if filtros["factura"]:
+        q &= Q(**{f"{prefijo}referencia_factura__icontains": filtros["factura"]})
+    if filtros["referente"]:
+        q &= Q(**{f"{prefijo}referente_receta__icontains": filtros["referente"]})
+    if filtros["producto"]:
+        q &= Q(**{f"{prefijo}id_producto__nombre__icontains": filtros["producto"]})
+    if filtros["producto_id"]:
+        q &= Q(**{f"{prefijo}id_producto_id": filtros["producto_id"]})
+    return q
+
+
+def filtrar_recetas(filtros: dict, qs):
+    """Aplica los filtros leídos por `leer_filtros` sobre las recetas."""
+    qs = qs.filter(_de_receta(filtros), _rango("fecha_venta", filtros))
+    if filtros["usuario"]:
+        qs = qs.filter(id_usuario_venta__nombre__icontains=filtros["usuario"])
+    if filtros["usuario_id"]:
+        qs = qs.filter(id_usuario_venta_id=filtros["usuario_id"])
+    if filtros["q"]:
+        termino = filtros["q"]
+        qs = qs.filter(
+            Q(referencia_factura__icontains=termino)
+            | Q(referente_receta__icontains=termino)
+            | Q(id_producto__nombre__icontains=termino)
+            | Q(id_usuario_venta__nombre__icontains=termino)
+        )
+    return qs
+
+
+def filtrar_envios(filtros: dict, qs):
+    """Aplica los filtros leídos por `leer_filtros` sobre los envíos."""
+    qs = qs.filter(_rango("fecha_envio", filtros))
+    if filtros["reporte"]:
+        qs = qs.filter(nombre_reporte__icontains=filtros["reporte"])
+    if filtros["usuario"]:
+        qs = qs.filter(id_usuario__nombre__icontains=filtros["usuario"])
+    if filtros["estado"]:
+        qs = qs.filter(id_estado_envio__nombre_estado__icontains=filtros["estado"])
+
+    de_receta = _de_receta(filtros, prefijo="id_receta__")
+    if de_receta:
+        qs = qs.filter(Exists(
+            DetalleEnvioReceta.objects.filter(de_receta, id_envio=OuterRef("pk"))
+        ))
+    return qs
@@ -9,6 +9,8 @@ urlpatterns = [
     path("search-facturas/", views.search_facturas, name="search_facturas"),
     path("registrar/", views.registrar_receta, name="registrar_receta"),
     path("lista/", views.lista_recetas, name="lista_recetas"),
+    path("api/", views.recetas_api, name="recetas_api"),
+    path("api/resumen/", views.recetas_resumen, name="recetas_resumen"),
     path("crear/", views.crear_receta, name="crear_receta"),
     path("<int:pk>/editar/", views.editar_receta, name="editar_receta"),
     path("<int:pk>/eliminar/", views.eliminar_receta, name="eliminar_receta"),
@@ -23,6 +25,7 @@ urlpatterns = [
     path("envio/<int:pk>/editar/", views.editar_envio, name="editar_envio"),
     path("envio/<int:pk>/eliminar/", views.eliminar_envio, name="eliminar_envio"),
     path("envios/lista/", views.lista_envios, name="lista_envios"),
+    path("envios/api/", views.envios_api, name="envios_api"),
     path("envios/<int:envio_id>/recetas/", views.recetas_por_envio, name="recetas_por_envio"),
     path("envios/exportar-pdf/", views.exportar_envios_pdf, name="exportar_envios_pdf"),
 
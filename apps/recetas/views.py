@@ -2,7 +2,8 @@ from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
 
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -15,17 +16,17 @@ from .models import (
     RecetaMedica,
     EnvioReceta,
     DetalleEnvioReceta,   # del MODELO
-    Producto,
-    Usuario,
 )
 
 from datetime import datetime
 import io
-import json
-from django.core.serializers.json import DjangoJSONEncoder
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
-from django.db import connection
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Envio_Receta
+from apps.salidas_devoluciones import indice_facturas
+from farmacia.paginacion import leer_limite, leer_orden, paginar_keyset
+from .filtros import ORDEN_ENVIOS, ORDEN_RECETAS, filtrar_envios, filtrar_recetas, leer_filtros
 
 
 @login_required
@@ -71,19 +72,10 @@ def index(request):
 def registrar_receta(request):
     """
     Vista principal que renderiza el HTML con tabla, filtros y modales de Recetas.
+    Las filas se cargan por página desde `recetas_api`; productos y facturas
+    se buscan desde los modales.
     """
-    recetas = (
-        RecetaMedica.objects
-        .select_related("id_producto", "id_usuario_venta")
-        .order_by("-fecha_venta")
-    )
-    productos = Producto.objects.all()
-    usuarios = Usuario.objects.all()
-
     return render(request, "recetas/registrar_receta.html", {
-        "recetas": recetas,
-        "productos": productos,
-        "usuarios": usuarios,
         "form": RecetaForm(),
     })
 
@@ -92,22 +84,89 @@ def registrar_receta(request):
 def lista_recetas(request):
     """
     Lista “aparte” (si la usas para dashboard/reportes).
+    Filas desde `recetas_api` y gráficas desde `recetas_resumen`.
     """
-    recetas = RecetaMedica.objects.select_related("id_producto", "id_usuario_venta").all()
-    recetas_json = [
+    return render(request, "recetas/lista_recetas.html")
+
+
+def _fecha_local(valor):
+    return timezone.localtime(valor).strftime("%Y-%m-%dT%H:%M") if valor else ""
+
+
+def _pagina(request, qs, orden, por_defecto, campos, alias):
+    """Página JSON (keyset) con el formato de `stock_api`; las fechas van en hora local."""
+    campo, descendente = leer_orden(request.GET.get("orden"), orden, por_defecto)
+    despues = request.GET.get("despues")
+    antes = request.GET.get("antes")
+
+    resultados, siguiente, anterior = paginar_keyset(
+        qs.values(*campos, **alias), campo, descendente,
+        despues=despues, antes=antes,
+        limite=leer_limite(request.GET.get("limite")),
+    )
+    for fila in resultados:
+        fila["fecha"] = _fecha_local(fila["fecha"])
+
+    return JsonResponse({
+        "results": resultados,
+        "siguiente": siguiente,
+        "anterior": anterior,
+        "total": None if (despues or antes) else qs.count(),
+    })
+
+
+@login_required
+def recetas_api(request):
+    """
+    Página de recetas (JSON). Filtros en `filtros.py`; además:
+    - orden: fecha, producto, usuario (prefijo "-" = descendente; por defecto -fecha)
+    - limite: filas por página (máx. 200)
+    - despues / antes: cursores devueltos por la página anterior
+    El total solo se calcula en la primera página.
+    """
+    qs = filtrar_recetas(leer_filtros(request.GET), RecetaMedica.objects.all())
+    return _pagina(
+        request, qs, ORDEN_RECETAS, "-fecha",
+        ["id", "id_producto_id", "id_usuario_venta_id"],
         {
-            "id": r.id,
-            "factura": r.referencia_factura or "",
-            "referente": r.referente_receta or "",
-            "producto": r.id_producto.nombre if r.id_producto else "",
-            "usuario": r.id_usuario_venta.nombre if r.id_usuario_venta else "",
-            "fecha": r.fecha_venta.strftime("%Y-%m-%d %H:%M") if r.fecha_venta else "",
-        }
-        for r in recetas
-    ]
-    return render(request, "recetas/lista_recetas.html", {
-        "recetas": recetas,
-        "recetas_json": json.dumps(recetas_json, cls=DjangoJSONEncoder),
+            "factura": F("referencia_factura"),
+            "referente": F("referente_receta"),
+            "producto": F("id_producto__nombre"),
+            "usuario": F("id_usuario_venta__nombre"),
+            "fecha": F("fecha_venta"),
+        },
+    )
+
+
+@login_required
+def recetas_resumen(request):
+    """
+    Conteos para el dashboard de recetas (por producto, usuario y día) con los
+    mismos filtros que `recetas_api`. Sin filtros de producto/usuario también
+    sirve para llenar los selects del dashboard.
+    """
+    qs = filtrar_recetas(leer_filtros(request.GET), RecetaMedica.objects.all())
+
+    productos = (
+        qs.values("id_producto_id", nombre=F("id_producto__nombre"))
+        .annotate(total=Count("id")).order_by("-total", "nombre")
+    )
+    usuarios = (
+        qs.values("id_usuario_venta_id", nombre=F("id_usuario_venta__nombre"))
+        .annotate(total=Count("id")).order_by("-total", "nombre")
+    )
+    fechas = (
+        qs.annotate(dia=TruncDate("fecha_venta", tzinfo=timezone.get_current_timezone()))
+        .values("dia").annotate(total=Count("id")).order_by("dia")
+    )
+    return JsonResponse({
+        "productos": [
+            {"id": p["id_producto_id"], "nombre": p["nombre"], "total": p["total"]} for p in productos
+        ],
+        "usuarios": [
+            {"id": u["id_usuario_venta_id"], "nombre": u["nombre"], "total": u["total"]} for u in usuarios
+        ],
+        "fechas": [{"fecha": f["dia"].isoformat(), "total": f["total"]} for f in fechas],
     })
 
 
@@ -235,81 +294,23 @@ def exportar_recetas_pdf(request):
 @login_required
 def search_facturas(request):
     """
-    Facturas (referencia_transaccion) provenientes de
-    salidas_devoluciones_movimientos_inventario_sucursal con tipo VEN (id=4/codigo='VEN')
-    y estado 'Completado'. Devuelve 1 fila por factura (la más reciente).
+    Facturas de venta completadas, desde el índice de búsqueda
+    (apps.salidas_devoluciones.indice_facturas): por número de factura o
+    nombre de producto. Devuelve 1 fila por factura, la más reciente primero.
     """
     term = (request.GET.get("term") or "").strip()
 
-    # 1) Intentar resolver el ID de 'Completado' de manera segura.
-    def get_estado_completado_id(default=2):
-        try:
-            with connection.cursor() as cur:
-                cur.execute("""
-                    SELECT id
-                    FROM mantenimiento_estado_movimiento_inventario
-                    WHERE LOWER(nombre_estado) = 'completado'
-                    LIMIT 1
-                """)
-                row = cur.fetchone()
-                if row:
-                    return row[0]
-        except Exception:
-            # La tabla puede no existir o tener otro nombre. Usamos default.
-            pass
-        return default
-
-    estado_completado_id = get_estado_completado_id()
-
-    # 2) Consulta. Nota: evitamos JOIN a la tabla de estado para no depender del nombre.
-    sql = """
-        SELECT DISTINCT ON (m.referencia_transaccion)
-               m.referencia_transaccion                                 AS factura,
-               to_char(m.fecha_hora, 'DD/MM/YYYY HH24:MI')              AS fecha,
-               m.id_usuario_id                                          AS usuario_id,
-               COALESCE(u.nombre, '')                                   AS usuario_nombre,
-               p.id                                                     AS producto_id,
-               COALESCE(p.nombre, '')                                   AS producto_nombre
-        FROM salidas_devoluciones_movimientos_inventario_sucursal m
-        JOIN mantenimiento_tipo_movimiento_inventario t
-             ON t.id = m.id_tipo_movimiento_id
-        LEFT JOIN mantenimiento_usuarios u
-             ON u.id = m.id_usuario_id
-        LEFT JOIN inventario_lotes l
-             ON l.id = m.id_lote_id
-        LEFT JOIN inventario_productos p
-             ON p.id = l.id_producto_id
-        WHERE (t.id = 4 OR UPPER(t.codigo) = 'VEN')
-          AND m.estado_movimiento_inventario_id = %s
-          AND m.referencia_transaccion IS NOT NULL
-          AND (
-                %s = '' OR
-                m.referencia_transaccion ILIKE %s OR
-                COALESCE(p.nombre, '') ILIKE %s
-              )
-        ORDER BY m.referencia_transaccion, m.fecha_hora DESC
-        LIMIT 50
-    """
-    like = f"%{term}%"
-    params = [estado_completado_id, term, like, like]
-
-    rows = []
-    with connection.cursor() as cur:
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-
-    # 3) Formato esperado por el front.
+    # Formato esperado por el front.
     results = [
         {
-            "factura": r[0],
-            "usuario_id": r[2],
-            "usuario_nombre": r[3] or "",
-            "producto_id": r[4],
-            "producto_nombre": r[5] or "",
-            "fecha": r[1],
+            "factura": f.referencia,
+            "usuario_id": f.id_usuario_id,
+            "usuario_nombre": f.id_usuario.nombre if f.id_usuario_id else "",
+            "producto_id": f.id_producto_id,
+            "producto_nombre": f.id_producto.nombre if f.id_producto_id else "",
+            "fecha": timezone.localtime(f.fecha_hora).strftime("%d/%m/%Y %H:%M"),
         }
-        for r in rows
-        if (r[0] or "").strip()  # sanity check
+        for f in indice_facturas.buscar(term)
     ]
 
     return JsonResponse(results, safe=False)
@@ -323,24 +324,30 @@ def search_facturas(request):
 def registrar_envio(request):
     """
     Pantalla principal de Envíos: Tabla de envíos + modal crear/editar/consultar.
+    Los envíos se cargan por página desde `envios_api` y el buscador de
+    recetas del modal consulta `recetas_api`.
     """
-    envios = (
-        EnvioReceta.objects
-        .select_related("id_usuario", "id_estado_envio")
-        .order_by("-fecha_envio")
-    )
-    # Para buscadores en el modal (recetas)
-    recetas = (
-        RecetaMedica.objects
-        .select_related("id_producto", "id_usuario_venta")
-        .order_by("-fecha_venta")
+    return render(request, "recetas/registrar_envio.html")
+
+
+@login_required
+def envios_api(request):
+    """
+    Página de envíos (JSON). Filtros en `filtros.py` (factura, referente y
+    producto buscan en las recetas del envío); orden: fecha, usuario, estado.
+    Misma paginación que `recetas_api`.
+    """
+    qs = filtrar_envios(leer_filtros(request.GET), EnvioReceta.objects.all())
+    return _pagina(
+        request, qs, ORDEN_ENVIOS, "-fecha",
+        ["id", "id_usuario_id", "id_estado_envio_id"],
+        {
+            "reporte": F("nombre_reporte"),
+            "usuario": F("id_usuario__nombre"),
+            "estado": F("id_estado_envio__nombre_estado"),
+            "fecha": F("fecha_envio"),
+        },
     )
-    return render(request, "recetas/registrar_envio.html", {
-        "envios": envios,
-        "usuarios": Usuario.objects.all(),                 # si decides mostrar en algún lado
-        "estados": EstadoEnvioReceta.objects.all(),        # idem
-        "recetas": recetas,
-    })
 
 
 @login_required
@@ -350,9 +357,7 @@ def crear_envio(request):
         recetas_ids = [rid for rid in request.POST.getlist("recetas[]") if rid]
 
         # 1) Estado "Enviado" (crea si no existe)
-        estado_enviado, _ = EstadoEnvioReceta.objects.get_or_create(
-            nombre_estado="Enviado"
-        )
+        estado_enviado_id = catalogos.obtener_o_crear(Estado_Envio_Receta, "Enviado").id
 
         # 2) Usuario del envío (automático)
         usuario_envio = None
@@ -366,7 +371,7 @@ def crear_envio(request):
         envio = EnvioReceta.objects.create(
             fecha_envio=timezone.now(),
             nombre_reporte=nombre_reporte,
-            id_estado_envio=estado_enviado,
+            id_estado_envio_id=estado_enviado_id,
             id_usuario=usuario_envio,
         )
 
@@ -394,8 +399,7 @@ def editar_envio(request, pk):
         envio.nombre_reporte = (request.POST.get("nombre_reporte") or "").strip()
 
         # Forzar estado "Enviado"
-        estado_enviado, _ = EstadoEnvioReceta.objects.get_or_create(nombre_estado="Enviado")
-        envio.id_estado_envio = estado_enviado
+        envio.id_estado_envio_id = catalogos.obtener_o_crear(Estado_Envio_Receta, "Enviado").id
 
         # Ignorar cambios manuales de usuario; si quisieras recalcular por detalle, hazlo aquí.
 
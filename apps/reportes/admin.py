@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import Trabajo_Reporte
+
+# Register your models here.
+admin.site.register(Trabajo_Reporte)
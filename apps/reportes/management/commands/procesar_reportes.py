@@ -0,0 +1,60 @@
+# apps/reportes/management/commands/procesar_reportes.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.reportes.servicios import (
+    limpiar_expirados,
+    procesar_trabajo,
+    reencolar_colgados,
+    tomar_siguiente,
+)
+
+
+class Command(BaseCommand):
+    help = "Worker de la cola de reportes: genera los PDF pendientes fuera de las peticiones web."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesa lo pendiente y termina (útil para cron).",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=2.0,
+            help="Segundos de espera cuando la cola está vacía (por defecto 2).",
+        )
+
+    def handle(self, *args, **options):
+        una_vez = options["once"]
+        intervalo = options["intervalo"]
+
+        reencolados = reencolar_colgados()
+        if reencolados:
+            self.stdout.write(self.style.WARNING(f"Trabajos reencolados: {reencolados}"))
+
+        procesados = 0
+        ultima_limpieza = 0.0
+        while True:
+            close_old_connections()
+
+            if time.monotonic() - ultima_limpieza > 300:
+                limpiar_expirados()
+                ultima_limpieza = time.monotonic()
+
+            trabajo = tomar_siguiente()
+            if trabajo is None:
+                if una_vez:
+                    break
+                time.sleep(intervalo)
+                continue
+
+            procesar_trabajo(trabajo)
+            procesados += 1
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  {trabajo}")
+
+        self.stdout.write(self.style.SUCCESS(f"Reportes procesados: {procesados}"))
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import models
+
+
+class Trabajo_Reporte(models.Model):
+    """
+    Reporte PDF pedido por la UI y generado por el comando `procesar_reportes`
+    fuera del ciclo de la petición. `clave` es el hash de tipo + parámetros:
+    mientras un trabajo completado con la misma clave no expire, se reutiliza
+    su archivo en lugar de generar otro.
+    """
+    PENDIENTE = "Pendiente"
+    EN_PROCESO = "En Proceso"
+    COMPLETADO = "Completado"
+    ERROR = "Error"
+    ESTADOS = [
+        (PENDIENTE, PENDIENTE),
+        (EN_PROCESO, EN_PROCESO),
+        (COMPLETADO, COMPLETADO),
+        (ERROR, ERROR),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=64)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+
+    archivo = models.FileField(upload_to="reportes/", null=True, blank=True)
+    nombre_archivo = models.CharField(max_length=255, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    id_usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    fecha_solicitud = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    expira = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+    class Meta:
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reporte'
+        indexes = [
+            models.Index(fields=['clave', 'estado'], name='idx_trabajo_clave_estado'),
+            models.Index(fields=['estado', 'fecha_solicitud'], name='idx_trabajo_cola'),
+        ]
@@ -0,0 +1,25 @@
+# apps/reportes/registro.py
+"""
+Reportes que se pueden generar en segundo plano.
+
+Cada tipo apunta al nombre de URL de la vista que ya construye el PDF; el
+worker resuelve esa URL y llama a la vista con una petición GET armada a
+partir de los parámetros guardados en el trabajo. Así los generadores de PDF
+siguen viviendo en su app y no hay que duplicarlos.
+"""
+
+# tipo -> (nombre de URL, kwargs obligatorios)
+REPORTES = {
+    "stock": ("inventario:stock:exportar_pdf", []),
+    "kardex": ("inventario:productos:kardex_exportar", ["pk"]),
+    "recetas": ("recetas:exportar_recetas_pdf", []),
+    "envios": ("recetas:exportar_envios_pdf", []),
+    "solicitudes": ("solicitudes_bodega_central:exportar_solicitudes_pdf", []),
+    "venta": ("sd:salidas:venta_export_pdf", ["ref"]),
+    "devolucion": ("sd:devoluciones:devolucion_export_pdf", ["ref"]),
+    "recepcion": ("recepcion:recepcion_export_pdf", ["pk"]),
+    "ajuste_ingreso": ("ajustes_inventario:ingresos:ajuste_ingreso_export_pdf", ["ajuste_id"]),
+    "ajuste_salida": ("ajustes_inventario:salidasAjustes:ajuste_salida_export_pdf", ["ajuste_id"]),
+    "vencimiento": ("alertas_vencimientos:vencimientos:reporte_vencimiento_export_pdf", ["reporte_id"]),
+    "perdidas_vencimiento": ("alertas_vencimientos:alertas:alertas_perdidas_pdf", []),
+}
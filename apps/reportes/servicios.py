@@ -0,0 +1,216 @@
+# apps/reportes/servicios.py
+"""
+Cola de reportes respaldada por la base de datos.
+
+- `solicitar_reporte` registra el pedido (o devuelve uno equivalente ya
+  listo / en cola).
+- `tomar_siguiente` + `procesar_trabajo` los usa el comando
+  `procesar_reportes`; varios workers pueden correr a la vez porque la toma
+  usa SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+import hashlib
+import json
+import logging
+import re
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.files import File
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from .models import Trabajo_Reporte
+from .registro import REPORTES
+
+logger = logging.getLogger(__name__)
+
+TTL_SEGUNDOS = getattr(settings, "REPORTES_TTL_SEGUNDOS", 600)
+
+
+class ReporteInvalido(ValueError):
+    pass
+
+
+def calcular_clave(tipo: str, kwargs: dict, query: dict, usuario_id=None) -> str:
+    """
+    Hash del pedido. Incluye al usuario: cada trabajo es de quien lo pidió
+    (solo él consulta su estado y lo descarga), así que tampoco se comparte
+    el archivo entre usuarios.
+    """
+    crudo = json.dumps(
+        {"tipo": tipo, "kwargs": kwargs, "query": query, "usuario": usuario_id},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+def normalizar_parametros(tipo: str, kwargs, query) -> dict:
+    """Valida el tipo y los kwargs; deja la query como {clave: [valores]}."""
+    if tipo not in REPORTES:
+        raise ReporteInvalido(f"Tipo de reporte desconocido: {tipo}")
+    _nombre_url, requeridos = REPORTES[tipo]
+    kwargs = {k: str(v) for k, v in (kwargs or {}).items() if k in requeridos}
+    faltantes = [k for k in requeridos if not kwargs.get(k)]
+    if faltantes:
+        raise ReporteInvalido(f"Faltan parámetros: {', '.join(faltantes)}")
+
+    limpia = {}
+    for k, v in (query or {}).items():
+        valores = v if isinstance(v, (list, tuple)) else [v]
+        valores = [str(x) for x in valores if str(x).strip() != ""]
+        if valores:
+            limpia[k] = valores
+    return {"kwargs": kwargs, "query": limpia}
+
+
+def _vigente(trabajo) -> bool:
+    return bool(
+        trabajo.archivo
+        and trabajo.expira
+        and trabajo.expira > timezone.now()
+        and trabajo.archivo.storage.exists(trabajo.archivo.name)
+    )
+
+
+def solicitar_reporte(tipo: str, kwargs=None, query=None, usuario=None) -> Trabajo_Reporte:
+    """
+    Devuelve el trabajo que atiende el pedido: uno completado y vigente con los
+    mismos parámetros, uno igual que ya está en cola, o uno nuevo pendiente.
+    """
+    parametros = normalizar_parametros(tipo, kwargs, query)
+    if not getattr(usuario, "is_authenticated", False):
+        usuario = None
+    clave = calcular_clave(tipo, parametros["kwargs"], parametros["query"], getattr(usuario, "pk", None))
+
+    listo = (
+        Trabajo_Reporte.objects
+        .filter(clave=clave, estado=Trabajo_Reporte.COMPLETADO, expira__gt=timezone.now())
+        .order_by("-fecha_fin")
+        .first()
+    )
+    if listo and _vigente(listo):
+        return listo
+
+    en_cola = (
+        Trabajo_Reporte.objects
+        .filter(clave=clave, estado__in=[Trabajo_Reporte.PENDIENTE, Trabajo_Reporte.EN_PROCESO])
+        .order_by("fecha_solicitud")
+        .first()
+    )
+    if en_cola:
+        return en_cola
+
+    return Trabajo_Reporte.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        clave=clave,
+        id_usuario=usuario,
+    )
+
+
+def tomar_siguiente():
+    """Marca como 'En Proceso' el pendiente más antiguo y lo devuelve (o None)."""
+    with transaction.atomic():
+        trabajo = (
+            Trabajo_Reporte.objects
+            .select_for_update(skip_locked=True)
+            .filter(estado=Trabajo_Reporte.PENDIENTE)
+            .order_by("fecha_solicitud", "id")
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = Trabajo_Reporte.EN_PROCESO
+        trabajo.fecha_inicio = timezone.now()
+        trabajo.save(update_fields=["estado", "fecha_inicio"])
+    return trabajo
+
+
+def _ejecutar_vista(trabajo):
+    """Llama a la vista que genera el PDF con una petición GET equivalente."""
+    nombre_url, _requeridos = REPORTES[trabajo.tipo]
+    path = reverse(nombre_url, kwargs=trabajo.parametros.get("kwargs") or {})
+    match = resolve(path)
+
+    request = RequestFactory().get(path, trabajo.parametros.get("query") or {})
+    request.user = trabajo.id_usuario
+    request.session = SessionStore()
+    request._messages = FallbackStorage(request)
+    return match.func(request, *match.args, **match.kwargs)
+
+
+def _nombre_archivo(response, trabajo) -> str:
+    disposicion = response.get("Content-Disposition", "")
+    m = re.search(r'filename="?([^";]+)"?', disposicion)
+    return m.group(1) if m else f"{trabajo.tipo}_{trabajo.pk}.pdf"
+
+
+def procesar_trabajo(trabajo) -> Trabajo_Reporte:
+    """Genera el archivo del trabajo y guarda el resultado (o el error)."""
+    try:
+        if trabajo.id_usuario is None:
+            raise ReporteInvalido("El trabajo no tiene usuario asociado.")
+
+        response = _ejecutar_vista(trabajo)
+        tipo_contenido = response.get("Content-Type", "")
+        if response.status_code != 200 or "pdf" not in tipo_contenido:
+            raise ReporteInvalido(
+                f"La vista respondió {response.status_code} ({tipo_contenido or 'sin contenido'})."
+            )
+
+        nombre = _nombre_archivo(response, trabajo)
+        with tempfile.TemporaryFile() as tmp:
+            partes = response.streaming_content if response.streaming else [response.content]
+            for parte in partes:
+                tmp.write(parte)
+            if hasattr(response, "close"):
+                response.close()
+            tmp.seek(0)
+            trabajo.archivo.save(f"{trabajo.clave[:16]}_{nombre}", File(tmp), save=False)
+
+        ahora = timezone.now()
+        trabajo.nombre_archivo = nombre
+        trabajo.estado = Trabajo_Reporte.COMPLETADO
+        trabajo.fecha_fin = ahora
+        trabajo.expira = ahora + timedelta(seconds=TTL_SEGUNDOS)
+        trabajo.error = ""
+    except Exception as e:
+        logger.exception("Error generando el reporte %s", trabajo.pk)
+        trabajo.estado = Trabajo_Reporte.ERROR
+        trabajo.fecha_fin = timezone.now()
+        trabajo.error = str(e)
+
+    trabajo.save(update_fields=["archivo", "nombre_archivo", "estado", "fecha_fin", "expira", "error"])
+    return trabajo
+
+
+def reencolar_colgados(minutos: int = 30) -> int:
+    """Devuelve a 'Pendiente' los trabajos de un worker que murió a medias."""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return (
+        Trabajo_Reporte.objects
+        .filter(estado=Trabajo_Reporte.EN_PROCESO, fecha_inicio__lt=limite)
+        .update(estado=Trabajo_Reporte.PENDIENTE, fecha_inicio=None)
+    )
+
+
+def limpiar_expirados() -> int:
+    """Borra los archivos y registros de trabajos vencidos o fallidos viejos."""
+    ahora = timezone.now()
+    viejos = Trabajo_Reporte.objects.filter(
+        estado=Trabajo_Reporte.COMPLETADO, expira__lt=ahora
+    ) | Trabajo_Reporte.objects.filter(
+        estado=Trabajo_Reporte.ERROR, fecha_fin__lt=ahora - timedelta(days=1)
+    )
+    total = 0
+    for trabajo in viejos.iterator():
+        if trabajo.archivo:
+            trabajo.archivo.delete(save=False)
+        trabajo.delete()
+        total += 1
+    return total
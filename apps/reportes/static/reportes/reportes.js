@@ -0,0 +1,81 @@
+/* Cola de reportes: pide el PDF al servidor y consulta su estado hasta que
+   esté listo; luego dispara la descarga.
+
+   SaifReportes.descargar({ tipo: "stock", kwargs: {}, query: {estado: "vencido"} })
+     .catch(msg => alert(msg));
+
+   Los enlaces de exportación solo necesitan atributos (el href queda como
+   descarga directa si no hay JavaScript):
+   <a href="..." data-reporte="venta" data-reporte-kwargs='{"ref": "F-1"}'
+      data-reporte-query='{"id": "3"}'>
+*/
+(function () {
+  if (window.SaifReportes) return;  // incluido una sola vez (base.html)
+  const URL_SOLICITAR = document.currentScript?.dataset.urlSolicitar || "/reportes/solicitar/";
+  const INTERVALO_MS = 1500;
+  const MAX_INTENTOS = 400;  // ~10 minutos
+
+  function getCookie(name){
+    const m = document.cookie.match(new RegExp("(^|;\\s*)" + name + "=([^;]+)"));
+    return m ? decodeURIComponent(m[2]) : "";
+  }
+
+  function leer(r){
+    return r.json().then(data => {
+      if (!r.ok || data.success === false) {
+        throw (data.errors && data.errors[0]) || "No se pudo generar el reporte.";
+      }
+      return data;
+    });
+  }
+
+  function esperar(urlEstado, intentos){
+    return new Promise(res => setTimeout(res, INTERVALO_MS))
+      .then(() => fetch(urlEstado, { headers: { "X-Requested-With": "XMLHttpRequest" } }))
+      .then(leer)
+      .then(data => {
+        if (data.url_descarga) return data.url_descarga;
+        if (intentos <= 0) throw "El reporte está tardando demasiado. Intente de nuevo más tarde.";
+        return esperar(urlEstado, intentos - 1);
+      });
+  }
+
+  function generar(pedido){
+    return fetch(URL_SOLICITAR, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "X-Requested-With": "XMLHttpRequest",
+        "X-CSRFToken": getCookie("csrftoken"),
+      },
+      body: JSON.stringify(pedido),
+    })
+      .then(leer)
+      .then(data => data.url_descarga || esperar(data.url_estado, MAX_INTENTOS));
+  }
+
+  function descargar(pedido){
+    return generar(pedido).then(url => { window.location.href = url; return url; });
+  }
+
+  function leerJson(texto){
+    try { return texto ? JSON.parse(texto) : {}; } catch (e) { return {}; }
+  }
+
+  document.addEventListener("click", (e) => {
+    const el = e.target.closest("[data-reporte]");
+    if (!el) return;
+    e.preventDefault();
+    if (el.classList.contains("disabled")) return;
+    el.classList.add("disabled");
+    descargar({
+      tipo: el.dataset.reporte,
+      kwargs: leerJson(el.dataset.reporteKwargs),
+      query: leerJson(el.dataset.reporteQuery),
+    })
+      .catch(msg => alert(msg))
+      .finally(() => el.classList.remove("disabled"));
+  });
+
+  window.SaifReportes = { generar, descargar };
+})();
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = "reportes"
+
+urlpatterns = [
+    path("solicitar/", views.solicitar, name="solicitar"),
+    path("<int:pk>/estado/", views.estado, name="estado"),
+    path("<int:pk>/descargar/", views.descargar, name="descargar"),
+]
@@ -0,0 +1,76 @@
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+
+from .models import Trabajo_Reporte
+from .servicios import ReporteInvalido, solicitar_reporte
+
+
+def _estado_json(trabajo):
+    data = {
+        "success": trabajo.estado != Trabajo_Reporte.ERROR,
+        "trabajo_id": trabajo.pk,
+        "estado": trabajo.estado,
+        "url_estado": reverse("reportes:estado", args=[trabajo.pk]),
+    }
+    if trabajo.estado == Trabajo_Reporte.COMPLETADO:
+        data["url_descarga"] = reverse("reportes:descargar", args=[trabajo.pk])
+    elif trabajo.estado == Trabajo_Reporte.ERROR:
+        data["errors"] = [trabajo.error or "No se pudo generar el reporte."]
+    return data
+
+
+@login_required
+@require_POST
+def solicitar(request):
+    """
+    Encola un reporte. Cuerpo JSON:
+    {"tipo": "stock", "kwargs": {...}, "query": {...}}
+    Si hay un archivo vigente con los mismos parámetros se devuelve de una vez.
+    """
+    try:
+        data = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "errors": ["JSON inválido."]}, status=400)
+
+    try:
+        trabajo = solicitar_reporte(
+            data.get("tipo", ""),
+            kwargs=data.get("kwargs"),
+            query=data.get("query"),
+            usuario=request.user,
+        )
+    except ReporteInvalido as e:
+        return JsonResponse({"success": False, "errors": [str(e)]}, status=400)
+
+    return JsonResponse(_estado_json(trabajo))
+
+
+def _trabajos_de(usuario):
+    """Cada usuario solo ve sus propios trabajos."""
+    return Trabajo_Reporte.objects.filter(id_usuario=usuario)
+
+
+@login_required
+@require_GET
+def estado(request, pk):
+    trabajo = get_object_or_404(_trabajos_de(request.user), pk=pk)
+    return JsonResponse(_estado_json(trabajo))
+
+
+@login_required
+@require_GET
+def descargar(request, pk):
+    trabajo = get_object_or_404(_trabajos_de(request.user), pk=pk, estado=Trabajo_Reporte.COMPLETADO)
+    if not trabajo.archivo or not trabajo.archivo.storage.exists(trabajo.archivo.name):
+        raise Http404("El archivo del reporte ya no está disponible.")
+    return FileResponse(
+        trabajo.archivo.open("rb"),
+        as_attachment=True,
+        filename=trabajo.nombre_archivo or "reporte.pdf",
+        content_type="application/pdf",
+    )
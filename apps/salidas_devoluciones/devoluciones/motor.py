@@ -0,0 +1,168 @@
+# apps/salidas_devoluciones/devoluciones/motor.py
+"""
+Motor de devoluciones por factura.
+
+`saldos_por_lote` resume en una sola consulta agrupada, por lote, cuánto se
+vendió en la factura y cuánto ya se devolvió. Se usan sumas netas: una venta
+cancelada (VEN negativo + reverso positivo) suma 0 vendido, y una devolución
+cancelada (DEV positivo + reverso negativo) suma 0 devuelto. Lo que queda
+"por devolver" es `vendido - devuelto`; el modal de lotes y la validación
+usan el mismo número.
+
+`validar_lineas` revisa todas las líneas de una vez (incluida la devolución
+de más) y `registrar_devolucion` suma el stock con un solo UPDATE, crea los
+movimientos DEV con bulk_create y actualiza el encabezado `Devolucion`.
+"""
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.inventario.existencias import aplicar_deltas_lotes
+from apps.inventario.models import Lotes, Productos
+from apps.inventario.resumen_diario import marcar_documentos
+from apps.salidas_devoluciones.models import Devolucion, Movimientos_Inventario_Sucursal, Venta
+
+
+class DevolucionInvalida(Exception):
+    """Una o más líneas de la devolución no son válidas."""
+
+    def __init__(self, errores):
+        self.errores = list(errores)
+        super().__init__("; ".join(self.errores))
+
+
+def saldos_por_lote(ref: str, producto_id=None) -> dict:
+    """
+    {lote_id: {"vendido", "devuelto", "devolvible"}} de la factura `ref`,
+    opcionalmente solo para un producto. Solo incluye lotes con venta neta.
+    """
+    movs = Movimientos_Inventario_Sucursal.objects.filter(
+        referencia_transaccion=ref,
+        id_tipo_movimiento__codigo__in=["VEN", "DEV"],
+    )
+    if producto_id is not None:
+        movs = movs.filter(id_lote__id_producto_id=producto_id)
+
+    filas = (
+        movs.values("id_lote_id")
+        .annotate(
+            # En VEN la cantidad es NEGATIVA
+            vendido=-Coalesce(Sum("cantidad", filter=Q(id_tipo_movimiento__codigo="VEN")), 0),
+            devuelto=Coalesce(Sum("cantidad", filter=Q(id_tipo_movimiento__codigo="DEV")), 0),
+        )
+        .order_by("id_lote_id")
+    )
+    saldos = {}
+    for f in filas:
+        vendido = int(f["vendido"])
+        if vendido <= 0:
+            continue
+        devuelto = max(int(f["devuelto"]), 0)
+        saldos[f["id_lote_id"]] = {
+            "vendido": vendido,
+            "devuelto": devuelto,
+            "devolvible": max(vendido - devuelto, 0),
+        }
+    return saldos
+
+
+def validar_lineas(ref: str, detalles) -> list:
+    """
+    Valida todas las líneas contra los saldos de la factura y devuelve
+    [(lote, cantidad)]. Lanza DevolucionInvalida con todos los errores.
+
+    Bloquea el encabezado de la venta para que dos devoluciones simultáneas
+    de la misma factura no excedan juntas lo vendido.
+    """
+    Venta.objects.select_for_update().filter(referencia_transaccion=ref).first()
+
+    errores, limpias = [], []
+    for idx, det in enumerate(detalles, start=1):
+        try:
+            pid, lote_id, qty = int(det.get("producto_id")), int(det.get("lote_id")), int(det.get("cantidad"))
+        except (TypeError, ValueError):
+            pid = lote_id = qty = 0
+        if not pid or not lote_id or qty <= 0:
+            errores.append(f"Dato faltante/erróneo en línea {idx}.")
+            continue
+        limpias.append((idx, pid, lote_id, qty))
+
+    productos = Productos.objects.in_bulk({pid for _, pid, _, _ in limpias})
+    lotes = Lotes.objects.in_bulk({lote_id for _, _, lote_id, _ in limpias})
+    saldos = saldos_por_lote(ref)
+
+    lineas, pedido = [], {}  # pedido: lote_id -> cantidad total en esta devolución
+    for idx, pid, lote_id, qty in limpias:
+        producto, lote = productos.get(pid), lotes.get(lote_id)
+        if producto is None or lote is None:
+            errores.append(f"Línea {idx}: el producto o el lote no existe.")
+            continue
+        if lote.id_producto_id != producto.id:
+            errores.append(f"El lote seleccionado no pertenece al producto en línea {idx}.")
+            continue
+        if lote_id not in saldos:
+            errores.append(
+                f"El lote {lote.numero_lote} del producto '{producto.nombre}' no figura en la factura {ref}."
+            )
+            continue
+        pedido[lote_id] = pedido.get(lote_id, 0) + qty
+        lineas.append((lote, qty))
+
+    for lote_id, qty in pedido.items():
+        saldo = saldos[lote_id]
+        if qty > saldo["devolvible"]:
+            lote = lotes[lote_id]
+            errores.append(
+                f"El lote {lote.numero_lote} del producto '{productos[lote.id_producto_id].nombre}' "
+                f"excede lo vendido: vendido {saldo['vendido']}, devuelto {saldo['devuelto']}, "
+                f"por devolver {saldo['devolvible']}, solicitado {qty}."
+            )
+
+    if errores:
+        raise DevolucionInvalida(errores)
+    return lineas
+
+
+def registrar_devolucion(ref: str, lineas, usuario, motivo, tipo_dev, estado_ok) -> Devolucion:
+    """
+    Aplica una devolución ya validada: suma el stock de los lotes, registra
+    un movimiento DEV positivo por línea y acumula el encabezado de la factura.
+    """
+    deltas = {}
+    for lote, qty in lineas:
+        deltas[lote.id] = deltas.get(lote.id, 0) + qty
+    aplicar_deltas_lotes(deltas)
+
+    Movimientos_Inventario_Sucursal.objects.bulk_create([
+        Movimientos_Inventario_Sucursal(
+            id_lote=lote,
+            id_tipo_movimiento=tipo_dev,
+            cantidad=qty,
+            id_usuario=usuario,
+            referencia_transaccion=ref,
+            comentario=motivo or None,
+            estado_movimiento_inventario=estado_ok,
+        )
+        for lote, qty in lineas
+    ])
+
+    # Encabezado de la factura: suma estos renglones y toma la fecha/usuario de esta devolución
+    encabezado, _ = Devolucion.objects.select_for_update().get_or_create(
+        referencia_transaccion=ref,
+        defaults={
+            "comentario": motivo or None,
+            "id_usuario": usuario,
+            "id_venta": Venta.objects.filter(referencia_transaccion=ref).first(),
+        },
+    )
+    marcar_documentos([encabezado.fecha_hora])  # la factura sale del día de su devolución anterior
+    encabezado.fecha_hora = timezone.now()
+    encabezado.id_usuario = usuario
+    encabezado.estado_movimiento_inventario = estado_ok
+    encabezado.lineas = F("lineas") + len(lineas)
+    encabezado.unidades = F("unidades") + sum(qty for _, qty in lineas)
+    encabezado.monto = F("monto") + sum(qty * (lote.precio_venta or 0) for lote, qty in lineas)
+    encabezado.save(update_fields=[
+        "fecha_hora", "id_usuario", "estado_movimiento_inventario", "lineas", "unidades", "monto",
+    ])
+    return encabezado
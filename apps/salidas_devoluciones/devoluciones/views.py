@@ -1,20 +1,29 @@
 import json
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.db.models import F, Sum
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.auditoria import bitacora
 from apps.mantenimiento.models import (
     Tipo_Movimiento_Inventario,
     Estado_Movimiento_Inventario,
 )
 
 from apps.inventario.models import Productos, Lotes
-from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+from apps.inventario.resumen_diario import marcar_documentos
+from apps.inventario.reversos import ReversoSinStock, revertir_movimientos
+from apps.salidas_devoluciones import indice_facturas
+from apps.salidas_devoluciones.models import Devolucion, Movimientos_Inventario_Sucursal
+from apps.salidas_devoluciones.devoluciones.motor import (
+    DevolucionInvalida,
+    registrar_devolucion,
+    saldos_por_lote,
+    validar_lineas,
+)
 from django.views.decorators.http import require_POST
-from django.db.models import Max, Sum, F, Subquery, OuterRef
 
 from django.http import HttpResponse
 from reportlab.lib.pagesizes import landscape, A4
@@ -22,6 +31,8 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 
+LIMITE_FACTURAS = 100  # filas del modal de búsqueda de facturas
+
 
 @login_required
 @require_POST
@@ -34,90 +45,52 @@ def devolucion_cancel(request, ref: str):
     - Descuenta del inventario (resta lo devuelto).
     - Marca los DEV originales como 'Cancelado'.
     - Crea un movimiento DEV con cantidad NEGATIVA por cada renglón revertido (auditoría).
+    Todo por conjunto con apps.inventario.reversos.
     """
     # Estados
     try:
-        estado_ok = Estado_Movimiento_Inventario.objects.get(nombre_estado="Completado")
-        estado_cancel = Estado_Movimiento_Inventario.objects.get(nombre_estado="Cancelado")
+        estado_ok = catalogos.obtener(Estado_Movimiento_Inventario, "Completado")
+        estado_cancel = catalogos.obtener(Estado_Movimiento_Inventario, "Cancelado")
     except Estado_Movimiento_Inventario.DoesNotExist:
         return JsonResponse({"success": False, "errors": "Estados 'Completado/Cancelado' no configurados."}, status=400)
 
     # Tipo DEV
     try:
-        tipo_dev = Tipo_Movimiento_Inventario.objects.get(codigo="DEV")
+        tipo_dev = catalogos.obtener(Tipo_Movimiento_Inventario, "DEV")
     except Tipo_Movimiento_Inventario.DoesNotExist:
         return JsonResponse({"success": False, "errors": "No existe el tipo de movimiento 'DEV'."}, status=400)
 
     # Movimientos DEV de esta referencia
-    devs = (
-        Movimientos_Inventario_Sucursal.objects
-        .select_for_update()
-        .select_related("id_lote")
-        .filter(id_tipo_movimiento=tipo_dev, referencia_transaccion=ref)
-        .order_by("id")
-    )
+    devs = Movimientos_Inventario_Sucursal.objects.filter(id_tipo_movimiento=tipo_dev, referencia_transaccion=ref)
     if not devs.exists():
         return JsonResponse({"success": False, "errors": "No hay devoluciones registradas para esta referencia."}, status=404)
 
-    # ¿Ya están todos cancelados?
-    hay_completados = devs.filter(estado_movimiento_inventario=estado_ok).exists()
-    if not hay_completados:
+    # Solo los DEV completados y positivos suman stock (un DEV negativo es un reverso previo)
+    completados = devs.filter(estado_movimiento_inventario=estado_ok)
+    if not completados.exists():
         return JsonResponse({"success": False, "errors": "La devolución ya está cancelada."}, status=400)
+    completados = completados.filter(cantidad__gt=0)
 
-    # Agrupa por lote la cantidad a revertir (solo los completados, que suman stock)
-    a_revertir = {}  # lote_id -> cantidad_total
-    for m in devs.filter(estado_movimiento_inventario=estado_ok):
-        qty = int(m.cantidad or 0)
-        if qty <= 0:
-            # Un DEV negativo no suma stock (p. ej., ajustes previos); lo saltamos
-            continue
-        a_revertir[m.id_lote_id] = a_revertir.get(m.id_lote_id, 0) + qty
-
-    if not a_revertir:
-        return JsonResponse({"success": False, "errors": "No hay renglones revertibles en estado 'Completado'."}, status=400)
-
-    # Validar stock suficiente para revertir (no dejar lotes en negativo)
-    lotes = {l.id: l for l in Lotes.objects.select_for_update().filter(id__in=a_revertir.keys())}
-    faltantes = []
-    for lote_id, qty in a_revertir.items():
-        lote = lotes.get(lote_id)
-        disp = int(lote.cantidad_disponible or 0)
-        if disp < qty:
-            faltantes.append(f"Lote {lote.numero_lote}: disponible {disp}, a revertir {qty}.")
-
-    if faltantes:
+    # Descuenta lo devuelto (sin dejar lotes en negativo), marca los DEV como
+    # Cancelado y registra un DEV negativo por renglón para auditoría
+    try:
+        revertidos = revertir_movimientos(
+            completados,
+            estado_cancelado=estado_cancel,
+            usuario=request.user,
+            comentario=lambda m: "Reversa por cancelación de devolución",
+        )
+    except ReversoSinStock as e:
         return JsonResponse({
             "success": False,
-            "errors": ["Stock insuficiente para revertir la devolución en:"] + faltantes
+            "errors": ["Stock insuficiente para revertir la devolución en:"] + e.mensajes()
         }, status=400)
+    if not revertidos:
+        return JsonResponse({"success": False, "errors": "No hay renglones revertibles en estado 'Completado'."}, status=400)
 
-    # Aplicar reverso por cada renglón completado
-    usuario = request.user
-    for m in devs.filter(estado_movimiento_inventario=estado_ok):
-        qty = int(m.cantidad or 0)
-        if qty <= 0:
-            continue  # solo revertimos los DEV positivos
-
-        # 1) Descontar del lote
-        Lotes.objects.filter(pk=m.id_lote_id).update(
-            cantidad_disponible=F("cantidad_disponible") - qty
-        )
-
-        # 2) Marcar original como Cancelado
-        m.estado_movimiento_inventario = estado_cancel
-        m.save(update_fields=["estado_movimiento_inventario"])
-
-        # 3) Asiento inverso (DEV negativo) para auditoría
-        Movimientos_Inventario_Sucursal.objects.create(
-            id_lote=m.id_lote,
-            id_tipo_movimiento=tipo_dev,
-            cantidad=-qty,
-            id_usuario=usuario,
-            referencia_transaccion=ref,
-            comentario="Reversa por cancelación de devolución",
-            estado_movimiento_inventario=estado_cancel,
-        )
-
+    Devolucion.objects.filter(referencia_transaccion=ref).update(estado_movimiento_inventario=estado_cancel)
+    marcar_documentos(Devolucion.objects.filter(referencia_transaccion=ref).values_list("fecha_hora", flat=True))
+    bitacora.registrar(f"Anular devolución {ref}", tabla=Devolucion._meta.db_table)
     return JsonResponse({"success": True})
 
 
@@ -127,30 +100,12 @@ def devolucion_cancel(request, ref: str):
 
 @login_required
 def devolucion_list(request):
-    # 1) Ids del último movimiento DEV por referencia
-    latest_ids = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(id_tipo_movimiento__codigo="DEV")
-        .values('referencia_transaccion')
-        .annotate(last_id=Max('id'))
-        .values_list('last_id', flat=True)
-    )
-
-    # 2) Carga solo esos movimientos
-    qs = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(id__in=latest_ids)
+    # Un encabezado por factura, con la fecha/usuario/estado de la última devolución
+    devoluciones = (
+        Devolucion.objects
         .select_related("id_usuario", "estado_movimiento_inventario")
         .order_by('-fecha_hora')   # más recientes primero
     )
-
-    devoluciones = [{
-        "referencia_transaccion": m.referencia_transaccion,
-        "fecha": m.fecha_hora,
-        "usuario": m.id_usuario,
-        "estado": m.estado_movimiento_inventario,
-    } for m in qs]
-
     return render(request, "devoluciones/lista.html", {"devoluciones": devoluciones})
 
 
@@ -176,7 +131,12 @@ def devolucion_detail(request, ref: str):
         .order_by("id")
     )
 
-    header = movimientos.first()
+    header = (
+        Devolucion.objects
+        .select_related("id_usuario", "estado_movimiento_inventario")
+        .filter(referencia_transaccion=ref)
+        .first()
+    )
     return render(
         request,
         "devoluciones/partials/_consultar.html",
@@ -197,9 +157,10 @@ def devolucion_detail(request, ref: str):
 def devolucion_create(request):
     """
     GET  -> devuelve el formulario parcial `devoluciones/form.html`
-    POST -> guarda la devolución:
-            - valida que el producto y lote existan y que estén asociados a la factura (VEN)
-            - suma el stock al lote
+    POST -> guarda la devolución (ver motor.py):
+            - valida todas las líneas juntas: producto y lote existen, el lote figura en la
+              factura (VEN) y lo devuelto no excede lo vendido menos lo ya devuelto
+            - suma el stock de los lotes
             - registra un movimiento DEV positivo para cada renglón
     Espera payload JSON con:
       {
@@ -245,79 +206,24 @@ def devolucion_create(request):
 
     # Tipo y estado necesarios
     try:
-        tipo_dev = Tipo_Movimiento_Inventario.objects.get(codigo="DEV")
+        tipo_dev = catalogos.obtener(Tipo_Movimiento_Inventario, "DEV")
     except Tipo_Movimiento_Inventario.DoesNotExist:
         return JsonResponse({"success": False, "errors": "No existe el tipo de movimiento 'DEV'."}, status=400)
 
     try:
-        estado_ok = Estado_Movimiento_Inventario.objects.get(nombre_estado="Completado")
+        estado_ok = catalogos.obtener(Estado_Movimiento_Inventario, "Completado")
     except Estado_Movimiento_Inventario.DoesNotExist:
         return JsonResponse({"success": False, "errors": "No existe el estado de movimiento 'Completado'."}, status=400)
 
-    usuario = request.user
-
     try:
-        for idx, det in enumerate(detalles, start=1):
-            pid = det.get("producto_id")
-            lote_id = det.get("lote_id")
-            qty = det.get("cantidad")
-
-            try:
-                qty = int(qty)
-            except Exception:
-                qty = 0
-
-            if not pid or not lote_id or qty <= 0:
-                raise ValueError(f"Dato faltante/erróneo en línea {idx}.")
-
-            producto = get_object_or_404(Productos, pk=pid)
-            lote = get_object_or_404(Lotes, pk=lote_id)
-
-            # 1) Validar que el lote corresponda al producto
-            if lote.id_producto_id != producto.id:
-                raise ValueError(f"El lote seleccionado no pertenece al producto en línea {idx}.")
-
-            # 2) Validar que en esa factura (ref) hubo una VENTA de ese producto (y de ese lote)
-            vendidas_qs = (
-                Movimientos_Inventario_Sucursal.objects
-                .filter(
-                    id_tipo_movimiento__codigo="VEN",
-                    referencia_transaccion=referencia,
-                    id_lote=lote,
-                )
-                .aggregate(total=Sum("cantidad"))
-            )
-            # En VEN la cantidad es NEGATIVA, por lo que total será <= 0 si existió.
-            total_vendida = vendidas_qs["total"] or 0
-            if total_vendida == 0:
-                # No se vendió ese lote en esa factura
-                raise ValueError(
-                    f"El lote {lote.numero_lote} del producto '{producto.nombre}' no figura en la factura {referencia}."
-                )
-
-            # 3) Actualizar inventario (suma)
-            Lotes.objects.filter(pk=lote.pk).update(
-                cantidad_disponible=F("cantidad_disponible") + qty
-            )
-            lote.refresh_from_db(fields=["cantidad_disponible"])
-
-            # 4) Registrar movimiento DEV (cantidad POSITIVA)
-            Movimientos_Inventario_Sucursal.objects.create(
-                id_lote=lote,
-                id_tipo_movimiento=tipo_dev,
-                cantidad=qty,
-                id_usuario=usuario,
-                referencia_transaccion=referencia,
-                comentario=motivo or None,
-                estado_movimiento_inventario=estado_ok,
-                # fecha_hora -> auto_now_add del modelo
-            )
-
+        lineas = validar_lineas(referencia, detalles)
+        devolucion = registrar_devolucion(referencia, lineas, request.user, motivo, tipo_dev, estado_ok)
+        bitacora.registrar(f"Devolución {referencia}", devolucion)
         return JsonResponse({"success": True})
 
-    except ValueError as e:
+    except DevolucionInvalida as e:
         transaction.set_rollback(True)
-        return JsonResponse({"success": False, "errors": str(e)}, status=400)
+        return JsonResponse({"success": False, "errors": e.errores}, status=400)
     except Exception:
         transaction.set_rollback(True)
         return JsonResponse({"success": False, "errors": "Error interno al procesar la devolución."}, status=500)
@@ -332,42 +238,33 @@ def lotes_vendidos_por_factura(request, ref: str, producto_id: int):
     """
     Devuelve la lista de lotes (y cantidades vendidas) que aparecen en la factura (VEN)
     para el producto dado. Sirve para autollenar/sugerir el campo *Lote* en el form de devolución.
+    `devolvible` es lo vendido menos lo ya devuelto.
     Respuesta: [
-      {"id": 1, "numero_lote": "A-001", "fecha_caducidad": "2026-11-30", "vendido": 5, "disponible": 12},
+      {"id": 1, "numero_lote": "A-001", "fecha_caducidad": "2026-11-30", "vendido": 5,
+       "devuelto": 1, "devolvible": 4, "disponible": 12},
       ...
     ]
     """
     producto = get_object_or_404(Productos, pk=producto_id)
 
-    # Movimientos de venta por lote (las cantidades son negativas, hacemos ABS)
-    ventas_por_lote = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(
-            id_tipo_movimiento__codigo="VEN",
-            referencia_transaccion=ref,
-            id_lote__id_producto=producto,
-        )
-        .values("id_lote")                # agrupamos por lote
-        .annotate(total_vendido=Sum("cantidad"))
-    )
-
-    # Carga los lotes involucrados
-    lote_ids = [v["id_lote"] for v in ventas_por_lote]
-    lotes = {l.id: l for l in Lotes.objects.filter(id__in=lote_ids)}
+    # Vendido / devuelto / por devolver por lote (mismo cálculo que valida la devolución)
+    saldos = saldos_por_lote(ref, producto.id)
+    lotes = Lotes.objects.in_bulk(saldos.keys())
 
     results = []
-    for row in ventas_por_lote:
-        lote = lotes.get(row["id_lote"])
+    for lote_id, saldo in saldos.items():
+        lote = lotes.get(lote_id)
         if not lote:
             continue
-        vendido_abs = abs(int(row["total_vendido"] or 0))
         results.append({
             "id": lote.id,
             "numero_lote": lote.numero_lote,
             "fecha_caducidad": (
                 lote.fecha_caducidad.strftime("%Y-%m-%d") if lote.fecha_caducidad else ""
             ),
-            "vendido": vendido_abs,
+            "vendido": saldo["vendido"],
+            "devuelto": saldo["devuelto"],
+            "devolvible": saldo["devolvible"],
             "disponible": int(lote.cantidad_disponible or 0),
         })
 
@@ -378,6 +275,15 @@ def devolucion_export_pdf(request, ref: str):
     """
     Exporta el detalle de una devolución en formato PDF.
     """
+    header = (
+        Devolucion.objects
+        .select_related("id_usuario", "estado_movimiento_inventario")
+        .filter(referencia_transaccion=ref)
+        .first()
+    )
+    if header is None:
+        return HttpResponse("No hay movimientos para esta devolución.", status=404)
+
     movimientos = (
         Movimientos_Inventario_Sucursal.objects
         .filter(id_tipo_movimiento__codigo="DEV", referencia_transaccion=ref)
@@ -385,11 +291,6 @@ def devolucion_export_pdf(request, ref: str):
         .order_by("id")
     )
 
-    if not movimientos.exists():
-        return HttpResponse("No hay movimientos para esta devolución.", status=404)
-
-    header = movimientos.first()
-
     # ---- Configuración del PDF ----
     response = HttpResponse(content_type="application/pdf")
     response["Content-Disposition"] = f'inline; filename="devolucion_{ref}.pdf"'
@@ -454,36 +355,19 @@ def devolucion_export_pdf(request, ref: str):
 @login_required
 def buscar_facturas_completadas(request):
     """
-    Devuelve una lista de facturas (referencia_transaccion y fecha)
-    que tengan movimientos de tipo 'VEN' con estado 'Completado'.
+    Devuelve una lista de facturas (referencia_transaccion y fecha) de ventas
+    completadas, desde el índice de búsqueda (por factura o producto).
     Se usa para el modal de búsqueda de facturas.
     """
-    term = (request.GET.get("term") or "").strip().lower()
-
-    facturas = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(
-            id_tipo_movimiento__codigo="VEN",
-            estado_movimiento_inventario__nombre_estado="Completado"
-        )
-        .values("referencia_transaccion")
-        .annotate(
-            total=Sum("cantidad"),
-            fecha=Max("fecha_hora")  # ✅ tomamos la última fecha de movimiento
-        )
-        .order_by("-fecha")
-    )
-
-    if term:
-        facturas = facturas.filter(referencia_transaccion__icontains=term)
+    term = (request.GET.get("term") or "").strip()
 
     data = [
         {
-            "referencia": f["referencia_transaccion"],
-            "fecha": f["fecha"].strftime("%Y-%m-%d %H:%M") if f["fecha"] else "",
-            "total": abs(f["total"] or 0)
+            "referencia": f.referencia,
+            "fecha": timezone.localtime(f.fecha_hora).strftime("%Y-%m-%d %H:%M"),
+            "total": abs(f.unidades or 0),
         }
-        for f in facturas if f["referencia_transaccion"]
+        for f in indice_facturas.buscar(term, limite=LIMITE_FACTURAS)
     ]
     return JsonResponse(data, safe=False)
 
@@ -0,0 +1,116 @@
+# apps/salidas_devoluciones/indice_facturas.py
+"""
+Índice de búsqueda de facturas completadas (`Indice_Factura`).
+
+`venta_create` llama a `indexar` dentro de su transacción con los productos
+que ya tiene cargados (sin consultas extra) y `venta_cancel` llama a `quitar`.
+La referencia y los nombres de producto se guardan normalizados con
+`busqueda.normalizar`, así que el filtro es un `LIKE '%termino%'` sobre
+columnas con índice GIN de trigramas (migración 0006 de esta app, si el
+servidor tiene pg_trgm).
+
+`reconstruir` (migración y comando `rebuild_indice_facturas`) vuelve a
+generar el índice desde los encabezados y movimientos, p. ej. después de
+renombrar productos.
+"""
+from django.db.models import Q
+
+from apps.inventario.busqueda import normalizar
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Movimiento_Inventario
+from apps.salidas_devoluciones.models import Indice_Factura, Movimientos_Inventario_Sucursal, Venta
+
+LIMITE_POR_DEFECTO = 50
+SEPARADOR = " | "
+
+
+def _fila(venta, productos) -> Indice_Factura:
+    productos = list(productos)
+    nombres = SEPARADOR.join(p.nombre for p in productos)
+    return Indice_Factura(
+        id_venta=venta,
+        referencia=venta.referencia_transaccion,
+        referencia_busqueda=normalizar(venta.referencia_transaccion),
+        fecha_hora=venta.fecha_hora,
+        unidades=venta.unidades,
+        id_usuario_id=venta.id_usuario_id,
+        id_producto=productos[0] if productos else None,
+        productos=nombres,
+        productos_busqueda=normalizar(nombres),
+    )
+
+
+def indexar(venta, productos) -> None:
+    """Agrega (o actualiza) la factura `venta` con sus `productos` (Productos, sin repetir)."""
+    Indice_Factura.objects.bulk_create(
+        [_fila(venta, productos)],
+        update_conflicts=True,
+        unique_fields=["id_venta"],
+        update_fields=[
+            "referencia", "referencia_busqueda", "fecha_hora", "unidades",
+            "id_usuario", "id_producto", "productos", "productos_busqueda",
+        ],
+    )
+
+
+def quitar(venta) -> None:
+    """La factura deja de estar completada (cancelación)."""
+    Indice_Factura.objects.filter(id_venta=venta).delete()
+
+
+def _productos_por_referencia(referencias, estado_ok) -> dict:
+    """{referencia: {id_producto: Productos}} en el orden de los movimientos de venta."""
+    productos = {}
+    movimientos = (
+        Movimientos_Inventario_Sucursal.objects
+        .filter(
+            id_tipo_movimiento__codigo="VEN",
+            estado_movimiento_inventario=estado_ok,
+            referencia_transaccion__in=referencias,
+        )
+        .select_related("id_lote__id_producto")
+        .order_by("id")
+    )
+    for m in movimientos:
+        productos.setdefault(m.referencia_transaccion, {}).setdefault(m.id_lote.id_producto_id, m.id_lote.id_producto)
+    return productos
+
+
+def reconstruir(lote: int = 1000) -> int:
+    """
+    Regenera todo el índice desde las ventas completadas. Devuelve las filas escritas.
+
+    Recorre las ventas por id en bloques de `lote` y trae sólo los movimientos
+    de cada bloque, así la memoria y el tamaño del `IN` no crecen con el historial.
+    """
+    try:
+        estado_ok = catalogos.obtener(Estado_Movimiento_Inventario, "Completado")
+    except Estado_Movimiento_Inventario.DoesNotExist:
+        return 0
+
+    Indice_Factura.objects.all().delete()
+    ventas_ok = Venta.objects.filter(estado_movimiento_inventario=estado_ok).order_by("id")
+    total = 0
+    ultimo_id = 0
+    while True:
+        ventas = list(ventas_ok.filter(id__gt=ultimo_id)[:lote])
+        if not ventas:
+            return total
+        productos = _productos_por_referencia([v.referencia_transaccion for v in ventas], estado_ok)
+        Indice_Factura.objects.bulk_create(
+            [_fila(v, productos.get(v.referencia_transaccion, {}).values()) for v in ventas]
+        )
+        total += len(ventas)
+        ultimo_id = ventas[-1].id
+
+
+def buscar(termino: str = "", limite: int = LIMITE_POR_DEFECTO):
+    """
+    Facturas completadas cuya referencia o algún producto contiene `termino`
+    (sin importar acentos ni mayúsculas), de la más reciente a la más antigua.
+    """
+    qs = Indice_Factura.objects.select_related("id_usuario", "id_producto").order_by("-fecha_hora")
+    termino = normalizar(termino)
+    if termino:
+        qs = qs.filter(Q(referencia_busqueda__contains=termino) | Q(productos_busqueda__contains=termino))
+    return qs[:limite]
@@ -0,0 +1,17 @@
+# apps/salidas_devoluciones/management/commands/rebuild_indice_facturas.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.salidas_devoluciones.indice_facturas import reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera el índice de búsqueda de facturas completadas. Las ventas lo "
+        "mantienen al día; sirve después de renombrar productos o importar datos."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Facturas indexadas: {total}"))
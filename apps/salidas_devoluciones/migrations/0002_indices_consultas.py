@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:53
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no puede ir en una transacción
+    atomic = False
+
+    dependencies = [
+        ('inventario', '0005_indices_consultas'),
+        ('mantenimiento', '0003_delete_estado_alerta_delete_tipo_alerta'),
+        ('salidas_devoluciones', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='movimientos_inventario_sucursal',
+            index=models.Index(fields=['referencia_transaccion', 'id_tipo_movimiento'], name='idx_mov_referencia_tipo'),
+        ),
+        AddIndexConcurrently(
+            model_name='movimientos_inventario_sucursal',
+            index=models.Index(fields=['id_lote', 'fecha_hora'], name='idx_mov_lote_fecha'),
+        ),
+    ]
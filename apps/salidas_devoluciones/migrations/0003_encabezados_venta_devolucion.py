@@ -0,0 +1,119 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def _agrupar(Movimiento, codigo, signo):
+    """Resume los movimientos de un tipo por referencia (signo: 1 DEV, -1 VEN)."""
+    docs = {}
+    movimientos = (
+        Movimiento.objects
+        .filter(id_tipo_movimiento__codigo=codigo)
+        .exclude(referencia_transaccion__isnull=True)
+        .exclude(referencia_transaccion="")
+        .select_related("id_lote", "estado_movimiento_inventario")
+        .order_by("referencia_transaccion", "id")
+    )
+    for m in movimientos.iterator(chunk_size=2000):
+        d = docs.setdefault(m.referencia_transaccion, {
+            "primero": m, "lineas": 0, "unidades": 0, "monto": Decimal("0"), "cancelado": None,
+        })
+        d["ultimo"] = m
+        qty = int(m.cantidad or 0) * signo
+        if qty > 0:  # renglón original (los reversos tienen el signo contrario)
+            d["lineas"] += 1
+            d["unidades"] += qty
+            d["monto"] += qty * (m.id_lote.precio_venta or 0)
+        estado = m.estado_movimiento_inventario
+        if estado is not None and estado.nombre_estado.lower() == "cancelado":
+            d["cancelado"] = estado
+    return docs
+
+
+def poblar_encabezados(apps, schema_editor):
+    Movimiento = apps.get_model("salidas_devoluciones", "Movimientos_Inventario_Sucursal")
+    Venta = apps.get_model("salidas_devoluciones", "Venta")
+    Devolucion = apps.get_model("salidas_devoluciones", "Devolucion")
+
+    ventas = []
+    for ref, d in _agrupar(Movimiento, "VEN", -1).items():
+        primero = d["primero"]
+        ventas.append(Venta(
+            referencia_transaccion=ref,
+            fecha_hora=primero.fecha_hora,
+            comentario=primero.comentario,
+            lineas=d["lineas"], unidades=d["unidades"], monto=d["monto"],
+            id_usuario_id=primero.id_usuario_id,
+            estado_movimiento_inventario=d["cancelado"] or primero.estado_movimiento_inventario,
+        ))
+    Venta.objects.bulk_create(ventas, batch_size=1000)
+    venta_ids = dict(Venta.objects.values_list("referencia_transaccion", "id"))
+
+    devoluciones = []
+    for ref, d in _agrupar(Movimiento, "DEV", 1).items():
+        ultimo = d["ultimo"]
+        devoluciones.append(Devolucion(
+            referencia_transaccion=ref,
+            fecha_hora=ultimo.fecha_hora,
+            comentario=d["primero"].comentario,
+            lineas=d["lineas"], unidades=d["unidades"], monto=d["monto"],
+            id_usuario_id=ultimo.id_usuario_id,
+            estado_movimiento_inventario_id=ultimo.estado_movimiento_inventario_id,
+            id_venta_id=venta_ids.get(ref),
+        ))
+    Devolucion.objects.bulk_create(devoluciones, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantenimiento', '0003_delete_estado_alerta_delete_tipo_alerta'),
+        ('salidas_devoluciones', '0002_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('referencia_transaccion', models.CharField(max_length=255, unique=True)),
+                ('fecha_hora', models.DateTimeField(default=django.utils.timezone.now)),
+                ('comentario', models.CharField(blank=True, max_length=255, null=True)),
+                ('lineas', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('estado_movimiento_inventario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='mantenimiento.estado_movimiento_inventario')),
+                ('id_usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Venta',
+                'verbose_name_plural': 'Ventas',
+            },
+        ),
+        migrations.CreateModel(
+            name='Devolucion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('referencia_transaccion', models.CharField(max_length=255, unique=True)),
+                ('fecha_hora', models.DateTimeField(default=django.utils.timezone.now)),
+                ('comentario', models.CharField(blank=True, max_length=255, null=True)),
+                ('lineas', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('estado_movimiento_inventario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='mantenimiento.estado_movimiento_inventario')),
+                ('id_usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('id_venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='salidas_devoluciones.venta')),
+            ],
+            options={
+                'verbose_name': 'Devolución',
+                'verbose_name_plural': 'Devoluciones',
+            },
+        ),
+        migrations.RunPython(poblar_encabezados, migrations.RunPython.noop),
+    ]
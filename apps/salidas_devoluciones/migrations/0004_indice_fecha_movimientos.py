@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_resumen_diario'),
+        ('mantenimiento', '0003_delete_estado_alerta_delete_tipo_alerta'),
+        ('salidas_devoluciones', '0003_encabezados_venta_devolucion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientos_inventario_sucursal',
+            index=models.Index(fields=['fecha_hora'], name='idx_mov_fecha'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:25
+
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+LOTE = 1000
+
+
+def _normalizar(texto):
+    # Igual que apps.inventario.busqueda.normalizar (copiado: las migraciones no importan código vivo)
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return " ".join(texto.lower().split())
+
+
+def poblar_indice(apps, schema_editor):
+    Venta = apps.get_model("salidas_devoluciones", "Venta")
+    Movimiento = apps.get_model("salidas_devoluciones", "Movimientos_Inventario_Sucursal")
+    Indice = apps.get_model("salidas_devoluciones", "Indice_Factura")
+
+    # Ventas por id en bloques; cada bloque trae sólo sus movimientos.
+    ventas_ok = (
+        Venta.objects.filter(estado_movimiento_inventario__nombre_estado="Completado").order_by("id")
+    )
+    ultimo_id = 0
+    while True:
+        ventas = list(ventas_ok.filter(id__gt=ultimo_id)[:LOTE])
+        if not ventas:
+            return
+        productos = {}
+        movimientos = (
+            Movimiento.objects
+            .filter(
+                id_tipo_movimiento__codigo="VEN",
+                estado_movimiento_inventario__nombre_estado="Completado",
+                referencia_transaccion__in=[v.referencia_transaccion for v in ventas],
+            )
+            .select_related("id_lote__id_producto")
+            .order_by("id")
+        )
+        for m in movimientos:
+            productos.setdefault(m.referencia_transaccion, {}).setdefault(m.id_lote.id_producto_id, m.id_lote.id_producto)
+
+        filas = []
+        for v in ventas:
+            lista = list(productos.get(v.referencia_transaccion, {}).values())
+            nombres = " | ".join(p.nombre for p in lista)
+            filas.append(Indice(
+                id_venta=v,
+                referencia=v.referencia_transaccion,
+                referencia_busqueda=_normalizar(v.referencia_transaccion),
+                fecha_hora=v.fecha_hora,
+                unidades=v.unidades,
+                id_usuario_id=v.id_usuario_id,
+                id_producto=lista[0] if lista else None,
+                productos=nombres,
+                productos_busqueda=_normalizar(nombres),
+            ))
+        Indice.objects.bulk_create(filas)
+        ultimo_id = ventas[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_resumen_diario'),
+        ('salidas_devoluciones', '0004_indice_fecha_movimientos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Indice_Factura',
+            fields=[
+                ('id_venta', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indice', serialize=False, to='salidas_devoluciones.venta')),
+                ('referencia', models.CharField(max_length=255)),
+                ('referencia_busqueda', models.CharField(max_length=255)),
+                ('fecha_hora', models.DateTimeField()),
+                ('unidades', models.IntegerField(default=0)),
+                ('productos', models.TextField(blank=True, default='')),
+                ('productos_busqueda', models.TextField(blank=True, default='')),
+                ('id_producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.productos')),
+                ('id_usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Índice de Factura',
+                'verbose_name_plural': 'Índice de Facturas',
+                'indexes': [models.Index(fields=['-fecha_hora'], name='idx_indice_factura_fecha')],
+            },
+        ),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
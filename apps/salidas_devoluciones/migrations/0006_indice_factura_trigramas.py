@@ -0,0 +1,78 @@
+import logging
+
+from django.db import ProgrammingError, migrations
+
+logger = logging.getLogger(__name__)
+
+# Índices GIN de trigramas para el buscador de facturas. Las columnas ya se
+# guardan normalizadas (sin acentos), así que solo hace falta pg_trgm. Si la
+# extensión no está instalada y el rol no puede instalarla, la búsqueda
+# funciona igual, recorriendo la tabla del índice.
+SIN_PRIVILEGIO = "42501"  # insufficient_privilege
+
+CREAR = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_indice_factura_ref_trgm
+    ON salidas_devoluciones_indice_factura USING gin (referencia_busqueda gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_indice_factura_prod_trgm
+    ON salidas_devoluciones_indice_factura USING gin (productos_busqueda gin_trgm_ops)
+    """,
+]
+
+BORRAR = [
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_indice_factura_prod_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_indice_factura_ref_trgm",
+]
+
+
+def _ejecutar(cursor, sentencias) -> bool:
+    """Ejecuta en orden; False (sin error) si el rol no tiene privilegio para alguna."""
+    for sql in sentencias:
+        try:
+            cursor.execute(sql)
+        except ProgrammingError as e:
+            if getattr(e.__cause__, "pgcode", None) != SIN_PRIVILEGIO:
+                raise
+            logger.warning("Sin privilegio para crear los índices del buscador de facturas (%s); se omiten.", str(e).strip())
+            return False
+    return True
+
+
+def crear_indices(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != "postgresql":
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                logger.warning("pg_trgm no disponible: se omiten los índices del buscador de facturas.")
+                return
+            if not _ejecutar(cursor, ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]):
+                return
+        _ejecutar(cursor, CREAR)
+
+
+def borrar_indices(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != "postgresql":
+        return
+    with conn.cursor() as cursor:
+        for sql in BORRAR:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('salidas_devoluciones', '0005_indice_factura'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
-from apps.inventario.models import Lotes
+from django.utils import timezone
+from apps.inventario.models import Lotes, Productos
 from apps.mantenimiento.models import Tipo_Movimiento_Inventario, Estado_Movimiento_Inventario
 from apps.mantenimiento.usuarios.models import Usuario
 
@@ -22,3 +23,84 @@ class Movimientos_Inventario_Sucursal(models.Model):
     class Meta:
         verbose_name = 'Movimiento de Inventario de Sucursal'
         verbose_name_plural = 'Movimientos de Inventario de Sucursal'
+        indexes = [
+            # Documento (venta, devolución, recepción) por referencia y tipo;
+            # la referencia va primero porque recepción filtra solo por ella.
+            models.Index(
+                fields=['referencia_transaccion', 'id_tipo_movimiento'],
+                name='idx_mov_referencia_tipo',
+            ),
+            # Kardex e historial de un lote por fecha
+            models.Index(fields=['id_lote', 'fecha_hora'], name='idx_mov_lote_fecha'),
+            # Resumen diario: todos los movimientos de un rango de días
+            models.Index(fields=['fecha_hora'], name='idx_mov_fecha'),
+        ]
+
+
+class Documento_Salida(models.Model):
+    """Campos comunes de los encabezados de venta y devolución.
+
+    Se escriben en la misma transacción que los movimientos, para que los
+    listados lean una fila por documento en lugar de agrupar movimientos.
+    """
+    referencia_transaccion = models.CharField(max_length=255, unique=True)  # No. de factura
+    fecha_hora = models.DateTimeField(default=timezone.now)
+    comentario = models.CharField(max_length=255, null=True, blank=True)
+    lineas = models.IntegerField(default=0)       # renglones (movimientos por lote)
+    unidades = models.IntegerField(default=0)
+    monto = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # unidades x precio de venta del lote
+
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    estado_movimiento_inventario = models.ForeignKey(Estado_Movimiento_Inventario, on_delete=models.SET_NULL, null=True, blank=True)
+
+    def __str__(self):
+        return self.referencia_transaccion
+
+    class Meta:
+        abstract = True
+
+
+class Venta(Documento_Salida):
+    class Meta:
+        verbose_name = 'Venta'
+        verbose_name_plural = 'Ventas'
+
+
+class Devolucion(Documento_Salida):
+    # Todas las devoluciones de una factura comparten encabezado
+    id_venta = models.ForeignKey(Venta, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Devolución'
+        verbose_name_plural = 'Devoluciones'
+
+
+class Indice_Factura(models.Model):
+    """Índice de búsqueda de facturas: una fila por venta completada.
+
+    Guarda la referencia y los nombres de los productos ya normalizados
+    (minúsculas, sin acentos) con índices GIN de trigramas, para que los
+    buscadores de facturas (recetas y devoluciones) filtren sin agrupar
+    movimientos. Se escribe al crear la venta y se borra al cancelarla (ver
+    `apps.salidas_devoluciones.indice_facturas`).
+    """
+    id_venta = models.OneToOneField(Venta, on_delete=models.CASCADE, primary_key=True, related_name='indice')
+    referencia = models.CharField(max_length=255)
+    referencia_busqueda = models.CharField(max_length=255)
+    fecha_hora = models.DateTimeField()
+    unidades = models.IntegerField(default=0)
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    # Primer producto de la factura (el buscador de recetas lo precarga)
+    id_producto = models.ForeignKey(Productos, on_delete=models.SET_NULL, null=True, blank=True)
+    productos = models.TextField(blank=True, default="")           # nombres, separados por " | "
+    productos_busqueda = models.TextField(blank=True, default="")  # lo mismo, normalizado
+
+    def __str__(self):
+        return self.referencia
+
+    class Meta:
+        verbose_name = 'Índice de Factura'
+        verbose_name_plural = 'Índice de Facturas'
+        indexes = [
+            models.Index(fields=['-fecha_hora'], name='idx_indice_factura_fecha'),
+        ]
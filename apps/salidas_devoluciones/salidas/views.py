@@ -1,22 +1,25 @@
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import F
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 import json
 
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.auditoria import bitacora
 from apps.mantenimiento.models import (
     Tipo_Movimiento_Inventario,
     Estado_Movimiento_Inventario,
 )
 
 from apps.inventario.models import Productos
-from apps.inventario.models import Lotes
-from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal
+from apps.inventario.fefo import StockInsuficiente, aplicar_plan, plan_a_dict, planificar_fefo
+from apps.inventario.resumen_stock import stock_total_por_producto
+from apps.inventario.reversos import revertir_movimientos
+from apps.salidas_devoluciones import indice_facturas
+from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal, Venta
 
 from django.views.decorators.http import require_POST
-from django.db.models import Sum
 
 from django.http import HttpResponse
 from reportlab.lib.pagesizes import landscape, A4
@@ -30,57 +33,44 @@ from reportlab.lib import colors
 def venta_cancel(request, ref: str):
     # Estados requeridos
     try:
-        estado_ok = Estado_Movimiento_Inventario.objects.get(nombre_estado="Completado")
-        estado_cancel = Estado_Movimiento_Inventario.objects.get(nombre_estado="Cancelado")
+        estado_ok = catalogos.obtener(Estado_Movimiento_Inventario, "Completado")
+        estado_cancel = catalogos.obtener(Estado_Movimiento_Inventario, "Cancelado")
     except Estado_Movimiento_Inventario.DoesNotExist:
         return JsonResponse({"success": False, "errors": ["Faltan estados 'Completado'/'Cancelado' en catálogo."]}, status=400)
 
-    # Movimientos de esta venta
-    movs = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(id_tipo_movimiento__codigo="VEN", referencia_transaccion=ref)
-        .select_for_update()
-    )
-    if not movs.exists():
+    # Encabezado de la venta (bloqueado mientras se cancela)
+    venta = Venta.objects.select_for_update().filter(referencia_transaccion=ref).first()
+    if venta is None:
         return JsonResponse({"success": False, "errors": [f"No hay movimientos para la referencia '{ref}'."]}, status=404)
 
     # ¿Ya cancelada?
-    if movs.filter(estado_movimiento_inventario=estado_cancel).exists():
+    if venta.estado_movimiento_inventario_id == estado_cancel.id:
         return JsonResponse({"success": False, "errors": [f"La venta '{ref}' ya está cancelada."]}, status=400)
 
-    # Debe haber al menos un movimiento completado para poder cancelar
-    if not movs.filter(estado_movimiento_inventario=estado_ok).exists():
+    # Debe estar completada para poder cancelar
+    if venta.estado_movimiento_inventario_id != estado_ok.id:
         return JsonResponse({"success": False, "errors": [f"La venta '{ref}' no está en estado 'Completado'."]}, status=400)
 
-    usuario = request.user
+    # Movimientos completados de esta venta
+    movs = Movimientos_Inventario_Sucursal.objects.filter(
+        id_tipo_movimiento__codigo="VEN",
+        referencia_transaccion=ref,
+        estado_movimiento_inventario=estado_ok,
+    )
 
     try:
-        # Recorremos cada movimiento y revertimos exactamente ese lote/cantidad
-        for m in movs:
-            # m.cantidad es NEGATIVA en ventas; devolvemos su valor absoluto al stock
-            devolver = abs(int(m.cantidad or 0))
-            if devolver <= 0:
-                continue
-
-            # 1) Restaurar stock del lote
-            Lotes.objects.filter(pk=m.id_lote_id).update(
-                cantidad_disponible=F("cantidad_disponible") + devolver
-            )
-
-            # 2) Registrar movimiento de reverso (cantidad POSITIVA),
-            #    mismo tipo "VEN", pero estado Cancelado
-            Movimientos_Inventario_Sucursal.objects.create(
-                id_lote=m.id_lote,
-                id_tipo_movimiento=m.id_tipo_movimiento,  # "VEN"
-                cantidad=devolver,
-                id_usuario=usuario,
-                referencia_transaccion=ref,
-                comentario=f"Anulación de venta ref {ref} (origen mov {m.id}).",
-                estado_movimiento_inventario=estado_cancel,
-            )
-
-        # 3) Marcar los movimientos originales como Cancelado (para auditoría visual)
-        movs.update(estado_movimiento_inventario=estado_cancel)
+        # Devuelve el stock, marca los VEN como Cancelado y registra un reverso
+        # (cantidad POSITIVA, mismo tipo "VEN", estado Cancelado) por cada uno
+        revertir_movimientos(
+            movs,
+            estado_cancelado=estado_cancel,
+            usuario=request.user,
+            comentario=lambda m: f"Anulación de venta ref {ref} (origen mov {m.id}).",
+        )
+        venta.estado_movimiento_inventario = estado_cancel
+        venta.save(update_fields=["estado_movimiento_inventario"])
+        indice_facturas.quitar(venta)
+        bitacora.registrar(f"Anular venta {ref}", venta)
 
         return JsonResponse({"success": True})
     except Exception:
@@ -90,47 +80,35 @@ def venta_cancel(request, ref: str):
 @login_required
 def venta_list(request):
     """
-    Listado de ventas: una fila por referencia_transaccion (No. de factura).
-    Tomamos el primer movimiento de cada referencia para extraer fecha, usuario, estado.
+    Listado de ventas: una fila por encabezado `Venta` (No. de factura).
     """
-    qs = (
-        Movimientos_Inventario_Sucursal.objects
-        .filter(id_tipo_movimiento__codigo="VEN")
+    ventas = (
+        Venta.objects
         .select_related("id_usuario", "estado_movimiento_inventario")
-        .order_by("referencia_transaccion", "id")
+        .order_by("referencia_transaccion")
     )
-
-    ventas = []
-    vistos = set()
-    for m in qs:
-        ref = m.referencia_transaccion or ""
-        if ref in vistos:
-            continue
-        vistos.add(ref)
-        ventas.append({
-            "referencia": ref,
-            "fecha": m.fecha_hora,
-            "usuario": m.id_usuario,  # __str__ del modelo Usuario
-            "estado": m.estado_movimiento_inventario,  # __str__ del estado
-        })
-
     return render(request, "salidas/lista.html", {"ventas": ventas})
 
 @login_required
 def venta_detail(request, ref: str):
+    venta = (
+        Venta.objects
+        .select_related("id_usuario", "estado_movimiento_inventario")
+        .filter(referencia_transaccion=ref)
+        .first()
+    )
     movimientos = (
         Movimientos_Inventario_Sucursal.objects
         .filter(id_tipo_movimiento__codigo="VEN", referencia_transaccion=ref)
         .select_related("id_lote", "id_lote__id_producto", "id_usuario", "estado_movimiento_inventario")
         .order_by("id")
     )
-    first = movimientos.first()
     return render(request, "salidas/partials/_consultar.html", {
         "referencia": ref,
-        "fecha": first.fecha_hora if first else None,
-        "usuario": first.id_usuario if first else "",
-        "estado": first.estado_movimiento_inventario if first else "",
-        "comentario": first.comentario if first else "",
+        "fecha": venta.fecha_hora if venta else None,
+        "usuario": venta.id_usuario if venta else "",
+        "estado": venta.estado_movimiento_inventario if venta else "",
+        "comentario": venta.comentario if venta else "",
         "movimientos": movimientos,
     })
 
@@ -160,6 +138,8 @@ def venta_create(request):
 
     if not ref:
         errors.append("No. de factura requerido.")
+    elif Venta.objects.filter(referencia_transaccion=ref).exists():
+        errors.append(f"Ya existe una venta con la factura '{ref}'.")
 
     if not isinstance(detalles, list) or not detalles:
         errors.append("Debe agregar al menos un producto.")
@@ -168,12 +148,12 @@ def venta_create(request):
     tipo_ven = None
     estado_ok = None
     try:
-        tipo_ven = Tipo_Movimiento_Inventario.objects.get(codigo="VEN")
+        tipo_ven = catalogos.obtener(Tipo_Movimiento_Inventario, "VEN")
     except Tipo_Movimiento_Inventario.DoesNotExist:
         errors.append("No existe el tipo de movimiento 'VEN'.")
 
     try:
-        estado_ok = Estado_Movimiento_Inventario.objects.get(nombre_estado="Completado")
+        estado_ok = catalogos.obtener(Estado_Movimiento_Inventario, "Completado")
     except Estado_Movimiento_Inventario.DoesNotExist:
         errors.append("No existe el estado de movimiento 'Completado'.")
 
@@ -183,6 +163,14 @@ def venta_create(request):
     productos_reqs = {}  # producto_id -> qty_total_solicitada
 
     if detalles:
+        ids = set()
+        for det in detalles:
+            try:
+                ids.add(int(det.get("producto_id")))
+            except Exception:
+                pass
+        productos = Productos.objects.in_bulk(ids)
+
         for idx, det in enumerate(detalles, start=1):
             pid = det.get("producto_id")
             qty = det.get("cantidad")
@@ -204,33 +192,22 @@ def venta_create(request):
                 errors.append(f"Línea {idx}: cantidad inválida.")
                 continue
 
-            try:
-                producto = Productos.objects.get(pk=pid)
-            except Productos.DoesNotExist:
+            producto = productos.get(pid)
+            if producto is None:
                 errors.append(f"Línea {idx}: el producto (id={pid}) no existe.")
                 continue
 
             clean_rows.append((idx, producto, qty))
             productos_reqs[pid] = productos_reqs.get(pid, 0) + qty
 
-    # 2) stock suficiente por producto (suma de todos los lotes)
+    # 2) stock suficiente por producto (resumen StockProducto, una fila por producto)
     if clean_rows:
-        # inventario disponible por producto
-        disponibles = (
-            Lotes.objects
-            .filter(id_producto_id__in=productos_reqs.keys(), cantidad_disponible__gt=0)
-            .values("id_producto_id")
-            .annotate(total=Sum("cantidad_disponible"))
-        )
-        disp_map = {r["id_producto_id"]: int(r["total"] or 0) for r in disponibles}
+        disp_map = stock_total_por_producto(productos_reqs.keys())
 
         for pid, qty_req in productos_reqs.items():
             total_disp = disp_map.get(pid, 0)
             if total_disp < qty_req:
-                try:
-                    nombre = Productos.objects.only("nombre").get(pk=pid).nombre
-                except Productos.DoesNotExist:
-                    nombre = f"ID {pid}"
+                nombre = productos[pid].nombre
                 errors.append(
                     f"Stock insuficiente para '{nombre}'. Requerido: {qty_req}, disponible: {total_disp}."
                 )
@@ -238,78 +215,89 @@ def venta_create(request):
     if errors:
         return JsonResponse({"success": False, "errors": errors}, status=400)
 
-    # === Si todo ok: aplicar FIFO y crear movimientos ===
+    # Vista previa: plan FEFO sin bloquear ni escribir
+    if data.get("simular"):
+        try:
+            plan = planificar_fefo(productos_reqs, bloquear=False)
+        except StockInsuficiente as e:
+            return JsonResponse({"success": False, "errors": _errores_stock(e, productos)}, status=400)
+        return JsonResponse({"success": True, "simulacion": True, "plan": plan_a_dict(plan)})
+
+    # === Si todo ok: asignar FEFO y crear movimientos ===
     usuario = request.user
 
     try:
-        for idx, producto, qty in clean_rows:
-            restante = qty
-            lotes = (
-                Lotes.objects
-                .filter(id_producto=producto, cantidad_disponible__gt=0)
-                .order_by("fecha_caducidad", "id")
-                .select_for_update()
+        plan = planificar_fefo(productos_reqs)
+        aplicar_plan(plan)
+        venta = Venta.objects.create(
+            referencia_transaccion=ref,
+            comentario=comentario or None,
+            lineas=len(plan),
+            unidades=sum(a["cantidad"] for a in plan),
+            monto=sum(a["cantidad"] * (a["lote"].precio_venta or 0) for a in plan),
+            id_usuario=usuario,
+            estado_movimiento_inventario=estado_ok,
+        )
+        Movimientos_Inventario_Sucursal.objects.bulk_create([
+            Movimientos_Inventario_Sucursal(
+                id_lote=a["lote"],
+                id_tipo_movimiento=tipo_ven,
+                cantidad=-a["cantidad"],  # cantidad negativa por salida
+                id_usuario=usuario,
+                referencia_transaccion=ref,
+                comentario=comentario or None,
+                estado_movimiento_inventario=estado_ok,
             )
-
-            for lote in lotes:
-                if restante <= 0:
-                    break
-                disponible = int(lote.cantidad_disponible or 0)
-                if disponible <= 0:
-                    continue
-                tomar = min(disponible, restante)
-
-                # descuenta
-                Lotes.objects.filter(pk=lote.pk).update(
-                    cantidad_disponible=F("cantidad_disponible") - tomar
-                )
-                # movimiento (cantidad negativa por salida)
-                Movimientos_Inventario_Sucursal.objects.create(
-                    id_lote=lote,
-                    id_tipo_movimiento=tipo_ven,
-                    cantidad=-tomar,
-                    id_usuario=usuario,
-                    referencia_transaccion=ref,
-                    comentario=comentario or None,
-                    estado_movimiento_inventario=estado_ok,
-                )
-                restante -= tomar
-
-            if restante > 0:
-                # Esto no debería pasar por la pre-validación, pero por seguridad…
-                raise ValueError(
-                    f"Stock insuficiente para '{producto.nombre}'. Faltan {restante}."
-                )
-
+            for a in plan
+        ])
+        indice_facturas.indexar(venta, [productos[pid] for pid in productos_reqs])
+        bitacora.registrar(f"Venta {ref}", venta)
         return JsonResponse({"success": True})
 
-    except ValueError as e:
+    except StockInsuficiente as e:
+        # No debería pasar por la pre-validación (salvo una venta concurrente)
+        transaction.set_rollback(True)
+        return JsonResponse({"success": False, "errors": _errores_stock(e, productos)}, status=400)
+    except IntegrityError:
+        # Otra venta con la misma factura se guardó al mismo tiempo
         transaction.set_rollback(True)
-        return JsonResponse({"success": False, "errors": [str(e)]}, status=400)
+        return JsonResponse({"success": False, "errors": [f"Ya existe una venta con la factura '{ref}'."]}, status=400)
     except Exception:
         transaction.set_rollback(True)
         return JsonResponse({"success": False, "errors": ["Error interno al procesar la venta."]}, status=500)
 
 
+def _errores_stock(exc: StockInsuficiente, productos) -> list:
+    return [
+        f"Stock insuficiente para '{productos[pid].nombre}'. Faltan {req - disp}."
+        for pid, (req, disp) in exc.faltantes.items()
+    ]
+
+
 @login_required
 def venta_export_pdf(request, ref: str):
     """
     Exporta un PDF de la venta (salida) identificada por su referencia (No. de factura).
     """
+    venta = (
+        Venta.objects
+        .select_related("id_usuario", "estado_movimiento_inventario")
+        .filter(referencia_transaccion=ref)
+        .first()
+    )
+    if venta is None:
+        return HttpResponse("No se encontró la venta especificada.", status=404)
+
     movimientos = (
         Movimientos_Inventario_Sucursal.objects
         .filter(id_tipo_movimiento__codigo="VEN", referencia_transaccion=ref)
         .select_related("id_lote", "id_lote__id_producto", "id_usuario", "estado_movimiento_inventario")
         .order_by("id")
     )
-    if not movimientos.exists():
-        return HttpResponse("No se encontró la venta especificada.", status=404)
-
-    first = movimientos.first()
-    usuario = first.id_usuario
-    fecha = first.fecha_hora
-    estado = first.estado_movimiento_inventario
-    comentario = first.comentario or ""
+    usuario = venta.id_usuario
+    fecha = venta.fecha_hora
+    estado = venta.estado_movimiento_inventario
+    comentario = venta.comentario or ""
 
     # Respuesta PDF
     response = HttpResponse(content_type="application/pdf")
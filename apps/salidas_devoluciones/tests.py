@@ -1,3 +1,197 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.urls import reverse
+
+from apps.inventario.models import Lotes
+from apps.inventario.pruebas import InventarioBase
+from apps.inventario.reversos import ReversoSinStock, revertir_movimientos
+from apps.salidas_devoluciones.devoluciones.motor import DevolucionInvalida, saldos_por_lote, validar_lineas
+from apps.salidas_devoluciones.models import Movimientos_Inventario_Sucursal, Venta
+
+
+class SalidasBase(InventarioBase):
+    """Ventas y devoluciones a través de las vistas, con el usuario ya autenticado."""
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def vender(self, ref, lineas, **extra):
+        payload = {
+            "form_data": {"numero_factura": ref},
+            "detalles": [{"producto_id": p.id, "cantidad": qty} for p, qty in lineas],
+            **extra,
+        }
+        return self.client.post(
+            reverse("sd:salidas:create"), json.dumps(payload), content_type="application/json"
+        )
+
+    def devolver(self, ref, lineas):
+        payload = {
+            "form_data": {"numero_factura": ref},
+            "detalles": [{"producto_id": l.id_producto_id, "lote_id": l.id, "cantidad": qty} for l, qty in lineas],
+        }
+        return self.client.post(
+            reverse("sd:devoluciones:create"), json.dumps(payload), content_type="application/json"
+        )
+
+    def cancelar_devolucion(self, ref):
+        return self.client.post(reverse("sd:devoluciones:cancel", args=[ref]))
+
+
+class VentaFefoTests(SalidasBase):
+    def setUp(self):
+        super().setUp()
+        # Creados fuera de orden de caducidad para que el id no decida por FEFO
+        self.tardio = self.crear_lote(self.producto, "L-TARDIO", 200, 10)
+        self.temprano = self.crear_lote(self.producto, "L-TEMPRANO", 40, 3)
+        self.medio = self.crear_lote(self.producto, "L-MEDIO", 100, 4)
+        self.lote_otro = self.crear_lote(self.otro, "L-OTRO", 90, 6)
+
+    def test_asigna_lotes_del_primero_en_vencer_al_ultimo(self):
+        r = self.vender("F-100", [(self.producto, 5)])
+
+        self.assertEqual(r.status_code, 200, r.content)
+        movimientos = list(
+            Movimientos_Inventario_Sucursal.objects
+            .filter(referencia_transaccion="F-100")
+            .order_by("id")
+            .values_list("id_lote_id", "cantidad")
+        )
+        self.assertEqual(movimientos, [(self.temprano.id, -3), (self.medio.id, -2)])
+        self.assertEqual(self.existencias(self.temprano, self.medio, self.tardio), [0, 2, 10])
+
+        venta = Venta.objects.get(referencia_transaccion="F-100")
+        self.assertEqual((venta.lineas, venta.unidades), (2, 5))
+
+    def test_simular_devuelve_el_plan_sin_escribir(self):
+        r = self.vender("F-101", [(self.producto, 5)], simular=True)
+
+        self.assertEqual(r.status_code, 200, r.content)
+        plan = r.json()["plan"]
+        self.assertEqual(
+            [(p["numero_lote"], p["cantidad"]) for p in plan],
+            [("L-TEMPRANO", 3), ("L-MEDIO", 2)],
+        )
+        self.assertFalse(Venta.objects.filter(referencia_transaccion="F-101").exists())
+        self.assertFalse(Movimientos_Inventario_Sucursal.objects.exists())
+        self.assertEqual(self.existencias(self.temprano, self.medio, self.tardio), [3, 4, 10])
+
+    def test_stock_insuficiente_en_los_lotes_no_deja_nada_escrito(self):
+        # El resumen aún cuenta 17 unidades (p. ej. otra venta acaba de vaciar
+        # un lote): la prevalidación pasa y el planificador FEFO es quien falla.
+        Lotes.objects.filter(pk=self.medio.pk).update(cantidad_disponible=0)
+
+        r = self.vender("F-102", [(self.otro, 2), (self.producto, 15)])
+
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["errors"], ["Stock insuficiente para 'Acetaminofén 500 mg'. Faltan 2."])
+        self.assertFalse(Venta.objects.filter(referencia_transaccion="F-102").exists())
+        self.assertFalse(Movimientos_Inventario_Sucursal.objects.exists())
+        self.assertEqual(self.existencias(self.temprano, self.medio, self.tardio, self.lote_otro), [3, 0, 10, 6])
+
+    def test_rechaza_factura_repetida(self):
+        self.assertEqual(self.vender("F-103", [(self.producto, 2)]).status_code, 200)
+
+        r = self.vender("F-103", [(self.otro, 1)])
+
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("Ya existe una venta con la factura 'F-103'.", r.json()["errors"])
+        self.assertEqual(Venta.objects.filter(referencia_transaccion="F-103").count(), 1)
+        self.assertEqual(self.existencias(self.temprano, self.lote_otro), [1, 6])
+
+
+class DevolucionSaldosTests(SalidasBase):
+    def setUp(self):
+        super().setUp()
+        self.lote = self.crear_lote(self.producto, "L-D1", 120, 8)
+        self.lote_otro = self.crear_lote(self.otro, "L-D2", 120, 8)
+        self.assertEqual(self.vender("F-200", [(self.producto, 5)]).status_code, 200)
+
+    def test_no_devuelve_mas_de_lo_vendido_entre_dos_solicitudes(self):
+        self.assertEqual(self.devolver("F-200", [(self.lote, 3)]).status_code, 200)
+
+        r = self.devolver("F-200", [(self.lote, 3)])
+
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["errors"], [
+            "El lote L-D1 del producto 'Acetaminofén 500 mg' excede lo vendido: "
+            "vendido 5, devuelto 3, por devolver 2, solicitado 3."
+        ])
+        self.assertEqual(self.existencias(self.lote), [6])
+        self.assertEqual(saldos_por_lote("F-200")[self.lote.id]["devolvible"], 2)
+
+    def test_lineas_de_una_misma_solicitud_se_suman_por_lote(self):
+        with self.assertRaises(DevolucionInvalida) as ctx:
+            validar_lineas("F-200", [
+                {"producto_id": self.producto.id, "lote_id": self.lote.id, "cantidad": 3},
+                {"producto_id": self.producto.id, "lote_id": self.lote.id, "cantidad": 3},
+            ])
+        self.assertIn("solicitado 6.", ctx.exception.errores[0])
+
+    def test_devolucion_cancelada_vuelve_a_dejar_todo_por_devolver(self):
+        self.assertEqual(self.devolver("F-200", [(self.lote, 3)]).status_code, 200)
+        self.assertEqual(
+            saldos_por_lote("F-200"),
+            {self.lote.id: {"vendido": 5, "devuelto": 3, "devolvible": 2}},
+        )
+
+        self.assertEqual(self.cancelar_devolucion("F-200").status_code, 200)
+
+        self.assertEqual(
+            saldos_por_lote("F-200"),
+            {self.lote.id: {"vendido": 5, "devuelto": 0, "devolvible": 5}},
+        )
+        self.assertEqual(self.existencias(self.lote), [3])
+        self.assertEqual(self.devolver("F-200", [(self.lote, 5)]).status_code, 200)
+
+    def test_lote_de_otro_producto_o_fuera_de_la_factura(self):
+        with self.assertRaises(DevolucionInvalida) as ctx:
+            validar_lineas("F-200", [
+                {"producto_id": self.otro.id, "lote_id": self.lote.id, "cantidad": 1},
+                {"producto_id": self.otro.id, "lote_id": self.lote_otro.id, "cantidad": 1},
+            ])
+        self.assertEqual(ctx.exception.errores, [
+            "El lote seleccionado no pertenece al producto en línea 1.",
+            "El lote L-D2 del producto 'Ibuprofeno 400 mg' no figura en la factura F-200.",
+        ])
+
+
+class ReversoSinStockTests(SalidasBase):
+    def setUp(self):
+        super().setUp()
+        self.lote = self.crear_lote(self.producto, "L-R1", 120, 5)
+        self.assertEqual(self.vender("F-300", [(self.producto, 5)]).status_code, 200)
+        self.assertEqual(self.devolver("F-300", [(self.lote, 3)]).status_code, 200)
+        # Lo devuelto se vuelve a vender: en el lote queda 1 de las 3 unidades
+        self.assertEqual(self.vender("F-301", [(self.producto, 2)]).status_code, 200)
+        self.devoluciones = Movimientos_Inventario_Sucursal.objects.filter(
+            referencia_transaccion="F-300", id_tipo_movimiento=self.tipo_dev,
+        )
+
+    def test_revertir_sin_stock_lanza_y_no_escribe(self):
+        with self.assertRaises(ReversoSinStock) as ctx:
+            revertir_movimientos(
+                self.devoluciones.filter(estado_movimiento_inventario=self.estado_ok),
+                estado_cancelado=self.estado_cancelado,
+                usuario=self.usuario,
+                comentario=lambda m: "Reversa de prueba",
+            )
+
+        (lote, disponible, a_revertir), = ctx.exception.faltantes
+        self.assertEqual((lote.id, disponible, a_revertir), (self.lote.id, 1, 3))
+        self.assertEqual(self.existencias(self.lote), [1])
+        self.assertEqual(
+            list(self.devoluciones.values_list("cantidad", "estado_movimiento_inventario")),
+            [(3, self.estado_ok.id)],
+        )
+
+    def test_cancelar_devolucion_sin_stock_responde_error(self):
+        r = self.cancelar_devolucion("F-300")
+
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["errors"], [
+            "Stock insuficiente para revertir la devolución en:",
+            "Lote L-R1: disponible 1, a revertir 3.",
+        ])
+        self.assertEqual(self.existencias(self.lote), [1])
+        self.assertEqual(self.devoluciones.get().estado_movimiento_inventario, self.estado_ok)
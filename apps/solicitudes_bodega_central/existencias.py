@@ -0,0 +1,69 @@
+# apps/solicitudes_bodega_central/existencias.py
+"""
+Existencias que muestra el buscador de productos de las solicitudes.
+
+Por producto:
+- existencia: `StockProducto.stock_total` (resumen mantenido por
+  apps.inventario.resumen_stock)
+- por_vencer: unidades en lotes vigentes que caducan dentro de
+  `PROXIMO_VENCER_DIAS` días (los ya vencidos o en cuarentena no cuentan)
+- solicitado: unidades pedidas en solicitudes que siguen abiertas (todo lo
+  que no está Completada ni Cancelada)
+
+Es una sola consulta: las dos sumas van como subconsultas correlacionadas
+para que los lotes y los renglones de solicitud no se multipliquen entre sí
+en el JOIN.
+"""
+from datetime import timedelta
+
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.inventario.estados_lote import PROXIMO_VENCER_DIAS
+from apps.inventario.models import Lotes
+from apps.inventario.resumen_stock import ESTADOS_NO_VIGENTES, productos_con_stock
+from .models import Detalle_Solicitud_Faltantes
+
+ESTADOS_CERRADOS = ["Completada", "Cancelada"]
+
+
+def suma_por_producto(qs, campo: str):
+    """Subconsulta escalar SUM(`campo`) agrupada por producto."""
+    suma = qs.filter(id_producto=OuterRef("pk")).values("id_producto").annotate(t=Sum(campo)).values("t")
+    return Coalesce(Subquery(suma, output_field=IntegerField()), Value(0))
+
+
+def con_existencias(hoy=None):
+    """Productos anotados con `stock_total`, `stock_vigente`, `por_vencer` y `solicitado`."""
+    hoy = hoy or timezone.localdate()
+    lotes = Lotes.objects.filter(
+        cantidad_disponible__gt=0,
+        fecha_caducidad__gte=hoy,
+        fecha_caducidad__lte=hoy + timedelta(days=PROXIMO_VENCER_DIAS),
+    ).exclude(id_estado_lote__nombre_estado__in=ESTADOS_NO_VIGENTES)
+    abiertos = Detalle_Solicitud_Faltantes.objects.exclude(
+        id_solicitud__id_estado_solicitud__nombre_estado__in=ESTADOS_CERRADOS
+    )
+    return productos_con_stock().annotate(
+        stock_vigente=Coalesce(F("stock_resumen__stock_vigente"), Value(0)),
+        por_vencer=suma_por_producto(lotes, "cantidad_disponible"),
+        solicitado=suma_por_producto(abiertos, "cantidad_solicitada"),
+    )
+
+
+def existencias(producto_ids) -> dict:
+    """{producto_id: {existencia, por_vencer, solicitado}} para los ids dados."""
+    filas = (
+        con_existencias()
+        .filter(pk__in=list(producto_ids))
+        .values("pk", "stock_total", "por_vencer", "solicitado")
+    )
+    return {
+        f["pk"]: {
+            "existencia": int(f["stock_total"]),
+            "por_vencer": int(f["por_vencer"]),
+            "solicitado": int(f["solicitado"]),
+        }
+        for f in filas
+    }
@@ -0,0 +1,76 @@
+# apps/solicitudes_bodega_central/filtros.py
+"""
+Filtros del listado de solicitudes a bodega central (`solicitudes_api`).
+
+Parámetros aceptados (querystring):
+- documento, usuario: texto contenido (sin mayúsculas)
+- estado: nombre exacto del estado (sin mayúsculas)
+- desde, hasta (yyyy-mm-dd): rango de fechas, ambos días incluidos
+- producto_id: solicitudes que incluyen ese producto
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Detalle_Solicitud_Faltantes
+
+# Nombre público del orden -> lookup del ORM (solo columnas NOT NULL).
+ORDEN_SOLICITUDES = {
+    "fecha": "fecha_solicitud",
+    "documento": "nombre_documento",
+    "usuario": "id_usuario__nombre",
+    "estado": "id_estado_solicitud__nombre_estado",
+}
+
+
+def _parse_date(d):
+    try:
+        return datetime.strptime(d, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def _inicio_dia(d):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def leer_filtros_solicitudes(params) -> dict:
+    """Lee los filtros desde un QueryDict (request.GET)."""
+    def texto(clave):
+        return (params.get(clave) or "").strip()
+
+    try:
+        producto_id = int(params.get("producto_id"))
+    except (TypeError, ValueError):
+        producto_id = None
+
+    return {
+        "documento": texto("documento"),
+        "usuario": texto("usuario"),
+        "estado": texto("estado"),
+        "desde": _parse_date(texto("desde")),
+        "hasta": _parse_date(texto("hasta")),
+        "producto_id": producto_id,
+    }
+
+
+def filtrar_solicitudes(filtros: dict, qs):
+    """Aplica los filtros leídos por `leer_filtros_solicitudes`."""
+    if filtros["documento"]:
+        qs = qs.filter(nombre_documento__icontains=filtros["documento"])
+    if filtros["usuario"]:
+        qs = qs.filter(id_usuario__nombre__icontains=filtros["usuario"])
+    if filtros["estado"]:
+        qs = qs.filter(id_estado_solicitud__nombre_estado__iexact=filtros["estado"])
+    if filtros["desde"]:
+        qs = qs.filter(fecha_solicitud__gte=_inicio_dia(filtros["desde"]))
+    if filtros["hasta"]:
+        qs = qs.filter(fecha_solicitud__lt=_inicio_dia(filtros["hasta"] + timedelta(days=1)))
+    if filtros["producto_id"]:
+        qs = qs.filter(Exists(
+            Detalle_Solicitud_Faltantes.objects.filter(
+                id_solicitud=OuterRef("pk"), id_producto_id=filtros["producto_id"]
+            )
+        ))
+    return qs
@@ -0,0 +1,67 @@
+# apps/solicitudes_bodega_central/management/commands/generar_reabastecimiento.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.mantenimiento.usuarios.models import Usuario
+from apps.solicitudes_bodega_central import reabastecimiento
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera una solicitud a bodega central en estado Borrador con los "
+        "productos cuyo disponible (stock vigente menos lo que vence pronto) no "
+        "cubre el stock mínimo ni el consumo reciente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", help="Correo del usuario que figura como solicitante.")
+        parser.add_argument("--documento", help="Nombre del documento. Por defecto 'Reabastecimiento <fecha>'.")
+        parser.add_argument(
+            "--dias-consumo", type=int, default=reabastecimiento.DIAS_CONSUMO,
+            help="Días de ventas que se promedian para el consumo diario.",
+        )
+        parser.add_argument(
+            "--dias-cobertura", type=int, default=reabastecimiento.DIAS_COBERTURA,
+            help="Días de consumo que debe cubrir el stock tras reabastecer.",
+        )
+        parser.add_argument(
+            "--dias-urgente", type=int, default=reabastecimiento.DIAS_URGENTE,
+            help="Renglones con menos días de cobertura se marcan urgentes.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo muestra cuántos renglones se generarían, no crea la solicitud.",
+        )
+
+    def handle(self, *args, **options):
+        parametros = {
+            "dias_consumo": options["dias_consumo"],
+            "dias_cobertura": options["dias_cobertura"],
+            "dias_urgente": options["dias_urgente"],
+        }
+        if min(parametros.values()) < 1:
+            raise CommandError("Los parámetros de días deben ser mayores que cero.")
+
+        if options["dry_run"]:
+            renglones = reabastecimiento.calcular(**parametros)
+        else:
+            if not options["usuario"]:
+                raise CommandError("Indica --usuario (o usa --dry-run).")
+            try:
+                usuario = Usuario.objects.get(correo_electronico=options["usuario"])
+            except Usuario.DoesNotExist:
+                raise CommandError(f"No existe el usuario {options['usuario']}.")
+            solicitud, renglones = reabastecimiento.generar(
+                usuario, nombre_documento=options["documento"], **parametros
+            )
+
+        urgentes = sum(1 for r in renglones if r["urgente"])
+        if not renglones:
+            self.stdout.write("No hay productos por reabastecer.")
+        elif options["dry_run"]:
+            self.stdout.write(f"Se generarían {len(renglones)} renglones ({urgentes} urgentes).")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Solicitud #{solicitud.pk} '{solicitud.nombre_documento}': "
+                f"{len(renglones)} renglones ({urgentes} urgentes)."
+            ))
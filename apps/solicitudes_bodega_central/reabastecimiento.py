@@ -0,0 +1,120 @@
+# apps/solicitudes_bodega_central/reabastecimiento.py
+"""
+Propuesta automática de reabastecimiento a bodega central.
+
+Recorre todos los productos activos en una sola consulta (las existencias de
+`existencias.con_existencias` más el consumo reciente del resumen diario) y,
+para cada uno, calcula:
+
+- disponible = stock vigente - unidades que vencen pronto
+- consumo diario = salidas por venta de los últimos `DIAS_CONSUMO` días / días
+- objetivo = máx(stock_minimo, consumo diario * `DIAS_COBERTURA`)
+- faltante = objetivo - disponible - lo ya solicitado en solicitudes abiertas
+
+Los productos con faltante > 0 se guardan como renglones de una solicitud en
+estado "Borrador" (bulk_create). Un renglón es urgente cuando el disponible
+alcanza para menos de `DIAS_URGENTE` días, o cuando ya no queda nada.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.inventario.models import Resumen_Diario_Movimiento
+from apps.inventario.resumen_diario import etiqueta_tipo
+from apps.mantenimiento import catalogos
+from apps.mantenimiento.models import Estado_Producto, Estado_Solicitud
+from .existencias import con_existencias, suma_por_producto
+from .models import Detalle_Solicitud_Faltantes, Solicitudes_Faltantes
+
+DIAS_CONSUMO = getattr(settings, "REABASTECIMIENTO_DIAS_CONSUMO", 30)
+DIAS_COBERTURA = getattr(settings, "REABASTECIMIENTO_DIAS_COBERTURA", 30)
+DIAS_URGENTE = getattr(settings, "REABASTECIMIENTO_DIAS_URGENTE", 7)
+ESTADO_PROPUESTA = "Borrador"
+LOTE_INSERCION = 1000
+
+
+def _productos(hoy, dias_consumo):
+    ventas = Resumen_Diario_Movimiento.objects.filter(
+        tipo=etiqueta_tipo("VEN"),
+        fecha__gt=hoy - timedelta(days=dias_consumo),
+        fecha__lte=hoy,
+    )
+    qs = con_existencias(hoy).annotate(consumo=suma_por_producto(ventas, "salidas"))
+    try:
+        qs = qs.exclude(id_estado_producto_id=catalogos.obtener_id(Estado_Producto, "Inactivo"))
+    except Estado_Producto.DoesNotExist:
+        pass
+    return qs.values(
+        "id", "stock_minimo", "stock_vigente", "por_vencer", "solicitado", "consumo"
+    ).order_by()
+
+
+def calcular(hoy=None, dias_consumo=DIAS_CONSUMO, dias_cobertura=DIAS_COBERTURA,
+             dias_urgente=DIAS_URGENTE) -> list:
+    """Renglones propuestos: [{id_producto, cantidad, urgente, cobertura, observaciones}]."""
+    hoy = hoy or timezone.localdate()
+    renglones = []
+    for p in _productos(hoy, dias_consumo).iterator(chunk_size=5000):
+        disponible = max(0, p["stock_vigente"] - p["por_vencer"])
+        diario = p["consumo"] / dias_consumo
+        objetivo = max(p["stock_minimo"] or 0, math.ceil(diario * dias_cobertura))
+        cantidad = objetivo - disponible - p["solicitado"]
+        if cantidad <= 0:
+            continue
+
+        cobertura = disponible / diario if diario else None
+        urgente = disponible == 0 or (cobertura is not None and cobertura < dias_urgente)
+        if cobertura is None:
+            detalle = "sin ventas recientes"
+        else:
+            detalle = f"cobertura {cobertura:.1f} días"
+        renglones.append({
+            "id_producto": p["id"],
+            "cantidad": cantidad,
+            "urgente": urgente,
+            "cobertura": cobertura,
+            "observaciones": (
+                f"Disponible {disponible}, vendidas {p['consumo']} en {dias_consumo} días, {detalle}"
+            ),
+        })
+
+    # Urgentes primero y, dentro de cada grupo, los de menor cobertura.
+    renglones.sort(key=lambda r: (
+        not r["urgente"], r["cobertura"] if r["cobertura"] is not None else math.inf
+    ))
+    return renglones
+
+
+@transaction.atomic
+def generar(usuario, nombre_documento=None, hoy=None, **parametros):
+    """
+    Crea la solicitud "Borrador" con los renglones de `calcular`.
+    Devuelve (solicitud, renglones); solicitud es None si no falta nada.
+    """
+    hoy = hoy or timezone.localdate()
+    renglones = calcular(hoy=hoy, **parametros)
+    if not renglones:
+        return None, renglones
+
+    solicitud = Solicitudes_Faltantes.objects.create(
+        nombre_documento=nombre_documento or f"Reabastecimiento {hoy:%Y-%m-%d}",
+        id_usuario=usuario,
+        id_estado_solicitud=catalogos.obtener_o_crear(Estado_Solicitud, ESTADO_PROPUESTA),
+    )
+    Detalle_Solicitud_Faltantes.objects.bulk_create(
+        (
+            Detalle_Solicitud_Faltantes(
+                id_solicitud=solicitud,
+                id_producto_id=r["id_producto"],
+                cantidad_solicitada=r["cantidad"],
+                es_urgente=r["urgente"],
+                observaciones=r["observaciones"],
+            )
+            for r in renglones
+        ),
+        batch_size=LOTE_INSERCION,
+    )
+    return solicitud, renglones
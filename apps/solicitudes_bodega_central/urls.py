@@ -9,10 +9,14 @@ urlpatterns = [
 
     # Pantalla principal con el formulario embebido
     path("registrar/", views.registrar_solicitud, name="registrar_solicitud"),
+    path("api/", views.solicitudes_api, name="solicitudes_api"),
 
     # Crear (POST JSON). Si llega GET se redirige a 'registrar_solicitud'
     path("crear/", views.crear_solicitud, name="crear_solicitud"),
 
+    # Propuesta automática de reabastecimiento (POST)
+    path("propuesta/generar/", views.generar_propuesta, name="generar_propuesta"),
+
     # Buscador AJAX para el input de productos (usa {% url 'solicitudes_bodega_central:buscar_productos' %})
     path("buscar-productos/", views.buscar_productos, name="buscar_productos"),
 
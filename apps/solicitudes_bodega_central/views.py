@@ -1,12 +1,14 @@
 import io
 import json
+import logging
 from datetime import datetime as dt
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.http import FileResponse, JsonResponse
+from django.db.models import F
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 
@@ -16,11 +18,19 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 from .models import Solicitudes_Faltantes, Detalle_Solicitud_Faltantes
+from apps.mantenimiento import catalogos
 from apps.mantenimiento.models import Usuario, Estado_Solicitud
 from apps.inventario.models import Productos
+from apps.inventario import busqueda
+from farmacia.paginacion import leer_limite, leer_orden, paginar_keyset
+from .existencias import existencias
+from . import reabastecimiento
+from .filtros import ORDEN_SOLICITUDES, filtrar_solicitudes, leer_filtros_solicitudes
 from django.views.decorators.http import require_POST
 from django.template.loader import render_to_string
 
+logger = logging.getLogger(__name__)
+
 
 @login_required
 def solicitud_cambiar_estado_modal(request, id):
@@ -71,21 +81,46 @@ def index(request):
 # ==============================
 @login_required
 def registrar_solicitud(request):
-    solicitudes = (
-        Solicitudes_Faltantes.objects
-        .select_related("id_usuario", "id_estado_solicitud")
-        .prefetch_related("detalles__id_producto")
-        .order_by("-fecha_solicitud")
+    # Las filas se cargan por página desde `solicitudes_api` y los productos
+    # desde `buscar_productos`
+    return render(request, "solicitudes_bodega_central/registrar.html")
+
+
+@login_required
+def solicitudes_api(request):
+    """
+    Página de solicitudes (JSON). Filtros en `filtros.py`; además:
+    - orden: fecha, documento, usuario, estado (prefijo "-" = descendente; por defecto -fecha)
+    - limite: filas por página (máx. 200)
+    - despues / antes: cursores devueltos por la página anterior
+    El total solo se calcula en la primera página.
+    """
+    qs = filtrar_solicitudes(leer_filtros_solicitudes(request.GET), Solicitudes_Faltantes.objects.all())
+    campo, descendente = leer_orden(request.GET.get("orden"), ORDEN_SOLICITUDES, "-fecha")
+    despues = request.GET.get("despues")
+    antes = request.GET.get("antes")
+
+    filas = qs.values(
+        "id",
+        documento=F("nombre_documento"),
+        fecha=F("fecha_solicitud"),
+        usuario=F("id_usuario__nombre"),
+        estado=F("id_estado_solicitud__nombre_estado"),
+    )
+    resultados, siguiente, anterior = paginar_keyset(
+        filas, campo, descendente,
+        despues=despues, antes=antes,
+        limite=leer_limite(request.GET.get("limite")),
     )
+    for fila in resultados:
+        fila["fecha"] = timezone.localtime(fila["fecha"]).strftime("%Y-%m-%d %H:%M")
 
-    context = {
-        "solicitudes": solicitudes,
-        "productos": Productos.objects.all(),
-        "usuarios": Usuario.objects.all(),
-        "estados": Estado_Solicitud.objects.all(),
-    }
-    # 👇 Aquí tienes TODO tu HTML de registrar embebido (tal como pediste)
-    return render(request, "solicitudes_bodega_central/registrar.html", context)
+    return JsonResponse({
+        "results": resultados,
+        "siguiente": siguiente,
+        "anterior": anterior,
+        "total": None if (despues or antes) else qs.count(),
+    })
 
 
 # ==============================
@@ -94,39 +129,29 @@ def registrar_solicitud(request):
 @login_required
 def buscar_productos(request):
     """
-    Devuelve JSON para el buscador del input en registrar.html.
+    Devuelve JSON para el buscador de productos en registrar.html.
     Query: ?q=texto
-    Respuesta: [{id, nombre, codigo, presentacion, stock}]
+    Respuesta: [{id, nombre, codigo, presentacion, stock, por_vencer, solicitado}]
+    - stock: existencia actual (resumen StockProducto)
+    - por_vencer: unidades que caducan dentro de PROXIMO_VENCER_DIAS
+    - solicitado: unidades ya pedidas en solicitudes abiertas
     """
     q = (request.GET.get("q") or "").strip()
-    qs = Productos.objects.all()
-    if q:
-        try:
-            from django.db.models import Q
-            qs = qs.filter(
-                Q(nombre__icontains=q) |
-                Q(codigo__icontains=q) |
-                Q(codigo_barras__icontains=q)
-            )
-        except Exception:
-            qs = qs.filter(nombre__icontains=q)
-
-    def safe_attr(obj, field, default=""):
-        try:
-            v = getattr(obj, field, default)
-            return v if v is not None else default
-        except Exception:
-            return default
+    productos = busqueda.buscar_productos(q, Productos.objects.select_related("id_presentacion"), limite=30)
+    datos = existencias(p.id for p in productos)
+    vacio = {"existencia": 0, "por_vencer": 0, "solicitado": 0}
 
     data = []
-    for p in qs[:30]:
+    for p in productos:
+        e = datos.get(p.id, vacio)
         data.append({
             "id": p.id,
-            "nombre": safe_attr(p, "nombre"),
-            "codigo": safe_attr(p, "codigo", safe_attr(p, "codigo_barras", "")),
-            "presentacion": safe_attr(getattr(p, "id_presentacion", None), "nombre", ""),
-            # si no tienes stock en este modelo, mandamos 0 para que el front no falle
-            "stock": 0,
+            "nombre": p.nombre,
+            "codigo": p.codigo_producto,
+            "presentacion": str(p.id_presentacion) if p.id_presentacion_id else "",
+            "stock": e["existencia"],
+            "por_vencer": e["por_vencer"],
+            "solicitado": e["solicitado"],
         })
     return JsonResponse(data, safe=False)
 
@@ -161,9 +186,12 @@ def crear_solicitud(request):
     usuario = get_object_or_404(Usuario, id=request.user.id)
 
     # Estado inicial
-    estado = Estado_Solicitud.objects.filter(nombre_estado__iexact="Enviada").first()
-    if not estado:
-        estado = get_object_or_404(Estado_Solicitud, id=1)
+    try:
+        estado = catalogos.obtener(Estado_Solicitud, "Enviada")
+    except Estado_Solicitud.DoesNotExist:
+        estado = catalogos.obtener_por_pk(Estado_Solicitud, 1)
+        if estado is None:
+            raise Http404("No existe el estado de solicitud inicial.")
 
     # Crear cabecera
     solicitud = Solicitudes_Faltantes.objects.create(
@@ -173,8 +201,9 @@ def crear_solicitud(request):
         id_usuario=usuario,
     )
 
-    # Crear renglones
+    # Crear renglones (una validación de productos y un solo INSERT)
     try:
+        renglones = []
         for idx, d in enumerate(detalles, start=1):
             pid = d.get("producto_id")
             qty = d.get("cantidad")
@@ -185,20 +214,29 @@ def crear_solicitud(request):
                 qty = int(qty)
             except Exception:
                 qty = 0
+            try:
+                pid = int(pid)
+            except (TypeError, ValueError):
+                pid = None
 
             if not pid or qty <= 0:
                 raise ValueError(f"Producto/cantidad inválidos en la línea {idx}.")
 
-            # valida existencia
-            get_object_or_404(Productos, pk=pid)
-
-            Detalle_Solicitud_Faltantes.objects.create(
+            renglones.append(Detalle_Solicitud_Faltantes(
                 id_solicitud=solicitud,
                 id_producto_id=pid,
                 cantidad_solicitada=qty,
                 es_urgente=urgente,
                 observaciones=obs,
-            )
+            ))
+
+        # valida existencia
+        ids = {r.id_producto_id for r in renglones}
+        existentes = set(Productos.objects.filter(pk__in=ids).values_list("pk", flat=True))
+        if ids - existentes:
+            raise ValueError("Uno o más productos no existen.")
+
+        Detalle_Solicitud_Faltantes.objects.bulk_create(renglones)
 
         return JsonResponse({"success": True})
 
@@ -210,6 +248,28 @@ def crear_solicitud(request):
         return JsonResponse({"success": False, "errors": "Error interno al guardar la solicitud."}, status=500)
 
 
+@login_required
+@require_POST
+def generar_propuesta(request):
+    """Crea una solicitud Borrador con los productos por reabastecer (ver reabastecimiento.py)."""
+    usuario = get_object_or_404(Usuario, id=request.user.id)
+    try:
+        solicitud, renglones = reabastecimiento.generar(usuario)
+    except Exception:
+        logger.exception("Error al generar la propuesta de reabastecimiento.")
+        return JsonResponse({"success": False, "errors": "Error interno al generar la propuesta."}, status=500)
+
+    if solicitud is None:
+        return JsonResponse({"success": True, "id": None, "lineas": 0, "urgentes": 0})
+    return JsonResponse({
+        "success": True,
+        "id": solicitud.pk,
+        "documento": solicitud.nombre_documento,
+        "lineas": len(renglones),
+        "urgentes": sum(1 for r in renglones if r["urgente"]),
+    })
+
+
 # ==============================
 # EDITAR
 # ==============================
@@ -235,12 +295,10 @@ def editar_solicitud(request, id):
 
         return redirect("solicitudes_bodega_central:registrar_solicitud")
 
-    productos = Productos.objects.all()
-    estados = Estado_Solicitud.objects.all()
     return render(
         request,
         "solicitudes_bodega_central/registrar.html",
-        {"solicitud": solicitud, "detalle": detalle, "productos": productos, "estados": estados},
+        {"solicitud": solicitud, "detalle": detalle},
     )
 
 
@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
 
+from apps.mantenimiento.auditoria.bitacora import usuario_actual
+
 class LoginRequiredMiddleware(MiddlewareMixin):
     def process_request(self, request):
         if request.user.is_authenticated:
@@ -31,3 +33,17 @@ class LoginRequiredMiddleware(MiddlewareMixin):
 
         # Si no está autenticado → manda a login
         return redirect(f'{reverse("login")}?next={path}')
+
+
+class AuditoriaMiddleware:
+    """Deja el usuario de la petición a mano de la bitácora de auditoría."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = usuario_actual.set(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            usuario_actual.reset(token)
@@ -0,0 +1,105 @@
+"""
+Paginación por cursor (keyset) para los listados JSON.
+
+En lugar de OFFSET, cada página se pide con el valor de la columna de orden y
+el id de la última (o primera) fila vista, así que el costo de una página no
+depende de cuántas filas hay antes. El cursor viaja como texto opaco
+(base64 de una lista JSON [valor, id]).
+"""
+import base64
+import json
+
+from django.db.models import F, Q
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+_CLAVE = "orden_clave"
+
+
+def codificar_cursor(valor, pk) -> str:
+    crudo = json.dumps([valor, pk], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (valor, id) o None si el cursor no es válido."""
+    if not cursor:
+        return None
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+        return valor, int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def leer_limite(valor, por_defecto=LIMITE_POR_DEFECTO) -> int:
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def leer_orden(valor, permitidos: dict, por_defecto: str):
+    """
+    Traduce `?orden=campo` / `?orden=-campo` a (lookup, descendente).
+    `permitidos` mapea el nombre público al lookup del ORM.
+    """
+    valor = (valor or "").strip()
+    descendente = valor.startswith("-")
+    nombre = valor.lstrip("-")
+    if nombre not in permitidos:
+        nombre, descendente = por_defecto.lstrip("-"), por_defecto.startswith("-")
+    return permitidos[nombre], descendente
+
+
+def paginar_keyset(qs, campo: str, descendente=False, despues=None, antes=None, limite=LIMITE_POR_DEFECTO):
+    """
+    Devuelve (filas, cursor_siguiente, cursor_anterior) ordenando por
+    (`campo`, id). Funciona con querysets de modelos o de `.values()`; en el
+    segundo caso `id` debe estar entre los valores pedidos.
+    """
+    qs = qs.annotate(**{_CLAVE: F(campo)})
+    pos_despues = decodificar_cursor(despues)
+    pos_antes = None if pos_despues else decodificar_cursor(antes)
+
+    # Hacia atrás se invierte el orden y luego se voltea el resultado.
+    hacia_atras = pos_antes is not None
+    invertir = descendente != hacia_atras
+    posicion = pos_antes or pos_despues
+
+    if posicion:
+        valor, pk = posicion
+        op = "lt" if invertir else "gt"
+        qs = qs.filter(
+            Q(**{f"{_CLAVE}__{op}": valor}) | Q(**{_CLAVE: valor, f"id__{op}": pk})
+        )
+
+    orden = [f"-{_CLAVE}", "-id"] if invertir else [_CLAVE, "id"]
+    filas = list(qs.order_by(*orden)[: limite + 1])
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if hacia_atras:
+        filas.reverse()
+
+    def _cursor(fila):
+        if isinstance(fila, dict):
+            return codificar_cursor(fila[_CLAVE], fila["id"])
+        return codificar_cursor(getattr(fila, _CLAVE), fila.pk)
+
+    if not filas:
+        return filas, None, None
+
+    if hacia_atras:
+        siguiente = _cursor(filas[-1])
+        anterior = _cursor(filas[0]) if hay_mas else None
+    else:
+        siguiente = _cursor(filas[-1]) if hay_mas else None
+        anterior = _cursor(filas[0]) if pos_despues else None
+
+    for fila in filas:
+        if isinstance(fila, dict):
+            fila.pop(_CLAVE, None)
+    return filas, siguiente, anterior
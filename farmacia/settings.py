@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'apps.recetas',
     'apps.salidas_devoluciones',
     'apps.solicitudes_bodega_central',
+    'apps.reportes',
 
     #Apps Mantenimiento
     'apps.mantenimiento.usuarios',
@@ -60,6 +61,7 @@ INSTALLED_APPS = [
     'apps.mantenimiento.presentaciones',
     'apps.mantenimiento.unidadesmedida',
     'apps.mantenimiento.condicionesalmacenamiento',
+    'apps.mantenimiento.auditoria',
 
     #Apps Gestion Inventario
     'apps.inventario.productos',
@@ -88,6 +90,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
 
     'farmacia.middleware.LoginRequiredMiddleware',
+    'farmacia.middleware.AuditoriaMiddleware',
 
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -114,6 +117,12 @@ WSGI_APPLICATION = 'farmacia.wsgi.application'
 
 PROXIMO_VENCER_DIAS = 30
 
+# Flujo SSE de la pantalla de alertas (alertas/eventos.py). Cada conexión
+# ocupa un hilo del worker mientras está abierta: servir con hilos (gunicorn
+# -k gthread --threads N, runserver), gevent o ASGI, y mantener este límite
+# por proceso por debajo de N. Con 0 el flujo queda desactivado.
+ALERTAS_SSE_MAX_CONEXIONES = 4
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -212,7 +221,8 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Media files (user-uploaded content)
 
-
+# Reportes en segundo plano: segundos que se reutiliza un PDF ya generado
+REPORTES_TTL_SEGUNDOS = config('REPORTES_TTL_SEGUNDOS', default=600, cast=int)
 
 # Mantener la sesión (8 horas)
 SESSION_COOKIE_AGE = 8 * 60 * 60
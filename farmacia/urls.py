@@ -35,6 +35,7 @@ urlpatterns = [
     path('recetas/', include('apps.recetas.urls')),
     path('salidas_devoluciones/', include('apps.salidas_devoluciones.urls')),
     path('solicitudes_bodega_central/', include('apps.solicitudes_bodega_central.urls')),
+    path('reportes/', include('apps.reportes.urls')),
     
 
      # Mantenimiento (padre) con su propio namespace